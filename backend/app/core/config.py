@@ -27,13 +27,40 @@ class Settings(BaseSettings):
     
     # Математический генератор
     max_operands: int = 10
-    max_examples: int = 1000
+    max_examples: int = 10000
+    worksheet_layout: str = "columns"  # Раскладка примеров: "columns" или "single"
+    math_stream_threshold: int = 100  # Начиная с этого количества PDF отдается потоково
     min_interval: int = -1000
     max_interval: int = 1000
     
     # КТП генератор
     max_lessons_per_day: int = 15
     
+    # Исполнитель генераций (PDF/XLSX рендерятся вне event loop)
+    generation_executor: str = "process"  # "process" или "thread"
+    generation_workers: int = 0  # 0 — по количеству ядер
+    generation_max_queue: int = 32  # Сколько задач может ждать свободного воркера
+    generation_timeout: int = 60  # Таймаут одной задачи в секундах
+    
+    # Кэш рабочих листов (только для запросов с зерном)
+    worksheet_cache_memory_mb: int = 64  # Лимит кэша в памяти процесса
+    worksheet_cache_disk_mb: int = 512  # Лимит кэша на диске, 0 — отключить
+    
+    # Пул готовых листов для популярных наборов параметров (только без зерна)
+    worksheet_pool_presets: int = 8  # Сколько популярных наборов держать готовыми, 0 — отключить
+    worksheet_pool_size: int = 4  # Готовых листов на набор
+    worksheet_pool_min_requests: int = 3  # Набор считается популярным с этого числа запросов
+    worksheet_pool_history_days: int = 30  # Глубина истории генераций для выбора наборов
+    worksheet_pool_refresh_seconds: int = 300  # Период пересчета популярных наборов
+    
+    # Фоновые задания генерации (/api/jobs)
+    jobs_ttl_seconds: int = 3600  # Сколько хранятся статус и результат задания
+    jobs_max_running: int = 0  # Одновременно выполняемых заданий, 0 — по числу воркеров генерации
+    
+    # Трассировка генераций (structlog)
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 1.0  # Доля трасс, которые пишутся в лог
+    
     # Дополнительные настройки
     
 
@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Tuple, Union
+
+# Разбор дат и периодов каникул без внешних зависимостей: используется и
+# схемами (проверка запроса), и календарем уроков (app.services.ktp_calendar)
+
+DateLike = Union[date, datetime, str]
+
+RANGE_SEPARATOR = ".."  # Период каникул: "ДД.ММ.ГГГГ..ДД.ММ.ГГГГ"
+
+EPOCH = date(1970, 1, 1)
+
+
+def to_day_number(value: DateLike) -> Optional[int]:
+    """
+    Номер дня от 1970-01-01 для даты или строки ДД.ММ.ГГГГ
+
+    Возвращает None для пустых и некорректных строк (как и раньше, такие
+    даты просто не исключаются из расписания).
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    elif isinstance(value, str):
+        parts = value.strip().split(".")
+        if len(parts) != 3:
+            return None
+        try:
+            day, month, year = map(int, parts)
+            value = date(year, month, day)
+        except ValueError:
+            return None
+    return (value - EPOCH).days
+
+
+def parse_period(value: str) -> Optional[Tuple[int, int]]:
+    """
+    Период "ДД.ММ.ГГГГ..ДД.ММ.ГГГГ" или одна дата — (первый, последний день)
+
+    Returns:
+        None для пустой строки, некорректной даты или периода наоборот
+    """
+    first, separator, last = value.partition(RANGE_SEPARATOR)
+    start = to_day_number(first)
+    end = to_day_number(last) if separator else start
+    if start is None or end is None or start > end:
+        return None
+    return start, end
+
+
+def validate_periods(values: Iterable[str]) -> List[str]:
+    """
+    Проверка периодов каникул (для схем и форм)
+
+    Одиночные даты по-прежнему не проверяются — некорректные просто
+    игнорируются; период с ошибкой в дате или с концом раньше начала
+    отклоняется, чтобы не потерять целые каникулы молча.
+
+    Raises:
+        ValueError: Некорректный период
+    """
+    values = list(values)
+    for value in values:
+        if RANGE_SEPARATOR in value and parse_period(value) is None:
+            raise ValueError(f"Некорректный период каникул: '{value}' (ожидается ДД.ММ.ГГГГ..ДД.ММ.ГГГГ)")
+    return values
@@ -0,0 +1,106 @@
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Tuple, Union
+import io
+import zipfile
+
+# Размер порции при отдаче готового буфера клиенту
+STREAM_CHUNK_SIZE = 64 * 1024
+
+async def stream_buffer(data: bytes, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[memoryview]:
+    """Отдача буфера порциями без копирования (через memoryview)"""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+def buffer_response(
+    data: bytes,
+    media_type: str,
+    filename: str,
+    headers: Optional[Dict[str, str]] = None
+) -> StreamingResponse:
+    """
+    Потоковый ответ с файлом, сформированным в памяти
+    
+    Args:
+        data: Содержимое файла
+        media_type: MIME-тип файла
+        filename: Имя файла для скачивания
+        headers: Дополнительные заголовки ответа
+    """
+    response_headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Content-Length": str(len(data)),
+    }
+    if headers:
+        response_headers.update(headers)
+    
+    return StreamingResponse(
+        stream_buffer(data),
+        media_type=media_type,
+        headers=response_headers
+    )
+
+def iterator_response(
+    chunks: Union[Iterable[bytes], AsyncIterable[bytes]],
+    media_type: str,
+    filename: str,
+    headers: Optional[Dict[str, str]] = None
+) -> StreamingResponse:
+    """
+    Потоковый ответ из итератора фрагментов, размер которого заранее неизвестен
+    
+    Синхронный итератор Starlette обходит в пуле потоков, поэтому каждый
+    фрагмент уходит клиенту сразу после того, как он сформирован.
+    """
+    response_headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+    if headers:
+        response_headers.update(headers)
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers=response_headers
+    )
+
+def build_zip_archive(files: Dict[str, bytes]) -> bytes:
+    """Сборка ZIP архива в памяти из готовых буферов {имя файла: содержимое}"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for name, data in files.items():
+            zip_file.writestr(name, data)
+    return buffer.getvalue()
+
+class _ZipStreamSink(io.RawIOBase):
+    """Приемник без seek: zipfile пишет в потоковом режиме (с дескрипторами данных)"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        """Забрать все записанное с прошлого вызова"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def iter_zip_archive(files: AsyncIterable[Tuple[str, bytes]]) -> AsyncIterator[bytes]:
+    """
+    Инкрементальная сборка ZIP архива
+    
+    Каждый файл записывается в архив, как только он готов, и сразу отдается
+    порцией; в памяти держится только текущий файл и центральный каталог.
+    """
+    sink = _ZipStreamSink()
+    with zipfile.ZipFile(sink, 'w') as zip_file:
+        async for name, data in files:
+            zip_file.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
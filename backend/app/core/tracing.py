@@ -0,0 +1,136 @@
+import contextvars
+import logging
+import random
+import time
+from typing import Any, Optional
+
+import structlog
+
+from app.core.config import settings
+
+structlog.configure(
+    processors=[
+        structlog.contextvars.merge_contextvars,
+        structlog.processors.format_exc_info,
+        structlog.processors.JSONRenderer(ensure_ascii=False),
+    ],
+    logger_factory=structlog.stdlib.LoggerFactory(),
+    wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    cache_logger_on_first_use=True,
+)
+
+# Текущий спан (или _SUPPRESSED для трасс, не попавших в выборку)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+_SUPPRESSED = object()
+
+
+def get_logger(name: str):
+    """Структурный логгер сервиса (события и ошибки, без выборки)"""
+    return structlog.get_logger(name)
+
+
+class _NoopSpan:
+    """Спан-заглушка: трассировка выключена, ничего не измеряет и не пишет"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _SuppressedSpan(_NoopSpan):
+    """Корень трассы вне выборки: вложенные спаны тоже не пишутся"""
+
+    __slots__ = ("_token",)
+
+    def __enter__(self):
+        self._token = _current_span.set(_SUPPRESSED)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+class Span:
+    """Измеряемый участок (sample / render / write); пишется одной записью при выходе"""
+
+    __slots__ = ("name", "fields", "parent", "trace_id", "_logger", "_started", "_token")
+
+    def __init__(self, name: str, parent: Optional["Span"], logger, fields: dict):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(64):016x}"
+        self.fields = fields
+        self._logger = logger
+
+    def set(self, **fields: Any) -> None:
+        """Дополнительные поля, известные только по ходу работы (страницы, размер)"""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._started) * 1000
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.fields["error"] = str(exc)
+        self._logger.info(
+            "span",
+            trace_id=self.trace_id,
+            span=self.name,
+            parent=self.parent.name if self.parent is not None else None,
+            duration_ms=round(duration_ms, 3),
+            **self.fields
+        )
+        return False
+
+
+class Tracer:
+    """
+    Трассировка генераций со спанами и выборкой
+
+    Решение о выборке принимается для корневого спана и наследуется
+    вложенными. Выключенный трассировщик возвращает общий спан-заглушку,
+    поэтому накладные расходы сводятся к одной проверке флага.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 1.0):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self._logger = get_logger("app.tracing")
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None) -> None:
+        """Изменение настроек во время работы"""
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+
+    def span(self, name: str, **fields: Any):
+        """Контекстный менеджер спана: with tracer.span("math.render", variant="student"):"""
+        if not self.enabled:
+            return _NOOP_SPAN
+
+        parent = _current_span.get()
+        if parent is _SUPPRESSED:
+            return _NOOP_SPAN
+        if parent is None and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return _SuppressedSpan()
+        return Span(name, parent, self._logger, fields)
+
+
+# Глобальный трассировщик (настройки из окружения: TRACING_ENABLED, TRACING_SAMPLE_RATE)
+tracer = Tracer(enabled=settings.tracing_enabled, sample_rate=settings.tracing_sample_rate)
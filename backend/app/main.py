@@ -15,8 +15,13 @@ from app.core.config import settings
 from app.middleware.i18n import I18nMiddleware
 
 # Импорт роутеров
-from app.routers import i18n, math, ktp, math_game
+from app.routers import i18n, math, ktp, math_game, jobs
 from app.models.schemas import ErrorResponse
+from app.services.generation_executor import generation_executor
+from app.services.worksheet_cache import worksheet_cache
+from app.services.worksheet_pool import worksheet_pool
+from app.services.job_service import job_manager
+from app.services.holiday_calendar import holiday_calendars
 
 # Настройка логирования
 logging.basicConfig(
@@ -82,6 +87,7 @@ app.include_router(i18n.router)      # Интернационализация
 app.include_router(math.router)      # Математический генератор
 app.include_router(ktp.router)       # КТП генератор
 app.include_router(math_game.router) # Математическая игра
+app.include_router(jobs.router)      # Фоновые задания генерации
 app.include_router(math.legacy_router)  # Legacy математический генератор
 app.include_router(ktp.legacy_router)   # Legacy КТП генератор
 
@@ -146,7 +152,8 @@ async def root():
             "analytics": "/api/analytics",
             "security": "/api/security",
             "math_generator": "/api/math/generate",
-            "ktp_generator": "/api/ktp/generate"
+            "ktp_generator": "/api/ktp/generate",
+            "jobs": "/api/jobs"
         },
         "features": [
             "🌍 Мультиязычная поддержка (5 языков)",
@@ -165,7 +172,11 @@ async def health_check():
         "version": settings.app_version,
         "components": {
             "i18n": "multilingual",
-            "generators": "ready"
+            "generators": "ready",
+            "generation_executor": generation_executor.get_stats(),
+            "worksheet_cache": worksheet_cache.get_stats(),
+            "worksheet_pool": worksheet_pool.get_stats(),
+            "jobs": job_manager.get_stats()
         },
         "config": {
             "debug": settings.debug,
@@ -183,13 +194,14 @@ async def api_info():
         "generators": {
             "math": {
                 "endpoint": "/api/math/generate",
-                "parameters": ["num_operands", "operations", "interval_start", "interval_end", "example_count"],
+                "parameters": ["num_operands", "operations", "interval_start", "interval_end", "example_count", "seed", "format"],
                 "operations": ["+", "-", "*", "/"],
-                "output_format": "PDF"
+                "output_format": "PDF",
+                "preview_formats": ["JSON", "SVG", "HTML"]
             },
             "ktp": {
                 "endpoint": "/api/ktp/generate", 
-                "parameters": ["start_date", "end_date", "weekdays", "lessons_per_day", "holidays", "vacation", "file_name"],
+                "parameters": ["start_date", "end_date", "weekdays", "lessons_per_day", "holidays", "vacation", "file_name", "holiday_calendar"],
                 "output_format": "Excel"
             }
         },
@@ -207,6 +219,10 @@ async def startup_event():
     logger.info(f"🔧 Режим отладки: {settings.debug}")
     logger.info(f"📁 Временная папка: {settings.temp_dir}")
     
+    generation_executor.start()
+    worksheet_pool.start()
+    holiday_calendars.load()
+    
     logger.info(f"⚙️ Настройки загружены из .env")
     logger.info(f"🎯 Доступные функции: генераторы примеров и КТП")
 
@@ -215,6 +231,9 @@ async def startup_event():
 async def shutdown_event():
     """Действия при остановке приложения"""
     logger.info(f"🛑 Остановка {settings.app_name}")
+    await worksheet_pool.stop()
+    await job_manager.shutdown()
+    generation_executor.shutdown()
 
 # Кастомизация OpenAPI схемы
 def custom_openapi():
@@ -252,6 +271,10 @@ def custom_openapi():
             "name": "КТП генератор", 
             "description": "Генерация календарно-тематического планирования"
         },
+        {
+            "name": "Фоновые задания",
+            "description": "Долгие генерации с опросом статуса и скачиванием результата"
+        },
         {
             "name": "Система",
             "description": "Системная информация и проверки состояния"
@@ -3,6 +3,17 @@ from typing import List, Optional
 from datetime import date, datetime
 from enum import Enum
 
+from app.core.periods import validate_periods
+
+# Календари праздников (файлы app/data/holidays) и коды языков интерфейса -> регион календаря
+HOLIDAY_CALENDAR_CODES = ("ru", "kz", "by", "ua")
+LANGUAGE_REGIONS = {
+    "ru": "ru",
+    "kk": "kz",
+    "be": "by",
+    "uk": "ua",
+}
+
 # ============= ENUMS =============
 
 class WeekDay(Enum):
@@ -131,9 +142,10 @@ class MathGeneratorRequest(BaseModel):
     """Запрос к математическому генератору"""
     num_operands: int = Field(2, ge=2, le=5, description="Количество операндов")
     operations: List[MathOperation] = Field(..., min_items=1, description="Список операций")
-    interval_start: int = Field(1, description="Начало интервала")
-    interval_end: int = Field(100, description="Конец интервала")
-    example_count: int = Field(10, ge=1, le=1000, description="Количество примеров")
+    interval_start: int = Field(1, ge=-1000, le=1000, description="Начало интервала")
+    interval_end: int = Field(100, ge=-1000, le=1000, description="Конец интервала")
+    example_count: int = Field(10, ge=1, le=10000, description="Количество примеров")
+    seed: Optional[int] = Field(None, ge=0, description="Зерно генерации (одинаковое зерно дает одинаковые примеры)")
     
     @validator('interval_end')
     def validate_interval(cls, v, values):
@@ -141,6 +153,37 @@ class MathGeneratorRequest(BaseModel):
             raise ValueError('Конец интервала должен быть больше начала')
         return v
 
+class WorksheetVariant(str, Enum):
+    """Вариант рабочего листа"""
+    STUDENT = "student"
+    TEACHER = "teacher"
+    BOTH = "both"
+
+class MathBatchRequest(BaseModel):
+    """Запрос пакетной генерации рабочих листов (один архив на все листы)"""
+    worksheets: List[MathGeneratorRequest] = Field(..., min_items=1, max_items=100, description="Параметры листов")
+    variant: WorksheetVariant = Field(WorksheetVariant.STUDENT, description="Вариант листов в архиве")
+
+class MathJobRequest(MathGeneratorRequest):
+    """Фоновое задание генерации рабочего листа"""
+    variant: WorksheetVariant = Field(WorksheetVariant.STUDENT, description="Вариант листа (both — ZIP с двумя PDF)")
+
+class JobResponse(BaseModel):
+    """Состояние фонового задания генерации"""
+    id: str
+    kind: str = Field(..., description="Тип задания: math или ktp")
+    status: str = Field(..., description="queued, running, done или failed")
+    stage: str = Field(..., description="Текущий шаг: queued, sampling, rendering, writing, done")
+    progress: float = Field(..., ge=0, le=1, description="Доля выполненной работы")
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    filename: str
+    size: Optional[int] = None
+    error: Optional[str] = None
+    status_url: str
+    result_url: str
+
 class MathGeneratorResponse(ResponseBase):
     """Ответ генератора математических примеров"""
     file_name: str
@@ -170,7 +213,12 @@ class KTPGeneratorRequest(BaseModel):
     
     vacation: List[str] = Field(
         default=[], 
-        description="Дни каникул в формате 'дд.мм.гггг'"
+        description="Каникулы: периоды 'дд.мм.гггг..дд.мм.гггг' или отдельные дни 'дд.мм.гггг'"
+    )
+    
+    holiday_calendar: Optional[str] = Field(
+        default=None,
+        description="Календарь праздников региона: ru, kz, by, ua (или код языка kk, be, uk)"
     )
 
     @validator('lessons_per_day')
@@ -186,6 +234,22 @@ class KTPGeneratorRequest(BaseModel):
                 raise ValueError('Дни недели должны быть от 0 до 6')
         return v
 
+    @validator('vacation')
+    def validate_vacation(cls, v):
+        return validate_periods(v)
+
+    @validator('holiday_calendar')
+    def validate_holiday_calendar(cls, v):
+        if not v:
+            return None
+        code = v.strip().lower()
+        code = LANGUAGE_REGIONS.get(code, code)
+        if code not in HOLIDAY_CALENDAR_CODES:
+            raise ValueError(
+                f"Неизвестный календарь праздников: {v}. Доступны: {', '.join(HOLIDAY_CALENDAR_CODES)}"
+            )
+        return code
+
 class KTPGeneratorResponse(BaseModel):
     """Ответ от генератора КТП"""
     file_name: str = Field(..., description="Имя сгенерированного файла")
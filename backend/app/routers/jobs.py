@@ -0,0 +1,96 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse
+from datetime import datetime, timezone
+import os
+
+from app.models.schemas import JobResponse, KTPGeneratorRequest, MathGeneratorRequest, MathJobRequest
+from app.services.job_service import JOB_DONE, JOB_FAILED, job_manager
+
+router = APIRouter(prefix="/api/jobs", tags=["Фоновые задания"])
+
+def job_response(request: Request, job: dict) -> dict:
+    """Статус задания со ссылками для опроса и скачивания"""
+    def timestamp(value):
+        return datetime.fromtimestamp(value, tz=timezone.utc) if value else None
+
+    return JobResponse(
+        id=job["id"],
+        kind=job["kind"],
+        status=job["status"],
+        stage=job["stage"],
+        progress=job["progress"],
+        created_at=timestamp(job["created_at"]),
+        started_at=timestamp(job["started_at"]),
+        finished_at=timestamp(job["finished_at"]),
+        filename=job["filename"],
+        size=job["size"],
+        error=job["error"],
+        status_url=str(request.url_for("get_job", job_id=job["id"]).path),
+        result_url=str(request.url_for("get_job_result", job_id=job["id"]).path),
+    ).model_dump(mode="json")
+
+def accepted(request: Request, job: dict) -> JSONResponse:
+    content = job_response(request, job)
+    return JSONResponse(status_code=202, content=content, headers={"Location": content["status_url"]})
+
+def get_job_or_404(job_id: str) -> dict:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено или устарело")
+    return job
+
+@router.post("/math", status_code=202, response_model=JobResponse)
+async def submit_math_job(request: Request, job_request: MathJobRequest):
+    """
+    Фоновая генерация рабочего листа
+
+    Ответ приходит сразу (202) с идентификатором задания: статус и прогресс
+    опрашиваются по `status_url`, готовый файл скачивается по `result_url`.
+    Вариант `both` возвращает ZIP с листами ученика и учителя.
+    """
+    math_request = MathGeneratorRequest(**job_request.model_dump(exclude={"variant"}))
+    job = job_manager.submit_math(math_request, job_request.variant.value)
+    return accepted(request, job)
+
+@router.post("/ktp", status_code=202, response_model=JobResponse)
+async def submit_ktp_job(request: Request, ktp_request: KTPGeneratorRequest):
+    """
+    Фоновая генерация КТП (Excel)
+
+    Даты праздников и каникул — в формате ДД.ММ.ГГГГ, как в /api/ktp/generate.
+    """
+    if ktp_request.start_date >= ktp_request.end_date:
+        raise HTTPException(status_code=400, detail="Начальная дата должна быть раньше конечной")
+    if not ktp_request.weekdays:
+        raise HTTPException(status_code=400, detail="Необходимо выбрать хотя бы один рабочий день")
+
+    job = job_manager.submit_ktp(ktp_request)
+    return accepted(request, job)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(request: Request, job_id: str):
+    """Статус и прогресс задания"""
+    return job_response(request, get_job_or_404(job_id))
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Скачивание результата готового задания (409, пока задание не готово)"""
+    job = get_job_or_404(job_id)
+
+    if job["status"] == JOB_FAILED:
+        raise HTTPException(status_code=409, detail=f"Задание завершилось ошибкой: {job['error']}")
+    if job["status"] != JOB_DONE:
+        raise HTTPException(status_code=409, detail=f"Задание еще не готово ({job['stage']}, {job['progress']:.0%})")
+
+    path = job_manager.result_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Результат задания устарел")
+
+    return FileResponse(path, media_type=job["media_type"], filename=job["filename"])
+
+@router.delete("/{job_id}")
+async def delete_job(job_id: str):
+    """Отмена задания и удаление результата"""
+    if not job_manager.delete(job_id):
+        raise HTTPException(status_code=404, detail="Задание не найдено или устарело")
+    return {"success": True, "message": "Задание удалено"}
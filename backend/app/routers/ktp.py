@@ -1,15 +1,15 @@
 from fastapi import APIRouter, HTTPException, Form, Request
-from fastapi.responses import FileResponse
-from typing import List
-import os
+from typing import List, Optional
 import time
-from datetime import datetime, timedelta
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
+from datetime import datetime
 
-from app.core.config import settings
+from app.core.periods import validate_periods
+from app.core.responses import buffer_response
+from app.services.holiday_calendar import holiday_calendars
+from app.services.ktp_calendar import LessonCalendar
+from app.services.ktp_writer import XLSX_MEDIA_TYPE, write_schedule_xlsx
+from app.services.generation_executor import generation_executor, GenerationQueueFull, GenerationTimeout
+from app.core.tracing import tracer
 
 # Основной роутер для API v2
 router = APIRouter(prefix="/api/ktp", tags=["КТП генератор"])
@@ -32,69 +32,48 @@ def is_weekend(date):
     """Проверяет, является ли дата выходным"""
     return date.weekday() >= 5
 
-def generate_schedule(start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates):
-    """Генерирует расписание уроков"""
-    schedule = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        # Пропускаем выходные
-        if current_date.weekday() in weekdays:
-            # Проверяем, не праздник ли это
-            date_str = current_date.strftime('%d.%m.%Y')
-            if date_str not in holidays and date_str not in vacation_dates:
-                # Добавляем дату в расписание столько раз, сколько уроков в этот день
-                weekday_index = current_date.weekday()
-                if weekday_index < len(lessons_per_day):
-                    lessons_count = lessons_per_day[weekday_index]
-                    for _ in range(lessons_count):
-                        schedule.append({
-                            'date': format_date(current_date)
-                        })
-        
-        current_date += timedelta(days=1)
+def build_calendar(start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates, holiday_calendar=None):
+    """
+    Календарь уроков (строится векторно, см. LessonCalendar)
     
-    return schedule
+    holiday_calendar — код календаря праздников региона (ru, kz, by, ua),
+    его праздники исключаются вместе с holidays.
+    """
+    return LessonCalendar.build(
+        start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates,
+        holiday_calendars.get(holiday_calendar)
+    )
 
-def create_excel_schedule(schedule, filename):
-    """Создает Excel файл с расписанием"""
-    # Создаем DataFrame
-    df = pd.DataFrame(schedule)
-    
-    # Создаем Excel файл
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Расписание"
-    
-    # Заголовки
-    headers = ['Дата']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center")
-    
-    # Данные
-    for row in dataframe_to_rows(df, index=False, header=False):
-        ws.append(row)
-    
-    # Автоматическая ширина столбцов
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+def generate_schedule(start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates, holiday_calendar=None):
+    """Генерирует расписание уроков"""
+    calendar = build_calendar(
+        start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates, holiday_calendar
+    )
+    return [{'date': label} for label in calendar.labels()]
+
+def create_excel_schedule(schedule):
+    """Создает Excel файл с расписанием (в памяти)"""
+    return write_schedule_xlsx(row['date'] for row in schedule)
+
+def build_ktp_excel(start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates,
+                    holiday_calendar=None):
+    """
+    Расписание и Excel файл одной задачей (выполняется в пуле генерации)
     
-    # Сохраняем файл
-    filepath = os.path.join(settings.temp_dir, f"{filename}.xlsx")
-    wb.save(filepath)
-    return filepath
+    Returns:
+        (содержимое XLSX или None, если расписание пустое; количество уроков)
+    """
+    with tracer.span("ktp.excel"):
+        with tracer.span("ktp.schedule") as span:
+            calendar = build_calendar(
+                start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates, holiday_calendar
+            )
+            lessons_count = len(calendar)
+            span.set(lessons=lessons_count)
+        if not lessons_count:
+            return None, 0
+        with tracer.span("ktp.write", rows=lessons_count):
+            return write_schedule_xlsx(calendar.labels()), lessons_count
 
 @router.post("/generate")
 async def generate_ktp_schedule(
@@ -105,7 +84,8 @@ async def generate_ktp_schedule(
     lessons_per_day: List[int] = Form(...),
     holidays: List[str] = Form(default=[]),
     vacation: List[str] = Form(default=[]),
-    file_name: str = Form("schedule")
+    file_name: str = Form("schedule"),
+    holiday_calendar: Optional[str] = Form(None)
 ):
     """
     Генерация календарно-тематического планирования
@@ -116,12 +96,21 @@ async def generate_ktp_schedule(
     - `weekdays`: Рабочие дни недели (0-6, где 0=понедельник)
     - `lessons_per_day`: Количество уроков в каждый день недели
     - `holidays`: Список праздничных дат (DD.MM.YYYY)
-    - `vacation`: Список дат каникул (DD.MM.YYYY)
+    - `vacation`: Каникулы — периоды (DD.MM.YYYY..DD.MM.YYYY) или отдельные дни (DD.MM.YYYY)
     - `file_name`: Имя файла для сохранения
+    - `holiday_calendar`: Календарь праздников региона (`ru`, `kz`, `by`, `ua`;
+      также коды языков `kk`, `be`, `uk`) — его праздники не нужно перечислять в `holidays`
     """
     
     start_time = time.time()
     
+    # Календарь праздников передается в пул генерации кодом региона
+    if holiday_calendar:
+        try:
+            holiday_calendar = holiday_calendars.get(holiday_calendar).code
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # Парсим даты
         start = datetime.strptime(start_date, '%Y-%m-%d')
@@ -140,6 +129,9 @@ async def generate_ktp_schedule(
                 detail="Необходимо выбрать хотя бы один рабочий день"
             )
         
+        # Периоды каникул (ValueError — ответ 400)
+        validate_periods(vacation)
+        
         # Проверяем, что количество уроков соответствует дням недели
         if len(lessons_per_day) != 7:
             raise HTTPException(
@@ -147,34 +139,36 @@ async def generate_ktp_schedule(
                 detail="Количество уроков должно быть указано для всех 7 дней недели"
             )
         
-        # Генерируем расписание
-        schedule = generate_schedule(
-            start, end, weekdays, lessons_per_day, holidays, vacation
+        # Генерируем расписание и Excel файл в пуле генерации, вне event loop
+        excel_data, lessons_count = await generation_executor.run(
+            build_ktp_excel,
+            start, end, weekdays, lessons_per_day, holidays, vacation, holiday_calendar
         )
         
-        if not schedule:
+        if excel_data is None:
             raise HTTPException(
                 status_code=400,
                 detail="Не удалось сгенерировать расписание. Проверьте параметры."
             )
         
-        # Создаем Excel файл
-        excel_path = create_excel_schedule(schedule, file_name)
-        
         # Измеряем время обработки
         processing_time = int((time.time() - start_time) * 1000)
         
-        # Возвращаем файл
-        return FileResponse(
-            excel_path,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        # Отдаем файл прямо из памяти
+        return buffer_response(
+            excel_data,
+            media_type=XLSX_MEDIA_TYPE,
             filename=f"{file_name}.xlsx",
             headers={
                 'X-Processing-Time': str(processing_time),
-                'X-Lessons-Count': str(len(schedule))
+                'X-Lessons-Count': str(lessons_count)
             }
         )
         
+    except GenerationQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except GenerationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except ValueError as e:
         raise HTTPException(
             status_code=400,
@@ -186,6 +180,21 @@ async def generate_ktp_schedule(
             detail=f"Ошибка генерации расписания: {str(e)}"
         )
 
+@router.get("/holiday-calendars")
+async def list_holiday_calendars(year: Optional[int] = None):
+    """
+    Доступные календари праздников (для параметра `holiday_calendar`)
+    
+    С параметром `year` для каждого календаря возвращаются праздничные дни года (DD.MM.YYYY).
+    """
+    calendars = []
+    for info in holiday_calendars.available():
+        if year is not None:
+            dates = holiday_calendars.get(info["code"]).dates(year)
+            info = {**info, "holidays": [day.strftime('%d.%m.%Y') for day in dates]}
+        calendars.append(info)
+    return {"calendars": calendars}
+
 # Legacy endpoint
 @legacy_router.post("/ktp-generator")
 async def legacy_ktp_generator(
@@ -196,10 +205,11 @@ async def legacy_ktp_generator(
     lessons_per_day: List[int] = Form(...),
     holidays: List[str] = Form(default=[]),
     vacation: List[str] = Form(default=[]),
-    file_name: str = Form("schedule")
+    file_name: str = Form("schedule"),
+    holiday_calendar: Optional[str] = Form(None)
 ):
     """Legacy endpoint для совместимости"""
     return await generate_ktp_schedule(
         request, start_date, end_date, weekdays, 
-        lessons_per_day, holidays, vacation, file_name
+        lessons_per_day, holidays, vacation, file_name, holiday_calendar
     ) 
\ No newline at end of file
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException, Form, Request
-from fastapi.responses import FileResponse
-from typing import List
-import os
+from fastapi import APIRouter, HTTPException, Form, Request, Response
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
 import time
-from app.services.math_generator import generate_math_pdf, generate_both_math_pdfs
-from app.models.schemas import MathGeneratorRequest, MathOperation
+from app.services.math_generator import generate_example_batch, render_math_pdf, render_both_math_pdfs
+from app.models.schemas import MathGeneratorRequest, MathOperation, MathBatchRequest, WorksheetVariant
 from app.core.config import settings
+from app.core.responses import buffer_response, build_zip_archive, iterator_response, iter_zip_archive
+from app.services.generation_executor import generation_executor, GenerationQueueFull, GenerationTimeout
+from app.services.worksheet_cache import worksheet_cache
+from app.services.worksheet_formats import FORMAT_MEDIA_TYPES, NotAcceptable, negotiate_format, render_batch_format
+from app.services.worksheet_pool import worksheet_pool
+from app.services.worksheet_stream import stream_math_pdf
 
 # Основной роутер для API v2
 router = APIRouter(prefix="/api/math", tags=["Математический генератор"])
@@ -13,6 +18,36 @@ router = APIRouter(prefix="/api/math", tags=["Математический ге
 # Legacy роутер для совместимости
 legacy_router = APIRouter(prefix="/api", tags=["Математический генератор (Legacy)"])
 
+async def render_worksheet(math_request: MathGeneratorRequest, variant: str) -> Tuple[bytes, str]:
+    """
+    Рендеринг одного варианта листа в пуле генерации
+    
+    Запросы с зерном сначала ищутся в кэше рабочих листов, запросы без
+    зерна — в пуле готовых листов популярных наборов параметров.
+    
+    Returns:
+        (PDF, статус кэша: HIT / MISS / POOL / BYPASS)
+    """
+    if math_request.seed is None:
+        pdf_data = worksheet_pool.take(math_request, variant)
+        if pdf_data is not None:
+            return pdf_data, "POOL"
+        pdf_data = await generation_executor.run(render_math_pdf, math_request, variant == "teacher")
+        return pdf_data, "BYPASS"
+    
+    cache_key = worksheet_cache.make_key(math_request, variant)
+    pdf_data = await asyncio.to_thread(worksheet_cache.get, cache_key)
+    if pdf_data is not None:
+        return pdf_data, "HIT"
+    
+    pdf_data = await generation_executor.run(render_math_pdf, math_request, variant == "teacher")
+    await asyncio.to_thread(worksheet_cache.put, cache_key, pdf_data)
+    return pdf_data, "MISS"
+
+def render_preview(math_request: MathGeneratorRequest, output_format: str, for_teacher: bool) -> bytes:
+    """Лист в легком формате (json, svg, html): генерация примеров без рендеринга PDF"""
+    return render_batch_format(generate_example_batch(math_request), output_format, for_teacher)
+
 @router.post("/generate")
 async def generate_math_problems(
     request: Request,
@@ -20,8 +55,10 @@ async def generate_math_problems(
     operations: List[str] = Form(..., alias="operations"),
     interval_start: int = Form(0, ge=-1000, le=1000),
     interval_end: int = Form(100, ge=-1000, le=1000),
-    example_count: int = Form(10, ge=1, le=100),
-    for_teacher: bool = Form(False)
+    example_count: int = Form(10, ge=1, le=settings.max_examples),
+    for_teacher: bool = Form(False),
+    seed: Optional[int] = Form(None, ge=0),
+    format: Optional[str] = Form(None)
 ):
     """
     Генерация математических примеров
@@ -31,12 +68,25 @@ async def generate_math_problems(
     - `operations`: Операции (+, -, *, /)
     - `interval_start`: Начало диапазона чисел
     - `interval_end`: Конец диапазона чисел  
-    - `example_count`: Количество примеров (1-100)
+    - `example_count`: Количество примеров (1-10000). Больше
+      `math_stream_threshold` — PDF отдается потоково, по мере готовности страниц
     - `for_teacher`: True - для учителя (с ответами), False - для ученика (без ответов, в сетке)
+    - `seed`: Зерно генерации (необязательно). С зерном примеры воспроизводимы,
+      а готовый PDF кэшируется и при повторном запросе отдается без рендеринга
+    - `format`: Формат ответа — `pdf` (по умолчанию), `json` (список примеров
+      для предпросмотра), `svg` (лист с сеткой) или `html` (страница для печати).
+      Без параметра формат выбирается по заголовку `Accept`
     """
     
     start_time = time.time()
     
+    try:
+        output_format = negotiate_format(format, request.headers.get("accept"))
+    except NotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # Валидация операций
         valid_operations = ['+', '-', '*', '/']
@@ -54,31 +104,109 @@ async def generate_math_problems(
             operations=[MathOperation(value=op) for op in filtered_operations],
             interval_start=interval_start,
             interval_end=interval_end,
-            example_count=example_count
+            example_count=example_count,
+            seed=seed
         )
         
-        # Генерируем PDF
-        pdf_path = generate_math_pdf(math_request, for_teacher=for_teacher)
-        
-        # Формируем имя файла
         variant = "teacher" if for_teacher else "student"
+        
+        # Легкие форматы: примеры раскладываются так же, как в PDF, но без
+        # рендеринга документа; маленькие листы — прямо в обработчике
+        if output_format != "pdf":
+            if example_count > settings.math_stream_threshold:
+                data = await generation_executor.run(render_preview, math_request, output_format, for_teacher)
+            else:
+                data = render_preview(math_request, output_format, for_teacher)
+            
+            processing_time = int((time.time() - start_time) * 1000)
+            filename = f"math_examples_{example_count}_{variant}.{output_format}"
+            return Response(
+                content=data,
+                media_type=FORMAT_MEDIA_TYPES[output_format],
+                headers={
+                    'Content-Disposition': f'inline; filename="{filename}"',
+                    'Vary': 'Accept',
+                    'X-Processing-Time': str(processing_time),
+                    'X-Examples-Count': str(example_count),
+                    'X-Variant': variant,
+                    'X-Cache': 'BYPASS'
+                }
+            )
+        
         filename = f"math_examples_{example_count}_{variant}.pdf"
         
+        # Большие тиражи отдаем потоково: страницы готовятся в пуле генерации
+        # и уходят клиенту по мере готовности, документ не копится в памяти
+        if example_count > settings.math_stream_threshold:
+            cache_key = worksheet_cache.make_key(math_request, variant) if seed is not None else None
+            pdf_data = await asyncio.to_thread(worksheet_cache.get, cache_key) if cache_key else None
+            if pdf_data is not None:
+                return buffer_response(
+                    pdf_data,
+                    media_type='application/pdf',
+                    filename=filename,
+                    headers={
+                        'Vary': 'Accept',
+                        'X-Processing-Time': str(int((time.time() - start_time) * 1000)),
+                        'X-Examples-Count': str(example_count),
+                        'X-Variant': variant,
+                        'X-Cache': 'HIT'
+                    }
+                )
+            
+            stream = stream_math_pdf(math_request, for_teacher)
+            # Раскладка и первая группа страниц готовятся до ответа,
+            # чтобы ошибки генерации (и 503/504) вернулись клиенту кодом ошибки
+            head = [await stream.__anext__(), await stream.__anext__()]
+            
+            async def chunks() -> AsyncIterator[bytes]:
+                # С зерном готовый файл после отдачи попадает в кэш
+                parts = list(head) if cache_key else None
+                for chunk in head:
+                    yield chunk
+                async for chunk in stream:
+                    if parts is not None:
+                        parts.append(chunk)
+                    yield chunk
+                if parts is not None:
+                    await asyncio.to_thread(worksheet_cache.put, cache_key, b"".join(parts))
+            
+            return iterator_response(
+                chunks(),
+                media_type='application/pdf',
+                filename=filename,
+                headers={
+                    'Vary': 'Accept',
+                    'X-Examples-Count': str(example_count),
+                    'X-Variant': variant,
+                    'X-Cache': 'MISS' if cache_key else 'BYPASS'
+                }
+            )
+        
+        # Генерируем PDF в памяти (в пуле генерации, вне event loop; с зерном — через кэш)
+        pdf_data, cache_status = await render_worksheet(math_request, variant)
+        
         # Измеряем время обработки
         processing_time = int((time.time() - start_time) * 1000)
         
-        # Возвращаем файл
-        return FileResponse(
-            pdf_path,
+        # Отдаем файл потоком прямо из памяти
+        return buffer_response(
+            pdf_data,
             media_type='application/pdf',
             filename=filename,
             headers={
+                'Vary': 'Accept',
                 'X-Processing-Time': str(processing_time),
                 'X-Examples-Count': str(example_count),
-                'X-Variant': variant
+                'X-Variant': variant,
+                'X-Cache': cache_status
             }
         )
         
+    except GenerationQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except GenerationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -92,7 +220,8 @@ async def generate_both_math_pdfs_endpoint(
     operations: List[str] = Form(..., alias="operations"),
     interval_start: int = Form(0, ge=-1000, le=1000),
     interval_end: int = Form(100, ge=-1000, le=1000),
-    example_count: int = Form(10, ge=1, le=100)
+    example_count: int = Form(10, ge=1, le=100),
+    seed: Optional[int] = Form(None, ge=0)
 ):
     """
     Генерация ОБОИХ вариантов PDF с ОДИНАКОВЫМИ примерами
@@ -103,6 +232,7 @@ async def generate_both_math_pdfs_endpoint(
     - `interval_start`: Начало диапазона чисел
     - `interval_end`: Конец диапазона чисел  
     - `example_count`: Количество примеров (1-100)
+    - `seed`: Зерно генерации (необязательно), включает кэширование PDF
     
     **Возвращает:** ZIP архив с двумя PDF файлами
     """
@@ -126,47 +256,137 @@ async def generate_both_math_pdfs_endpoint(
             operations=[MathOperation(value=op) for op in filtered_operations],
             interval_start=interval_start,
             interval_end=interval_end,
-            example_count=example_count
+            example_count=example_count,
+            seed=seed
         )
         
-        # Генерируем ОБА PDF с ОДИНАКОВЫМИ примерами
-        student_pdf, teacher_pdf = generate_both_math_pdfs(math_request)
-        
-        # Создаем ZIP архив
-        import zipfile
-        import tempfile
+        # Варианты кэшируются по отдельности — общие записи с /generate
+        student_key = worksheet_cache.make_key(math_request, "student") if seed is not None else None
+        teacher_key = worksheet_cache.make_key(math_request, "teacher") if seed is not None else None
+        student_pdf = await asyncio.to_thread(worksheet_cache.get, student_key) if student_key else None
+        teacher_pdf = await asyncio.to_thread(worksheet_cache.get, teacher_key) if teacher_key else None
+        cache_status = "HIT" if student_pdf is not None and teacher_pdf is not None else "MISS"
         
-        temp_dir = settings.temp_dir
-        os.makedirs(temp_dir, exist_ok=True)
+        if cache_status == "MISS":
+            # ОБА PDF с ОДИНАКОВЫМИ примерами: одна верстка основы в пуле генерации,
+            # лист учителя — наложение ответов на ее копию
+            student_pdf, teacher_pdf = await render_both_math_pdfs(math_request)
+            if seed is not None:
+                await asyncio.to_thread(worksheet_cache.put, student_key, student_pdf)
+                await asyncio.to_thread(worksheet_cache.put, teacher_key, teacher_pdf)
         
-        zip_path = tempfile.NamedTemporaryFile(delete=False, suffix='.zip', dir=temp_dir)
-        
-        with zipfile.ZipFile(zip_path.name, 'w') as zip_file:
-            # Добавляем PDF для ученика
-            zip_file.write(student_pdf, f"math_examples_{example_count}_student.pdf")
-            # Добавляем PDF для учителя
-            zip_file.write(teacher_pdf, f"math_examples_{example_count}_teacher.pdf")
+        # Собираем ZIP архив в памяти из готовых буферов
+        zip_data = build_zip_archive({
+            f"math_examples_{example_count}_student.pdf": student_pdf,
+            f"math_examples_{example_count}_teacher.pdf": teacher_pdf,
+        })
         
         # Измеряем время обработки
         processing_time = int((time.time() - start_time) * 1000)
         
         # Возвращаем ZIP архив
-        return FileResponse(
-            zip_path.name,
+        return buffer_response(
+            zip_data,
             media_type='application/zip',
             filename=f"math_examples_{example_count}_both_variants.zip",
             headers={
                 'X-Processing-Time': str(processing_time),
                 'X-Examples-Count': str(example_count),
-                'X-Variant': 'both'
+                'X-Variant': 'both',
+                'X-Cache': cache_status if seed is not None else 'BYPASS'
             }
         )
         
+    except GenerationQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except GenerationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка генерации PDF: {str(e)}"
+        )
+
+async def _render_batch(batch: MathBatchRequest) -> AsyncIterator[Tuple[str, bytes]]:
+    """Параллельный рендеринг листов пакета; готовые файлы отдаются по мере завершения"""
+    semaphore = asyncio.Semaphore(generation_executor.workers)
+    width = len(str(len(batch.worksheets)))
+    variant = batch.variant.value
+    
+    async def render(index: int, math_request: MathGeneratorRequest) -> List[Tuple[str, bytes]]:
+        prefix = f"{index:0{width}d}_math_examples_{math_request.example_count}"
+        async with semaphore:
+            if variant == WorksheetVariant.BOTH.value:
+                student_pdf, teacher_pdf = await render_both_math_pdfs(math_request)
+                return [(f"{prefix}_student.pdf", student_pdf), (f"{prefix}_teacher.pdf", teacher_pdf)]
+            pdf_data, _ = await render_worksheet(math_request, variant)
+            return [(f"{prefix}_{variant}.pdf", pdf_data)]
+    
+    tasks = [
+        asyncio.ensure_future(render(index, math_request))
+        for index, math_request in enumerate(batch.worksheets, start=1)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for name, data in await next_done:
+                yield name, data
+    finally:
+        # Клиент отключился или рендер упал — остальные листы не нужны
+        for task in tasks:
+            task.cancel()
+
+@router.post("/generate-batch")
+async def generate_math_batch(batch: MathBatchRequest):
+    """
+    Пакетная генерация рабочих листов одним архивом
+    
+    Принимает список параметров листов (например, 30 разных вариантов, чтобы
+    ученики не списывали). Разные листы рендерятся одновременно в пуле
+    генерации (в варианте `both` каждый лист — одна верстка основы плюс
+    наложение ответов для учителя), а ZIP архив собирается и отдается
+    потоково: каждый лист попадает в ответ, как только готов.
+    
+    **Параметры:**
+    - `worksheets`: Список параметров листов (как у `/generate`, до 100 листов)
+    - `variant`: `student`, `teacher` или `both` (оба варианта каждого листа)
+    
+    **Возвращает:** ZIP архив с PDF файлами
+    """
+    for math_request in batch.worksheets:
+        if math_request.example_count > settings.math_stream_threshold:
+            raise HTTPException(
+                status_code=400,
+                detail=f"В пакете не более {settings.math_stream_threshold} примеров на лист"
+            )
+    
+    archive = iter_zip_archive(_render_batch(batch))
+    try:
+        # Первый лист готовим до ответа, чтобы ошибки вернулись кодом ошибки
+        first_chunk = await archive.__anext__()
+    except GenerationQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except GenerationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка генерации PDF: {str(e)}"
         )
+    
+    async def chunks() -> AsyncIterator[bytes]:
+        yield first_chunk
+        async for chunk in archive:
+            yield chunk
+    
+    return iterator_response(
+        chunks(),
+        media_type='application/zip',
+        filename=f"math_worksheets_{len(batch.worksheets)}_{batch.variant.value}.zip",
+        headers={
+            'X-Worksheets-Count': str(len(batch.worksheets)),
+            'X-Variant': batch.variant.value
+        }
+    )
 
 # Legacy endpoint
 @legacy_router.post("/math-generator")
@@ -176,13 +396,15 @@ async def legacy_math_generator(
     operations: List[str] = Form(..., alias="operations"),
     interval_start: int = Form(0, ge=-1000, le=1000),
     interval_end: int = Form(100, ge=-1000, le=1000),
-    example_count: int = Form(10, ge=1, le=100),
-    for_teacher: bool = Form(False)
+    example_count: int = Form(10, ge=1, le=settings.max_examples),
+    for_teacher: bool = Form(False),
+    seed: Optional[int] = Form(None, ge=0),
+    format: Optional[str] = Form(None)
 ):
     """Legacy endpoint для совместимости"""
     return await generate_math_problems(
         request, num_operands, operations, 
-        interval_start, interval_end, example_count, for_teacher
+        interval_start, interval_end, example_count, for_teacher, seed, format
     )
 
 @legacy_router.post("/math-generator-both")
@@ -192,10 +414,11 @@ async def legacy_math_generator_both(
     operations: List[str] = Form(..., alias="operations"),
     interval_start: int = Form(0, ge=-1000, le=1000),
     interval_end: int = Form(100, ge=-1000, le=1000),
-    example_count: int = Form(10, ge=1, le=100)
+    example_count: int = Form(10, ge=1, le=100),
+    seed: Optional[int] = Form(None, ge=0)
 ):
     """Legacy endpoint для скачивания обоих вариантов"""
     return await generate_both_math_pdfs_endpoint(
         request, num_operands, operations, 
-        interval_start, interval_end, example_count
+        interval_start, interval_end, example_count, seed
     ) 
\ No newline at end of file
@@ -2,13 +2,14 @@ from fastapi import APIRouter
 from fastapi.responses import FileResponse
 import tempfile
 import os
-import pandas as pd
 
 router = APIRouter(prefix="/api/test", tags=["Тест"])
 
 @router.get("/simple-excel")
 async def simple_excel():
     """Простой тест возврата Excel файла"""
+    # pandas загружается при вызове теста, а не при запуске приложения
+    import pandas as pd
     
     # Создаем временный файл
     temp_dir = "/app/temp"
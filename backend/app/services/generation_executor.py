@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationError(Exception):
+    """Базовая ошибка исполнителя генераций"""
+
+
+class GenerationQueueFull(GenerationError):
+    """Очередь генераций переполнена"""
+
+
+class GenerationTimeout(GenerationError):
+    """Генерация не уложилась в таймаут"""
+
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float, float]:
+    """Выполнение задачи в воркере с замером времени начала и длительности"""
+    started_at = time.time()
+    result = func(*args, **kwargs)
+    return result, started_at, time.time() - started_at
+
+
+class GenerationExecutor:
+    """
+    Исполнитель CPU-задач генерации (PDF, XLSX)
+    
+    Синхронный рендеринг fpdf2/openpyxl/pandas выполняется в пуле процессов
+    (или потоков, если процессы недоступны), чтобы не блокировать event loop.
+    Очередь ограничена, у каждой задачи есть таймаут, собираются метрики
+    ожидания в очереди и времени выполнения.
+    """
+    
+    def __init__(
+        self,
+        mode: str = "process",
+        workers: int = 0,
+        max_queue: int = 32,
+        timeout: float = 60
+    ):
+        self.requested_mode = mode
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+        }
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._run_time_total = 0.0
+        self._run_time_max = 0.0
+    
+    def _create_executor(self) -> Executor:
+        """Создание пула: процессы, с откатом на потоки"""
+        if self.mode == "process":
+            try:
+                return ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            except (OSError, NotImplementedError, ImportError) as e:
+                logger.warning(f"Пул процессов недоступен, используем потоки: {e}")
+                self.mode = "thread"
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="generation")
+    
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._create_executor()
+            logger.info(f"⚙️ Исполнитель генераций: {self.mode}, воркеров: {self.workers}")
+        return self._executor
+    
+    def _fallback_to_threads(self):
+        """Переход на пул потоков, если пул процессов сломался"""
+        logger.error("Пул процессов генерации сломан, переключаемся на потоки")
+        broken = self._executor
+        self.mode = "thread"
+        self._executor = None
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+    
+    def _on_done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+    
+    def _record(self, submitted_at: float, started_at: float, run_time: float):
+        queue_wait = max(0.0, started_at - submitted_at)
+        with self._lock:
+            self._stats["completed"] += 1
+            self._queue_wait_total += queue_wait
+            self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+            self._run_time_total += run_time
+            self._run_time_max = max(self._run_time_max, run_time)
+    
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Выполнение функции в пуле генерации
+        
+        Args:
+            func: Функция верхнего уровня модуля (должна сериализоваться для процессов)
+            timeout: Таймаут в секундах (по умолчанию из настроек)
+            
+        Raises:
+            GenerationQueueFull: Очередь переполнена
+            GenerationTimeout: Задача не уложилась в таймаут
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise GenerationQueueFull("Сервер генерации перегружен, попробуйте позже")
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+        
+        submitted_at = time.time()
+        try:
+            try:
+                future = self._get_executor().submit(_timed_call, func, args, kwargs)
+            except BrokenProcessPool:
+                self._fallback_to_threads()
+                future = self._get_executor().submit(_timed_call, func, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        
+        try:
+            result, started_at, run_time = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise GenerationTimeout("Превышено время генерации файла")
+        except BrokenProcessPool:
+            # Процесс-воркер упал: переходим на потоки и повторяем задачу один раз
+            with self._lock:
+                self._stats["failed"] += 1
+            if self.mode != "process":
+                raise GenerationError("Воркер генерации аварийно завершился")
+            self._fallback_to_threads()
+            return await self.run(func, *args, timeout=timeout, **kwargs)
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+        
+        self._record(submitted_at, started_at, run_time)
+        return result
+    
+    def start(self):
+        """Создание пула и прогрев воркеров при запуске приложения"""
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(os.getpid)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики исполнителя"""
+        with self._lock:
+            completed = self._stats["completed"]
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                **self._stats,
+                "queue_wait_ms": {
+                    "avg": round(self._queue_wait_total / completed * 1000, 2) if completed else 0.0,
+                    "max": round(self._queue_wait_max * 1000, 2),
+                },
+                "run_time_ms": {
+                    "avg": round(self._run_time_total / completed * 1000, 2) if completed else 0.0,
+                    "max": round(self._run_time_max * 1000, 2),
+                },
+            }
+    
+    def shutdown(self):
+        """Остановка пула"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Глобальный исполнитель генераций
+generation_executor = GenerationExecutor(
+    mode=settings.generation_executor,
+    workers=settings.generation_workers,
+    max_queue=settings.generation_max_queue,
+    timeout=settings.generation_timeout
+)
@@ -0,0 +1,215 @@
+import json
+import logging
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.periods import EPOCH
+from app.models.schemas import HOLIDAY_CALENDAR_CODES, LANGUAGE_REGIONS
+
+logger = logging.getLogger(__name__)
+
+# Файлы календарей праздников поставляются вместе с приложением (без сети)
+HOLIDAYS_DIR = Path(__file__).resolve().parent.parent / "data" / "holidays"
+
+
+# Годы, для которых наборы праздников строятся при загрузке (от текущего)
+PRELOAD_YEARS_BEFORE = 1
+PRELOAD_YEARS_AFTER = 2
+
+
+def orthodox_easter(year: int) -> date:
+    """Дата православной Пасхи (по григорианскому календарю, 1900-2099)"""
+    a, b, c = year % 4, year % 7, year % 19
+    d = (19 * c + 15) % 30
+    e = (2 * a + 4 * b - d + 34) % 7
+    month, day = divmod(d + e + 114, 31)
+    return date(year, month, day + 1) + timedelta(days=13)
+
+
+def _month_day(year: int, value: str) -> Optional[date]:
+    """Дата из строки "ММ-ДД" в заданном году (None для 29.02 в невисокосный год)"""
+    month, day = map(int, value.split("-"))
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+class HolidayCalendar:
+    """
+    Календарь праздничных дней одного региона
+
+    Описание (постоянные даты, смещения от Пасхи, переносы и даты по годам)
+    загружается из файла; для каждого года один раз строится неизменяемое
+    множество номеров дней, после чего проверка дня — O(1).
+    """
+
+    __slots__ = ("code", "name", "note", "fixed", "easter_offsets", "transfer_weekends",
+                 "no_transfer", "years", "_year_days", "_lock")
+
+    def __init__(self, code: str, name: str, fixed: Sequence[str], easter_offsets: Sequence[int] = (),
+                 transfer_weekends: bool = False, no_transfer: Sequence[str] = (),
+                 years: Optional[Dict[str, List[str]]] = None, note: str = ""):
+        self.code = code
+        self.name = name
+        self.note = note
+        self.fixed = tuple(fixed)
+        self.easter_offsets = tuple(easter_offsets)
+        self.transfer_weekends = transfer_weekends
+        self.no_transfer = frozenset(no_transfer)
+        self.years = {int(year): tuple(days) for year, days in (years or {}).items()}
+        self._year_days: Dict[int, FrozenSet[int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Path) -> "HolidayCalendar":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            code=data["code"],
+            name=data["name"],
+            fixed=data["fixed"],
+            easter_offsets=data.get("easter_offsets", ()),
+            transfer_weekends=data.get("transfer_weekends", False),
+            no_transfer=data.get("no_transfer", ()),
+            years=data.get("years"),
+            note=data.get("note", ""),
+        )
+
+    def _build_year(self, year: int) -> FrozenSet[int]:
+        """Праздничные (нерабочие) дни года"""
+        holidays = set()
+        transferable = []
+        for value in self.fixed:
+            day = _month_day(year, value)
+            if day is None:
+                continue
+            holidays.add(day)
+            if value not in self.no_transfer:
+                transferable.append(day)
+
+        easter = orthodox_easter(year)
+        holidays.update(easter + timedelta(days=offset) for offset in self.easter_offsets)
+        holidays.update(filter(None, (_month_day(year, value) for value in self.years.get(year, ()))))
+
+        # Праздник в выходной — выходным становится следующий рабочий день
+        if self.transfer_weekends:
+            for day in sorted(transferable):
+                if day.weekday() < 5:
+                    continue
+                moved = day + timedelta(days=1)
+                while moved.weekday() >= 5 or moved in holidays:
+                    moved += timedelta(days=1)
+                holidays.add(moved)
+
+        return frozenset((day - EPOCH).days for day in holidays)
+
+    def year_days(self, year: int) -> FrozenSet[int]:
+        """Номера праздничных дней года (строится один раз на год)"""
+        days = self._year_days.get(year)
+        if days is None:
+            with self._lock:
+                days = self._year_days.get(year)
+                if days is None:
+                    days = self._year_days[year] = self._build_year(year)
+        return days
+
+    def __contains__(self, value: date) -> bool:
+        return (value - EPOCH).days in self.year_days(value.year)
+
+    def days_between(self, first: int, last: int) -> np.ndarray:
+        """Праздничные дни между номерами дней first и last включительно (номера от 1970-01-01)"""
+        first_year = (EPOCH + timedelta(days=first)).year
+        last_year = (EPOCH + timedelta(days=last)).year
+        days = [
+            day
+            for year in range(first_year, last_year + 1)
+            for day in self.year_days(year)
+            if first <= day <= last
+        ]
+        return np.array(sorted(days), dtype=np.int64)
+
+    def dates(self, year: int) -> List[date]:
+        """Праздничные дни года по порядку"""
+        return [EPOCH + timedelta(days=day) for day in sorted(self.year_days(year))]
+
+    def info(self) -> Dict:
+        return {
+            "code": self.code,
+            "name": self.name,
+            "note": self.note,
+            "years": sorted(self.years),
+        }
+
+
+class HolidayCalendarService:
+    """
+    Календари праздников всех регионов
+
+    Файлы читаются один раз (при запуске приложения или при первом
+    обращении), наборы дней на ближайшие годы строятся заранее.
+    """
+
+    def __init__(self, directory: Path = HOLIDAYS_DIR):
+        self.directory = directory
+        self.calendars: Dict[str, HolidayCalendar] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            calendars = {}
+            for path in sorted(self.directory.glob("*.json")):
+                try:
+                    calendar = HolidayCalendar.from_file(path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error(f"Календарь праздников {path.name} не загружен: {e}")
+                    continue
+                calendars[calendar.code] = calendar
+
+            this_year = date.today().year
+            for calendar in calendars.values():
+                for year in range(this_year - PRELOAD_YEARS_BEFORE, this_year + PRELOAD_YEARS_AFTER + 1):
+                    calendar.year_days(year)
+
+            missing = set(HOLIDAY_CALENDAR_CODES) - set(calendars)
+            if missing:
+                logger.warning(f"Нет файлов календарей праздников: {', '.join(sorted(missing))}")
+
+            self.calendars = calendars
+            self._loaded = True
+            logger.info(f"Календари праздников: {', '.join(calendars) or 'нет'}")
+
+    def resolve(self, code: str) -> str:
+        """Код региона по коду региона или языка интерфейса (kk -> kz)"""
+        code = code.strip().lower()
+        return LANGUAGE_REGIONS.get(code, code)
+
+    def get(self, code: Optional[str]) -> Optional[HolidayCalendar]:
+        """
+        Календарь по коду региона (ru, kz, by, ua) или языка (ru, kk, be, uk)
+
+        Raises:
+            ValueError: Неизвестный календарь
+        """
+        if not code:
+            return None
+        self.load()
+        calendar = self.calendars.get(self.resolve(code))
+        if calendar is None:
+            raise ValueError(f"Неизвестный календарь праздников: {code}. Доступны: {', '.join(self.calendars)}")
+        return calendar
+
+    def available(self) -> Iterable[Dict]:
+        self.load()
+        return [calendar.info() for calendar in self.calendars.values()]
+
+
+# Глобальный экземпляр календарей праздников
+holiday_calendars = HolidayCalendarService()
@@ -0,0 +1,371 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.responses import build_zip_archive
+from app.models.schemas import KTPGeneratorRequest, MathGeneratorRequest
+from app.services.ktp_writer import XLSX_MEDIA_TYPE
+from app.services.generation_executor import generation_executor, GenerationQueueFull
+from app.services.math_generator import generate_example_batch, render_batch_pdf, render_both_batch_pdfs
+
+logger = logging.getLogger(__name__)
+
+# Статусы задания
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Пауза перед повторной отправкой в переполненный пул генерации
+QUEUE_RETRY_DELAY = 0.5
+
+
+class JobCancelled(Exception):
+    """Задание удалено (возможно, другим воркером) — выполнение прекращается"""
+
+
+class MemoryJobStore:
+    """Состояние заданий в памяти процесса (если Redis недоступен)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._jobs: Dict[str, dict] = {}
+        self._cancelled: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: dict, ttl: int) -> None:
+        with self._lock:
+            self._jobs[job["id"]] = {**job, "_expires": time.time() + ttl}
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["_expires"] < time.time():
+                del self._jobs[job_id]
+                return None
+            return {key: value for key, value in job.items() if key != "_expires"}
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def cancel(self, job_id: str, ttl: int) -> None:
+        """Отметка об удалении задания (проверяется перед каждой записью)"""
+        with self._lock:
+            self._cancelled[job_id] = time.time() + ttl
+
+    def cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            return self._cancelled.get(job_id, 0) >= time.time()
+
+    def expired(self) -> list:
+        """Идентификаторы просроченных заданий (удаляются из хранилища)"""
+        now = time.time()
+        with self._lock:
+            ids = [job_id for job_id, job in self._jobs.items() if job["_expires"] < now]
+            for job_id in ids:
+                del self._jobs[job_id]
+            for job_id in [job_id for job_id, expires in self._cancelled.items() if expires < now]:
+                del self._cancelled[job_id]
+        return ids
+
+
+class RedisJobStore:
+    """
+    Состояние заданий в Redis (общее для всех воркеров uvicorn)
+
+    Просроченные записи удаляет сам Redis по TTL.
+    """
+
+    name = "redis"
+    prefix = "job:"
+
+    def __init__(self, client):
+        self.client = client
+
+    def save(self, job: dict, ttl: int) -> None:
+        self.client.setex(f"{self.prefix}{job['id']}", ttl, json.dumps(job, ensure_ascii=False))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        data = self.client.get(f"{self.prefix}{job_id}")
+        return json.loads(data) if data else None
+
+    def delete(self, job_id: str) -> None:
+        self.client.delete(f"{self.prefix}{job_id}")
+
+    def cancel(self, job_id: str, ttl: int) -> None:
+        """Отметка об удалении задания (видна воркеру, который его выполняет)"""
+        self.client.setex(f"{self.prefix}{job_id}:cancelled", ttl, 1)
+
+    def cancelled(self, job_id: str) -> bool:
+        return bool(self.client.exists(f"{self.prefix}{job_id}:cancelled"))
+
+    def expired(self) -> list:
+        return []
+
+
+def create_job_store():
+    """Redis через RedisService, если он доступен, иначе память процесса"""
+    try:
+        from app.services.redis_service import redis_service
+    except Exception as e:
+        logger.info(f"Задания хранятся в памяти: Redis недоступен ({e})")
+        return MemoryJobStore()
+
+    if redis_service.is_available():
+        return RedisJobStore(redis_service.redis_client)
+    logger.info("Задания хранятся в памяти: Redis недоступен")
+    return MemoryJobStore()
+
+
+# ---- шаги заданий (выполняются в пуле генерации) ----
+
+def render_math_job(batch, variant: str) -> bytes:
+    """PDF нужного варианта или ZIP с обоими вариантами"""
+    if variant == "both":
+        student_pdf, teacher_pdf = render_both_batch_pdfs(batch)
+        return build_zip_archive({
+            f"math_examples_{len(batch)}_student.pdf": student_pdf,
+            f"math_examples_{len(batch)}_teacher.pdf": teacher_pdf,
+        })
+    return render_batch_pdf(batch, variant == "teacher")
+
+
+def build_ktp_job(request: KTPGeneratorRequest):
+    """Расписание и Excel файл в памяти"""
+    from app.routers.ktp import build_ktp_excel
+
+    return build_ktp_excel(
+        request.start_date, request.end_date, request.weekdays, request.lessons_per_day,
+        request.holidays, request.vacation, request.holiday_calendar
+    )
+
+
+class JobManager:
+    """
+    Фоновые задания генерации с опросом статуса
+
+    Задание принимается мгновенно и выполняется в пуле генерации по шагам
+    (генерация примеров, рендеринг, запись), после каждого шага в
+    хранилище обновляются статус и прогресс. Одновременно выполняется не
+    больше max_running заданий; при переполненной очереди пула задание
+    ждет, а не завершается ошибкой. Готовый файл пишется в папку заданий
+    и удаляется вместе с записью по истечении ttl.
+    """
+
+    def __init__(self, results_dir: str, ttl: int, max_running: int):
+        self.results_dir = results_dir
+        self.ttl = ttl
+        self.max_running = max_running
+        self.store = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _get_store(self):
+        if self.store is None:
+            self.store = create_job_store()
+        return self.store
+
+    def _update(self, job: dict, **fields: Any) -> dict:
+        """
+        Запись состояния задания
+
+        Задание могли удалить в другом воркере (его задачу отсюда не
+        отменить): после записи проверяется отметка об удалении, и если
+        она есть, запись снова удаляется, а выполнение прекращается.
+
+        Raises:
+            JobCancelled: Задание удалено
+        """
+        job.update(fields)
+        store = self._get_store()
+        store.save(job, self.ttl)
+        if store.cancelled(job["id"]):
+            store.delete(job["id"])
+            raise JobCancelled(job["id"])
+        return job
+
+    def result_path(self, job: dict) -> str:
+        return os.path.join(self.results_dir, f"{job['id']}{job['extension']}")
+
+    # ---- API ----
+
+    def submit_math(self, request: MathGeneratorRequest, variant: str) -> dict:
+        extension = ".zip" if variant == "both" else ".pdf"
+        job = self._create("math", {"request": request.model_dump(mode="json"), "variant": variant}, extension)
+        job.update(
+            filename=f"math_examples_{request.example_count}_{variant}{extension}",
+            media_type="application/zip" if variant == "both" else "application/pdf",
+        )
+        return self._start(job, self._run_math(job, request, variant))
+
+    def submit_ktp(self, request: KTPGeneratorRequest) -> dict:
+        job = self._create("ktp", request.model_dump(mode="json"), ".xlsx")
+        job.update(
+            filename=f"{request.file_name}.xlsx",
+            media_type=XLSX_MEDIA_TYPE,
+        )
+        return self._start(job, self._run_ktp(job, request))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self._get_store().get(job_id)
+
+    def delete(self, job_id: str) -> bool:
+        """
+        Отмена задания и удаление результата
+
+        Задача этого процесса отменяется сразу; задание, которое выполняет
+        другой воркер, останавливается на следующей записи состояния
+        по отметке об удалении в хранилище.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return False
+        store = self._get_store()
+        store.cancel(job_id, self.ttl)
+        task = self._tasks.pop(job_id, None)
+        if task is not None:
+            task.cancel()
+        store.delete(job_id)
+        self._remove_result(job)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "store": self._get_store().name,
+            "running": sum(1 for task in self._tasks.values() if not task.done()),
+            "max_running": self.max_running,
+            "ttl": self.ttl,
+        }
+
+    async def shutdown(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._slots = None
+
+    # ---- выполнение ----
+
+    def _create(self, kind: str, params: dict, extension: str) -> dict:
+        self._cleanup()
+        return {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": JOB_QUEUED,
+            "stage": "queued",
+            "progress": 0.0,
+            "params": params,
+            "extension": extension,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "size": None,
+            "error": None,
+        }
+
+    def _start(self, job: dict, work: Awaitable[None]) -> dict:
+        self._update(job)
+        task = asyncio.get_running_loop().create_task(self._execute(job, work))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+        return job
+
+    async def _execute(self, job: dict, work: Awaitable[None]) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running)
+        try:
+            async with self._slots:
+                self._update(job, status=JOB_RUNNING, started_at=time.time())
+                await work
+        except asyncio.CancelledError:
+            self._remove_result(job)
+            raise
+        except JobCancelled:
+            logger.info(f"Задание {job['id']} ({job['kind']}) удалено, выполнение остановлено")
+            self._remove_result(job)
+        except Exception as e:
+            logger.error(f"Задание {job['id']} ({job['kind']}) завершилось ошибкой: {e}")
+            self._update(job, status=JOB_FAILED, error=str(e), finished_at=time.time())
+
+    async def _run_step(self, job: dict, stage: str, func: Callable, *args) -> Any:
+        """Шаг в пуле генерации; при переполненной очереди задание ждет"""
+        self._update(job, stage=stage)
+        while True:
+            try:
+                return await generation_executor.run(func, *args)
+            except GenerationQueueFull:
+                if self._get_store().cancelled(job["id"]):
+                    raise JobCancelled(job["id"])
+                await asyncio.sleep(QUEUE_RETRY_DELAY)
+
+    async def _finish(self, job: dict, data: bytes) -> None:
+        self._update(job, stage="writing", progress=0.9)
+        os.makedirs(self.results_dir, exist_ok=True)
+        await asyncio.to_thread(self._write_result, self.result_path(job), data)
+        self._update(job, status=JOB_DONE, stage="done", progress=1.0, size=len(data), finished_at=time.time())
+
+    @staticmethod
+    def _write_result(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def _run_math(self, job: dict, request: MathGeneratorRequest, variant: str) -> None:
+        batch = await self._run_step(job, "sampling", generate_example_batch, request)
+        self._update(job, progress=0.3)
+        data = await self._run_step(job, "rendering", render_math_job, batch, variant)
+        await self._finish(job, data)
+
+    async def _run_ktp(self, job: dict, request: KTPGeneratorRequest) -> None:
+        data, lessons = await self._run_step(job, "rendering", build_ktp_job, request)
+        if data is None:
+            raise ValueError("Не удалось сгенерировать расписание. Проверьте параметры.")
+        self._update(job, lessons=lessons)
+        await self._finish(job, data)
+
+    # ---- очистка ----
+
+    def _remove_result(self, job: dict) -> None:
+        try:
+            os.remove(self.result_path(job))
+        except OSError:
+            pass
+
+    def _cleanup(self) -> None:
+        """Удаление просроченных результатов (файлы старше ttl)"""
+        for job_id in self._get_store().expired():
+            for extension in (".pdf", ".zip", ".xlsx"):
+                self._remove_result({"id": job_id, "extension": extension})
+
+        try:
+            entries = os.scandir(self.results_dir)
+        except OSError:
+            return
+        cutoff = time.time() - self.ttl
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    continue
+
+
+# Глобальный менеджер заданий
+job_manager = JobManager(
+    results_dir=os.path.join(settings.generated_files_dir, "jobs"),
+    ttl=settings.jobs_ttl_seconds,
+    max_running=settings.jobs_max_running or generation_executor.workers,
+)
@@ -0,0 +1,224 @@
+import numpy as np
+from datetime import date
+from typing import Iterable, List, Optional, Sequence
+
+from app.core.periods import (
+    EPOCH,
+    RANGE_SEPARATOR,
+    DateLike,
+    parse_period,
+    to_day_number,
+)
+
+EPOCH_WEEKDAY = EPOCH.weekday()  # 1970-01-01 — четверг (0 = понедельник)
+
+# Подписи "ДД.ММ" для всех дней и месяцев: подпись дня — выборка из таблицы
+_DAY_MONTH_LABELS = np.array(
+    [[f"{day:02d}.{month:02d}" for month in range(1, 13)] for day in range(1, 32)],
+    dtype=object
+)
+
+
+def _parse_iso_days(values: List[str]) -> Optional[np.ndarray]:
+    """
+    Быстрый путь для строк ровно ДД.ММ.ГГГГ: перестановка в ГГГГ-ММ-ДД и
+    разбор всего списка одним вызовом numpy. None — если формат не подошел
+    или numpy отверг дату (тогда строки разбираются по одной).
+    """
+    iso = []
+    for value in values:
+        value = value.strip()
+        if len(value) != 10 or value[2] != "." or value[5] != ".":
+            return None
+        iso.append(f"{value[6:]}-{value[3:5]}-{value[:2]}")
+    try:
+        return np.array(iso, dtype="datetime64[D]").astype(np.int64)
+    except ValueError:
+        return None
+
+
+def to_day_numbers(values: Iterable[DateLike]) -> np.ndarray:
+    """Уникальные номера дней (int64) из списка дат или строк ДД.ММ.ГГГГ"""
+    values = list(values)
+    if values and all(isinstance(value, str) for value in values):
+        numbers = _parse_iso_days(values)
+        if numbers is not None:
+            return np.unique(numbers)
+    numbers = [number for number in map(to_day_number, values) if number is not None]
+    return np.unique(np.array(numbers, dtype=np.int64))
+
+
+class DateIntervals:
+    """
+    Непересекающиеся периоды дат, отсортированные по началу
+
+    Периоды хранятся двумя массивами номеров дней (начала и концы,
+    включительно); пересекающиеся и смежные периоды при построении
+    сливаются, поэтому каникулы, переданные по дням, схлопываются в
+    несколько периодов. Принадлежность дня проверяется двоичным поиском
+    по началам — O(log n) на день, для массива дней — одним searchsorted.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def from_bounds(cls, starts: np.ndarray, ends: np.ndarray) -> "DateIntervals":
+        """Слияние периодов [starts[i], ends[i]] в отсортированный непересекающийся набор"""
+        if not len(starts):
+            return cls(np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+
+        order = np.argsort(starts, kind="stable")
+        starts, ends = starts[order], ends[order]
+        # Новый период начинается, если он не касается всех предыдущих
+        reach = np.maximum.accumulate(ends)
+        opens = np.ones(len(starts), dtype=bool)
+        opens[1:] = starts[1:] > reach[:-1] + 1
+        first = np.flatnonzero(opens)
+        last = np.append(first[1:] - 1, len(starts) - 1)
+        return cls(starts[first], reach[last])
+
+    @classmethod
+    def parse(cls, values: Iterable[DateLike]) -> "DateIntervals":
+        """Периоды из дат и строк "ДД.ММ.ГГГГ" / "ДД.ММ.ГГГГ..ДД.ММ.ГГГГ" (ошибочные пропускаются)"""
+        if isinstance(values, cls):
+            return values
+
+        singles, periods = [], []
+        for value in values:
+            if isinstance(value, str) and RANGE_SEPARATOR in value:
+                period = parse_period(value)
+                if period is not None:
+                    periods.append(period)
+            else:
+                singles.append(value)
+
+        days = to_day_numbers(singles)
+        bounds = np.array(periods, dtype=np.int64).reshape(-1, 2)
+        return cls.from_bounds(
+            np.concatenate((days, bounds[:, 0])),
+            np.concatenate((days, bounds[:, 1]))
+        )
+
+    def __len__(self) -> int:
+        """Количество периодов"""
+        return len(self.starts)
+
+    @property
+    def total_days(self) -> int:
+        """Количество дней во всех периодах"""
+        return int((self.ends - self.starts + 1).sum())
+
+    def __contains__(self, value: DateLike) -> bool:
+        day = value if isinstance(value, (int, np.integer)) else to_day_number(value)
+        if day is None:
+            return False
+        index = int(np.searchsorted(self.starts, day, side="right")) - 1
+        return index >= 0 and day <= self.ends[index]
+
+    def mask(self, days: np.ndarray) -> np.ndarray:
+        """Флаги принадлежности периодам для массива номеров дней"""
+        if not len(self.starts):
+            return np.zeros(len(days), dtype=bool)
+        index = np.searchsorted(self.starts, days, side="right") - 1
+        return (index >= 0) & (days <= self.ends[np.maximum(index, 0)])
+
+
+def format_day_month(days: np.ndarray) -> np.ndarray:
+    """Подписи "ДД.ММ" для массива datetime64[D] (без Python-цикла по дням)"""
+    months = days.astype("datetime64[M]")
+    day_index = (days - months.astype("datetime64[D]")).astype(np.int64)
+    month_index = months.astype(np.int64) % 12
+    return _DAY_MONTH_LABELS[day_index, month_index]
+
+
+class LessonCalendar:
+    """
+    Календарь уроков за период
+
+    Диапазон дат строится одним массивом datetime64[D]; рабочие дни недели
+    отбираются по таблице из 7 флагов, праздники вычеркиваются из маски
+    периода по смещениям от начальной даты, каникулы — по периодам
+    DateIntervals. Хранятся
+    только учебные дни и число уроков в каждый из них — даты уроков
+    разворачиваются через np.repeat, когда их запрашивают.
+    """
+
+    __slots__ = ("days", "counts")
+
+    def __init__(self, days: np.ndarray, counts: np.ndarray):
+        self.days = days
+        self.counts = counts
+
+    @classmethod
+    def build(
+        cls,
+        start_date: DateLike,
+        end_date: DateLike,
+        weekdays: Sequence[int],
+        lessons_per_day: Sequence[int],
+        holidays: Iterable[DateLike] = (),
+        vacation: Iterable[DateLike] = (),
+        holiday_calendar=None
+    ) -> "LessonCalendar":
+        """
+        Учебные дни периода (обе границы включительно)
+
+        Args:
+            weekdays: Рабочие дни недели (0 = понедельник)
+            lessons_per_day: Количество уроков по дням недели (недостающие — 0)
+            holidays: Праздники (date или ДД.ММ.ГГГГ)
+            vacation: Каникулы — даты, периоды ДД.ММ.ГГГГ..ДД.ММ.ГГГГ или DateIntervals
+            holiday_calendar: Календарь праздников региона (HolidayCalendar), дополняет holidays
+        """
+        start = to_day_number(start_date)
+        end = to_day_number(end_date)
+        if start is None or end is None or start > end:
+            return cls(np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64))
+
+        # Уроков по дням недели; дни вне weekdays — 0 уроков
+        lessons = np.zeros(7, dtype=np.int64)
+        known = np.asarray(lessons_per_day[:7], dtype=np.int64)
+        lessons[:len(known)] = np.maximum(known, 0)
+        allowed = np.zeros(7, dtype=bool)
+        allowed[[day for day in weekdays if 0 <= day < 7]] = True
+        lessons[~allowed] = 0
+
+        numbers = np.arange(start, end + 1, dtype=np.int64)
+        counts = lessons[(numbers + EPOCH_WEEKDAY) % 7]
+
+        # Праздники вычеркиваются по смещению от начала, каникулы — по периодам
+        excluded = to_day_numbers(holidays)
+        if holiday_calendar is not None:
+            excluded = np.concatenate((excluded, holiday_calendar.days_between(start, end)))
+        excluded -= start
+        excluded = excluded[(excluded >= 0) & (excluded < len(numbers))]
+        counts[excluded] = 0
+        counts[DateIntervals.parse(vacation).mask(numbers)] = 0
+
+        mask = counts > 0
+        return cls(numbers[mask].astype("datetime64[D]"), counts[mask])
+
+    def __len__(self) -> int:
+        """Количество уроков"""
+        return int(self.counts.sum())
+
+    @property
+    def working_days(self) -> int:
+        """Количество учебных дней"""
+        return len(self.days)
+
+    def dates(self) -> np.ndarray:
+        """Даты уроков (datetime64[D]), каждая столько раз, сколько в этот день уроков"""
+        return np.repeat(self.days, self.counts)
+
+    def labels(self) -> List[str]:
+        """Подписи уроков "ДД.ММ" в порядке расписания"""
+        return np.repeat(format_day_month(self.days), self.counts).tolist()
+
+    def to_dates(self) -> List[date]:
+        """Даты уроков объектами datetime.date"""
+        return self.dates().astype(object).tolist()
@@ -1,23 +1,24 @@
 import tempfile
-import pandas as pd
-import openpyxl
 import os
 from datetime import date, timedelta
 from typing import List, Dict, Set
 from app.models.schemas import KTPGeneratorRequest
 from app.core.config import settings
+from app.services.holiday_calendar import holiday_calendars
+from app.services.ktp_calendar import DateIntervals, LessonCalendar
+from app.services.ktp_writer import write_schedule_xlsx
+from app.core.tracing import get_logger, tracer
 
-def generate_schedule(start_date, end_date, weekdays, holidays, vacation, lessons_per_day):
-    """Генерация расписания (как в оригинале)"""
-    schedule = []
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date.weekday() in weekdays:
-            if current_date not in holidays and current_date not in vacation:
-                for _ in range(lessons_per_day[current_date.weekday()]):
-                    schedule.append(current_date)
-        current_date += timedelta(days=1)
-    return schedule
+logger = get_logger(__name__)
+
+# Оформление листа КТП: ширина столбца дат, даты по центру
+SCHEDULE_COLUMN_WIDTH = 15
+
+def generate_schedule(start_date, end_date, weekdays, holidays, vacation, lessons_per_day, holiday_calendar=None):
+    """Генерация расписания: даты уроков по календарю LessonCalendar"""
+    return LessonCalendar.build(
+        start_date, end_date, weekdays, lessons_per_day, holidays, vacation, holiday_calendar
+    ).to_dates()
 
 def generate_ktp_excel(request: KTPGeneratorRequest, current_user=None, db=None) -> dict:
     """Генерация Excel файла с КТП (упрощенная версия)"""
@@ -39,28 +40,21 @@ def generate_ktp_excel(request: KTPGeneratorRequest, current_user=None, db=None)
                 except (ValueError, TypeError):
                     continue
         
-        # Парсим каникулы
-        vacation_dt = []
-        for vacation_str in request.vacation:
-            if vacation_str.strip():
-                try:
-                    # Поддерживаем формат ДД.ММ.ГГГГ
-                    parts = vacation_str.strip().split('.')
-                    if len(parts) == 3:
-                        day, month, year = map(int, parts)
-                        vacation_dt.append(date(year, month, day))
-                except (ValueError, TypeError):
-                    continue
-        
-        # Генерируем расписание (используем оригинальную функцию)
-        schedule = generate_schedule(
-            request.start_date, 
-            request.end_date, 
-            weekdays_int, 
-            holidays_dt, 
-            vacation_dt, 
-            request.lessons_per_day
-        )
+        # Каникулы: периоды и отдельные дни в отсортированном наборе периодов
+        vacation_periods = DateIntervals.parse(request.vacation)
+        
+        # Генерируем расписание: подписи уроков берутся из календаря без datetime.date
+        with tracer.span("ktp.schedule") as span:
+            calendar = LessonCalendar.build(
+                request.start_date,
+                request.end_date,
+                weekdays_int,
+                request.lessons_per_day,
+                holidays_dt,
+                vacation_periods,
+                holiday_calendars.get(request.holiday_calendar)
+            )
+            span.set(lessons=len(calendar))
         
         # Создаем безопасную директорию для временного файла
         temp_dir = settings.temp_dir
@@ -68,51 +62,28 @@ def generate_ktp_excel(request: KTPGeneratorRequest, current_user=None, db=None)
         
         # Создаем временный файл
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx', dir=temp_dir)
-        temp_file.close()  # Закрываем файл для записи pandas
+        temp_file.close()
         
         try:
-            # Создаем DataFrame только с датами в формате ДД.ММ
-            if schedule:
-                # Создаем список дат в формате ДД.ММ (без года)
-                dates_list = []
-                for schedule_date in schedule:
-                    dates_list.append(schedule_date.strftime('%d.%m'))
-                
-                df = pd.DataFrame({
-                    'Дата': dates_list
-                })
-            else:
-                # Если расписание пустое, создаем пример
-                df = pd.DataFrame({
-                    'Дата': ['01.09', '02.09', '03.09']
-                })
-        
-            # Сохраняем в Excel с простым форматированием
-            with pd.ExcelWriter(temp_file.name, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Расписание')
-                
-                # Получаем worksheet для форматирования
-                worksheet = writer.sheets['Расписание']
-                
-                # Устанавливаем ширину столбца для дат
-                worksheet.column_dimensions['A'].width = 15
-                
-                # Центрируем даты
-                from openpyxl.styles import Alignment
-                alignment = Alignment(horizontal='center')
-                for cell in worksheet['A']:
-                    cell.alignment = alignment
+            # Даты в формате ДД.ММ (без года); если расписание пустое, создаем пример
+            labels = calendar.labels() or ['01.09', '02.09', '03.09']
+        
+            with tracer.span("ktp.write", rows=len(labels)):
+                # Книга собирается в памяти потоковым писателем и записывается одним вызовом
+                data = write_schedule_xlsx(labels, width=SCHEDULE_COLUMN_WIDTH, centered=True)
+                with open(temp_file.name, 'wb') as excel_file:
+                    excel_file.write(data)
                     
         except Exception as excel_error:
-            print(f"Ошибка создания Excel: {excel_error}")
+            logger.error("ktp_excel_failed", error=str(excel_error))
             # Создаем простой текстовый файл как fallback
             with open(temp_file.name.replace('.xlsx', '.txt'), 'w', encoding='utf-8') as txt_file:
                 txt_file.write(f"КТП расписание\n")
                 txt_file.write(f"Период: {request.start_date} - {request.end_date}\n\n")
                 
-                if schedule:
+                if len(calendar):
                     lesson_counter = 1
-                    for schedule_date in schedule:
+                    for schedule_date in calendar.to_dates():
                         txt_file.write(f"{schedule_date.strftime('%d.%m.%Y')} - Урок {lesson_counter}\n")
                         lesson_counter += 1
                 else:
@@ -121,8 +92,8 @@ def generate_ktp_excel(request: KTPGeneratorRequest, current_user=None, db=None)
             temp_file.name = temp_file.name.replace('.xlsx', '.txt')
         
         # Подсчитываем статистику
-        total_lessons = len(schedule)
-        working_days = len(set(schedule)) if schedule else 0
+        total_lessons = len(calendar)
+        working_days = calendar.working_days
         
         # Возвращаем словарь вместо tuple  
         file_size = os.path.getsize(temp_file.name) if os.path.exists(temp_file.name) else 0
@@ -137,7 +108,7 @@ def generate_ktp_excel(request: KTPGeneratorRequest, current_user=None, db=None)
         
     except Exception as e:
         # Логируем ошибку и создаем простой файл
-        print(f"Ошибка генерации КТП: {e}")
+        logger.error("ktp_failed", error=str(e))
         
         # Создаем безопасную директорию для временного файла
         temp_dir = settings.temp_dir
@@ -177,5 +148,5 @@ def generate_ktp_excel(request: KTPGeneratorRequest, current_user=None, db=None)
     
     except Exception as e:
         # Логируем ошибку для диагностики
-        print(f"Ошибка в generate_ktp_excel: {str(e)}")
+        logger.error("ktp_excel_failed", error=str(e))
         raise Exception(f"Ошибка генерации КТП: {str(e)}") 
\ No newline at end of file
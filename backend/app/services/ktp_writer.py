@@ -0,0 +1,156 @@
+import io
+import zipfile
+from typing import Iterable, Optional, Sequence
+from xml.sax.saxutils import escape
+
+SHEET_TITLE = "Расписание"
+HEADERS = ("Дата",)
+
+# Подписи дат в расписании — "ДД.ММ", поэтому ширина столбцов известна заранее
+LABEL_LENGTH = 5
+MAX_COLUMN_WIDTH = 50
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Сколько строк листа собирается в одну порцию записи в архив
+ROWS_PER_CHUNK = 1024
+
+# ---- постоянные части пакета OOXML ----
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Стиль 1 — заголовок: жирный шрифт, серая заливка CCCCCC, по центру;
+# стиль 2 — ячейка данных по центру
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="00CCCCCC"/><bgColor rgb="00CCCCCC"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" applyAlignment="1">'
+    '<alignment horizontal="center"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0" applyAlignment="1">'
+    '<alignment horizontal="center"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+SHEET_HEAD_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<cols>{cols}</cols><sheetData>'
+)
+SHEET_TAIL_XML = '</sheetData></worksheet>'
+
+
+def column_widths(headers: Sequence[str] = HEADERS, value_length: int = LABEL_LENGTH) -> list:
+    """Ширины столбцов по длине заголовка и значений (как прежний подбор по всем ячейкам)"""
+    return [min(max(len(header), value_length) + 2, MAX_COLUMN_WIDTH) for header in headers]
+
+
+def _column_letter(index: int) -> str:
+    """Буква столбца по номеру с 1 (для листа расписания хватает A-Z)"""
+    return chr(ord("A") + index - 1)
+
+
+def _sheet_chunks(labels: Iterable[str], width: Optional[float] = None, centered: bool = False) -> Iterable[str]:
+    """XML листа порциями: заголовок, строки по ROWS_PER_CHUNK, окончание"""
+    widths = column_widths() if width is None else [width] * len(HEADERS)
+    cols = "".join(
+        f'<col min="{index}" max="{index}" width="{column_width}" customWidth="1"/>'
+        for index, column_width in enumerate(widths, start=1)
+    )
+    style = ' s="2"' if centered else ""
+    header = "".join(
+        f'<c r="{_column_letter(index)}1" s="1" t="inlineStr"><is><t>{escape(title)}</t></is></c>'
+        for index, title in enumerate(HEADERS, start=1)
+    )
+    yield SHEET_HEAD_XML.format(cols=cols) + f'<row r="1">{header}</row>'
+
+    rows = []
+    for number, label in enumerate(labels, start=2):
+        rows.append(f'<row r="{number}"><c r="A{number}"{style} t="inlineStr"><is><t>{escape(label)}</t></is></c></row>')
+        if len(rows) == ROWS_PER_CHUNK:
+            yield "".join(rows)
+            rows.clear()
+    yield "".join(rows) + SHEET_TAIL_XML
+
+
+def write_schedule_xlsx(labels: Iterable[str], width: Optional[float] = None, centered: bool = False) -> bytes:
+    """
+    Excel файл расписания в памяти
+
+    Пакет OOXML собирается напрямую: постоянные части (типы, связи, книга,
+    стили) — готовые строки, лист пишется в архив порциями прямо из
+    итератора подписей, без DataFrame и без объектов ячеек openpyxl.
+    Ширина столбца известна заранее (подписи "ДД.ММ"), строки хранятся
+    как inline-строки, поэтому таблица общих строк не нужна.
+
+    Args:
+        labels: Подписи дат по строкам
+        width: Ширина столбца (по умолчанию — по длине заголовка и подписей)
+        centered: Выравнивать даты по центру
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        package.writestr("_rels/.rels", ROOT_RELS_XML)
+        package.writestr("xl/workbook.xml", WORKBOOK_XML.format(title=escape(SHEET_TITLE, {'"': "&quot;"})))
+        package.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS_XML)
+        package.writestr("xl/styles.xml", STYLES_XML)
+        with package.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            for chunk in _sheet_chunks(labels, width, centered):
+                sheet.write(chunk.encode("utf-8"))
+    return buffer.getvalue()
@@ -1,11 +1,20 @@
+import pickle
 import random
+import numpy as np
 import tempfile
 import os
-from fpdf import FPDF
-from datetime import datetime
-from typing import List, Tuple
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 from app.models.schemas import MathGeneratorRequest, MathOperation
+from app.services.math_sampler import ExampleBatch, sample_examples, construct_numbers, decode_operators
 from app.core.config import settings
+from app.services.generation_executor import generation_executor
+from app.core.tracing import get_logger, tracer
+
+logger = get_logger(__name__)
+
+# fpdf2 подключается при первом рендеринге PDF (MathGridPDF в app.services.math_pdf),
+# поэтому импорт этого модуля — и запуск приложения и воркеров — его не загружает
 
 # Настройки страницы
 CELL_SIZE = 5  # Размер клетки в миллиметрах (как в тетрадях)
@@ -19,143 +28,63 @@ EXAMPLE_HEIGHT = 8  # Высота строки для примера
 # Пример начинается: 30мм + отступ (5мм) = 35мм
 NUMBER_WIDTH = 20  # Ширина колонки с номером
 NUMBER_TO_EXAMPLE_GAP = 5  # Отступ между номером и примером
+ANSWER_CELLS = 4  # Клеток под ответ ученика справа от примера (при раскладке в колонки)
+BOTTOM_GAP = 10  # Свободное место под последней строкой страницы в мм
+EXAMPLE_CHUNK_SIZE = 2048  # Примеров в одной порции генерации (у каждой порции свой генератор)
 
-class MathGridPDF(FPDF):
-    """Класс PDF с сеткой для математических примеров"""
+GRID_COLOR_LIGHT = 200  # Цвет обычных линий сетки
+GRID_COLOR_DARK = 150   # Цвет каждой 5-й линии
+GRID_WIDTH_LIGHT = 0.1  # Толщина обычных линий в мм
+GRID_WIDTH_DARK = 0.25  # Толщина каждой 5-й линии в мм
+
+@lru_cache(maxsize=None)
+def grid_content_stream(page_width: float, page_height: float, k: float) -> bytes:
+    """
+    Готовый фрагмент потока PDF с сеткой страницы
     
-    def __init__(self, subject="Математика"):
-        super().__init__(orientation="P", unit="mm", format="A4")
-        self.subject = subject
-        self.add_page()
-        
-        # Пытаемся использовать доступные шрифты
-        try:
-            # Пробуем Helvetica (стандартный шрифт PDF)
-            self.set_font("Helvetica", "B", 16)
-        except:
-            try:
-                # Fallback на Arial
-                self.set_font("Arial", "B", 16)
-            except:
-                # Последний fallback на Times
-                self.set_font("Times", "B", 16)
-        
-    def draw_header(self):
-        """Рисуем заголовок страницы"""
-        # Устанавливаем позицию для заголовка
-        self.set_y(10)
-        
-        # Используем безопасные шрифты
-        try:
-            self.set_font("Helvetica", "B", 14)
-        except:
-            try:
-                self.set_font("Arial", "B", 14)
-            except:
-                self.set_font("Times", "B", 14)
-        
-        # Заголовок на английском для совместимости
-        self.cell(0, 8, "Math Worksheet", 0, 1, "C")
-        
-        # Добавляем строку для ФИО
-        try:
-            self.set_font("Helvetica", "", 12)
-        except:
-            try:
-                self.set_font("Arial", "", 12)
-            except:
-                self.set_font("Times", "", 12)
-        
-        self.cell(0, 10, "Name: _________________________", 0, 1, "L")
-        
-        # Добавляем дату
-        try:
-            self.set_font("Helvetica", "", 10)
-        except:
-            try:
-                self.set_font("Arial", "", 10)
-            except:
-                self.set_font("Times", "", 10)
-        
-        date_str = datetime.now().strftime("%d.%m.%Y")
-        self.cell(0, 8, f"Date: {date_str}", 0, 1, "L")
-        
-        # Добавляем дополнительное пространство после заголовка
-        self.ln(5)
-    
-    def draw_grid(self):
-        """Рисуем сетку на странице"""
-        # Рассчитываем рабочую область (без отступов)
-        width = self.w - 2 * MARGIN
-        height = self.h - MARGIN_TOP - MARGIN
-        
-        # Устанавливаем серый цвет для линий
-        self.set_draw_color(200)
-        
-        # Рисуем горизонтальные линии
-        for y in range(0, int(height) + 1, CELL_SIZE):
-            # Каждую 5-ю линию делаем чуть темнее
-            if y % (5 * CELL_SIZE) == 0:
-                self.set_draw_color(150)
-                self.set_line_width(0.25)
-            else:
-                self.set_draw_color(200)
-                self.set_line_width(0.1)
-            self.line(MARGIN, MARGIN_TOP + y, MARGIN + width, MARGIN_TOP + y)
-            
-        # Рисуем вертикальные линии
-        for x in range(0, int(width) + 1, CELL_SIZE):
-            # Каждую 5-ю линию делаем чуть темнее
-            if x % (5 * CELL_SIZE) == 0:
-                self.set_draw_color(150)
-                self.set_line_width(0.25)
-            else:
-                self.set_draw_color(200)
-                self.set_line_width(0.1)
-            self.line(MARGIN + x, MARGIN_TOP, MARGIN + x, MARGIN_TOP + height)
-    
-    def add_examples_to_grid(self, examples: List[str]):
-        """Добавляем примеры в сетку"""
-        # Используем безопасные шрифты
-        try:
-            self.set_font("Helvetica", "", 9)
-        except:
-            try:
-                self.set_font("Arial", "", 9)
-            except:
-                self.set_font("Times", "", 9)
-        
-        # ТОЧНЫЕ РАСЧЕТЫ для сетки 5x5мм:
-        # MARGIN_TOP = 40мм (начало сетки)
-        # CELL_SIZE = 5мм (размер ячейки)
-        # Первая строка примеров начинается в центре первой ячейки сетки
-        start_y = MARGIN_TOP + (CELL_SIZE // 2)  # 40 + 2.5 = 42.5мм
-        
-        for i, example in enumerate(examples):
-            # Вычисляем позицию Y для каждой строки
-            # Каждый пример размещается в центре своей ячейки сетки
-            example_y = start_y + (i * CELL_SIZE)
-            
-            # Проверяем, не выходит ли пример за пределы страницы
-            if example_y > self.h - MARGIN - 10:
-                # Добавляем новую страницу
-                self.add_page()
-                self.draw_grid()
-                # Сбрасываем позицию для новой страницы
-                start_y = MARGIN_TOP + (CELL_SIZE // 2)
-                example_y = start_y + (i * CELL_SIZE)
-            
-            # Размещаем пример точно по центру ячейки сетки
-            # Номер примера (левый край + отступ)
-            self.set_xy(MARGIN, example_y - 3)  # -3 для центрирования по вертикали
-            self.cell(NUMBER_WIDTH, 6, f"{i+1}.", 0, 0, "L")
-            
-            # Пример (номер + отступ)
-            self.set_xy(MARGIN + NUMBER_WIDTH + NUMBER_TO_EXAMPLE_GAP, example_y - 3)
-            self.cell(0, 6, f"{example} =", 0, 1, "L")
+    Сетка строится один раз для размера страницы и затем вставляется на каждую
+    страницу как есть: все тонкие линии рисуются одним путем, все темные —
+    другим, поэтому цвет и толщина переключаются дважды, а не на каждой линии.
+    Фрагмент обернут в q/Q и не меняет графическое состояние документа.
+    """
+    # Рассчитываем рабочую область (без отступов)
+    width = page_width - 2 * MARGIN
+    height = page_height - MARGIN_TOP - MARGIN
+    
+    light, dark = [], []
+    
+    def segment(x1, y1, x2, y2):
+        return f"{x1 * k:.2f} {(page_height - y1) * k:.2f} m {x2 * k:.2f} {(page_height - y2) * k:.2f} l"
+    
+    # Горизонтальные линии, каждая 5-я темнее
+    for y in range(0, int(height) + 1, CELL_SIZE):
+        lines = dark if y % (5 * CELL_SIZE) == 0 else light
+        lines.append(segment(MARGIN, MARGIN_TOP + y, MARGIN + width, MARGIN_TOP + y))
+    
+    # Вертикальные линии, каждая 5-я темнее
+    for x in range(0, int(width) + 1, CELL_SIZE):
+        lines = dark if x % (5 * CELL_SIZE) == 0 else light
+        lines.append(segment(MARGIN + x, MARGIN_TOP, MARGIN + x, MARGIN_TOP + height))
+    
+    stream = ["q"]
+    for color, line_width, lines in (
+        (GRID_COLOR_LIGHT, GRID_WIDTH_LIGHT, light),
+        (GRID_COLOR_DARK, GRID_WIDTH_DARK, dark),
+    ):
+        stream.append(f"{color / 255:.3f} G {line_width * k:.2f} w")
+        stream.extend(lines)
+        stream.append("S")
+    stream.append("Q")
+    return "\n".join(stream).encode("latin1")
 
 class Example:
-    """Класс для генерации математического примера (как в оригинале)"""
+    """Класс для генерации математического примера (как в оригинале)
+
+    Пример является тонкой оберткой над одной строкой пачки, которую
+    генерирует векторный движок из app.services.math_sampler.
+    """
+    
+    __slots__ = ("numcount", "operator", "interval", "_numbers_", "_operators_", "_result_")
     
     def __init__(self, numcount=2, operator=["+", "-"], interval=[0, 100]):
         if numcount < 2:
@@ -169,55 +98,14 @@ class Example:
         self.generate_problem()
     
     def generate_problem(self):
-        while True:
-            self._operators_ = [random.choice(self.operator) for _ in range(self.numcount - 1)]
-            self._numbers_ = self.generate_smart_numbers()
-            self._result_ = self.solve_it()
-            if self._result_ > 0:
-                break
+        numbers, codes, results = sample_examples(1, self.numcount, self.operator, self.interval)
+        self._numbers_ = numbers[0].tolist()
+        self._operators_ = decode_operators(codes[0])
+        self._result_ = int(results[0])
     
     def generate_smart_numbers(self):
-        numbers = []
-        
-        # Генерируем первое число
-        numbers.append(random.randint(self.interval[0], self.interval[1]))
-        
-        # Генерируем остальные числа с учетом операций
-        for i, operator in enumerate(self._operators_):
-            if operator == "/":
-                # Для деления: генерируем делитель и корректируем предыдущее число
-                divisor = random.randint(2, min(20, self.interval[1]))  # Делитель от 2 до 20
-                quotient = random.randint(1, self.interval[1] // divisor)  # Результат деления
-                
-                # Корректируем предыдущее число, чтобы деление было нацело
-                if i == 0:
-                    numbers[0] = quotient * divisor
-                else:
-                    # Если это не первая операция, нужно учесть накопленный результат
-                    current_result = numbers[0]
-                    for j in range(i):
-                        if self._operators_[j] == "+":
-                            current_result += numbers[j + 1] if j + 1 < len(numbers) else 0
-                        elif self._operators_[j] == "-":
-                            current_result -= numbers[j + 1] if j + 1 < len(numbers) else 0
-                        elif self._operators_[j] == "*":
-                            current_result *= numbers[j + 1] if j + 1 < len(numbers) else 1
-                    
-                    # Подбираем делитель так, чтобы current_result делился нацело
-                    if current_result > 0:
-                        possible_divisors = [d for d in range(2, min(current_result + 1, 21)) if current_result % d == 0]
-                        if possible_divisors:
-                            divisor = random.choice(possible_divisors)
-                        else:
-                            divisor = random.randint(2, min(20, self.interval[1]))
-                    else:
-                        divisor = random.randint(2, min(20, self.interval[1]))
-                
-                numbers.append(divisor)
-            else:
-                # Для остальных операций генерируем обычные числа
-                numbers.append(random.randint(self.interval[0], self.interval[1]))
-        
+        """Подбор чисел под текущие операции (конструктивно, без перебора)"""
+        numbers, _ = construct_numbers(self._operators_, self.interval)
         return numbers
     
     def __str__(self):
@@ -245,40 +133,105 @@ class Example:
     def whole_example(self):
         return f"{self} {self._result_}"
 
-def create_pdf_with_grid(examples: List[str], subject: str = "Математика") -> str:
-    """Создание PDF файла с сеткой для математических примеров (для учеников)"""
-    try:
-        print(f"Создание PDF с сеткой для {len(examples)} примеров")
-        
-        # Создаем PDF с сеткой
-        pdf = MathGridPDF(subject=subject)
-        
-        # Рисуем заголовок и сетку на первой странице
-        pdf.draw_header()
-        pdf.draw_grid()
+def render_pdf_with_grid(examples: Iterable[str], subject: str = "Математика",
+                         answers: Optional[Sequence[str]] = None) -> bytes:
+    """
+    Рендеринг PDF с сеткой для учеников в память (без временных файлов)
+    
+    Ответы, если переданы, не печатаются и нужны только для ширины колонок,
+    чтобы раскладка совпала с листом учителя.
+    """
+    from app.services.math_pdf import MathGridPDF
+    
+    with tracer.span("math.render", variant="student") as span:
+        # Заголовок и сетка первой страницы уже в прототипе
+        pdf = MathGridPDF.from_prototype(subject=subject)
         
         # Добавляем примеры в сетку
-        pdf.add_examples_to_grid(examples)
-        
-        # Создаем временный файл в безопасной директории
-        temp_dir = settings.temp_dir
-        os.makedirs(temp_dir, exist_ok=True)
+        pdf.layout_examples(examples, answers)
+        span.set(pages=pdf.pages_count)
+    
+    with tracer.span("math.write") as span:
+        data = bytes(pdf.output())
+        span.set(size=len(data))
+    return data
+
+def render_pdf_for_teacher(examples: Iterable[str], answers: Iterable[str], subject: str = "Математика") -> bytes:
+    """Рендеринг PDF с ответами для учителя в память (без временных файлов)"""
+    from app.services.math_pdf import MathGridPDF
+    
+    with tracer.span("math.render", variant="teacher") as span:
+        # Заголовок и сетка первой страницы уже в прототипе
+        pdf = MathGridPDF.from_prototype(subject=subject)
         
-        temp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', dir=temp_dir)
-        pdf.output(temp.name)
-        temp.close()
+        # Примеры, затем слой ответов поверх них
+        pdf.add_examples_to_grid(examples, answers)
+        span.set(pages=pdf.pages_count)
+    
+    with tracer.span("math.write") as span:
+        data = bytes(pdf.output())
+        span.set(size=len(data))
+    return data
+
+def render_both_pdfs(examples: Iterable[str], answers: Sequence[str], subject: str = "Математика") -> Tuple[bytes, bytes]:
+    """
+    Рендеринг листов ученика и учителя из одной общей основы
+    
+    Заголовок, сетка и примеры верстаются один раз. Перед записью листа
+    ученика снимается копия документа, и лист учителя получается из нее
+    добавлением слоя ответов — вместо второй полной верстки.
+    
+    Returns:
+        (PDF ученика, PDF учителя)
+    """
+    from app.services.math_pdf import MathGridPDF
+    
+    with tracer.span("math.render", variant="both") as span:
+        pdf = MathGridPDF.from_prototype(subject=subject)
+        plan = pdf.layout_examples(examples, answers)
+        # output() завершает документ, поэтому копию снимаем до записи
+        snapshot = pickle.dumps(pdf)
+        span.set(pages=pdf.pages_count)
+    
+    with tracer.span("math.write", variant="student") as span:
+        student_pdf = bytes(pdf.output())
+        span.set(size=len(student_pdf))
+    
+    with tracer.span("math.overlay") as span:
+        pdf = pickle.loads(snapshot)
+        pdf.add_answer_overlay(plan, answers)
+        span.set(pages=pdf.pages_count)
+    
+    with tracer.span("math.write", variant="teacher") as span:
+        teacher_pdf = bytes(pdf.output())
+        span.set(size=len(teacher_pdf))
+    return student_pdf, teacher_pdf
+
+def save_to_temp_file(data: bytes, suffix: str) -> str:
+    """Сохранение готового буфера во временный файл (только если он нужен вызывающему)"""
+    # Создаем временный файл в безопасной директории
+    temp_dir = settings.temp_dir
+    os.makedirs(temp_dir, exist_ok=True)
+    
+    with tracer.span("file.write", size=len(data)):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=temp_dir) as temp:
+            temp.write(data)
+    return temp.name
+
+def create_pdf_with_grid(examples: List[str], subject: str = "Математика") -> str:
+    """Создание PDF файла с сеткой для математических примеров (для учеников)"""
+    try:
+        data = render_pdf_with_grid(examples, subject=subject)
+        pdf_path = save_to_temp_file(data, '.pdf')
         
         # Проверяем размер файла
-        file_size = os.path.getsize(temp.name)
-        print(f"PDF создан: {temp.name}, размер: {file_size} байт")
+        if len(data) < 1000:  # Если файл слишком маленький
+            logger.warning("pdf_too_small", path=pdf_path, size=len(data))
         
-        if file_size < 1000:  # Если файл слишком маленький
-            print("ВНИМАНИЕ: PDF файл слишком маленький, возможно есть проблема")
-        
-        return temp.name
+        return pdf_path
         
     except Exception as e:
-        print(f"Ошибка создания PDF с сеткой: {e}")
+        logger.error("pdf_grid_failed", error=str(e))
         
         # Fallback: создаем простой текстовый файл
         temp_dir = settings.temp_dir
@@ -297,53 +250,11 @@ def create_pdf_with_grid(examples: List[str], subject: str = "Математик
 def create_pdf_for_teacher(examples: List[str], answers: List[str], subject: str = "Математика") -> str:
     """Создание PDF файла с ответами для учителя"""
     try:
-        pdf = MathGridPDF(subject=subject)
-        
-        # Рисуем заголовок и сетку на первой странице
-        pdf.draw_header()
-        pdf.draw_grid()
-        
-        # Добавляем примеры с ответами
-        # ТОЧНЫЕ РАСЧЕТЫ для сетки 5x5мм:
-        # MARGIN_TOP = 40мм (начало сетки)
-        # CELL_SIZE = 5мм (размер ячейки)
-        # Первая строка примеров начинается в центре первой ячейки сетки
-        start_y = MARGIN_TOP + (CELL_SIZE // 2)  # 40 + 2.5 = 42.5мм
-        
-        for i, (example, answer) in enumerate(zip(examples, answers)):
-            # Вычисляем позицию Y для каждой строки
-            # Каждый пример размещается в центре своей ячейки сетки
-            example_y = start_y + (i * CELL_SIZE)
-            
-            # Проверяем, не выходит ли пример за пределы страницы
-            if example_y > pdf.h - MARGIN - 10:
-                # Добавляем новую страницу
-                pdf.add_page()
-                pdf.draw_grid()
-                # Сбрасываем позицию для новой страницы
-                start_y = MARGIN_TOP + (CELL_SIZE // 2)
-                example_y = start_y + (i * CELL_SIZE)
-            
-            # Размещаем пример точно по центру ячейки сетки
-            # Номер примера (левый край + отступ)
-            pdf.set_xy(MARGIN, example_y - 3)  # -3 для центрирования по вертикали
-            pdf.cell(NUMBER_WIDTH, 6, f"{i+1}.", 0, 0, "L")
-            
-            # Пример с ответом (номер + отступ)
-            pdf.set_xy(MARGIN + NUMBER_WIDTH + NUMBER_TO_EXAMPLE_GAP, example_y - 3)
-            pdf.cell(0, 6, f"{example} = {answer}", 0, 1, "L")
-        
-        # Создаем временный файл в безопасной директории
-        temp_dir = settings.temp_dir
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', dir=temp_dir)
-        pdf.output(temp.name)
-        temp.close()
-        return temp.name
+        data = render_pdf_for_teacher(examples, answers, subject=subject)
+        return save_to_temp_file(data, '.pdf')
         
     except Exception as e:
-        print(f"Ошибка создания PDF для учителя: {e}")
+        logger.error("pdf_teacher_failed", error=str(e))
         
         # Fallback: создаем простой текстовый файл
         temp_dir = settings.temp_dir
@@ -359,59 +270,87 @@ def create_pdf_for_teacher(examples: List[str], answers: List[str], subject: str
         temp.close()
         return temp.name
 
+def example_entropy(request: MathGeneratorRequest) -> int:
+    """Зерно порций примеров: из запроса или случайное (одно на лист)"""
+    return request.seed if request.seed is not None else np.random.SeedSequence().entropy
+
+def sample_example_chunk(request: MathGeneratorRequest, entropy: int, index: int) -> ExampleBatch:
+    """
+    Порция примеров номер index (по EXAMPLE_CHUNK_SIZE)
+    
+    У каждой порции свой генератор от общего зерна, поэтому любую порцию
+    можно получить отдельно, в любом процессе, без генерации предыдущих.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(index,)))
+    count = min(EXAMPLE_CHUNK_SIZE, request.example_count - index * EXAMPLE_CHUNK_SIZE)
+    return ExampleBatch.sample(
+        count,
+        request.num_operands,
+        [op.value for op in request.operations],
+        [request.interval_start, request.interval_end],
+        rng=rng
+    )
+
+def generate_example_batch(request: MathGeneratorRequest) -> ExampleBatch:
+    """
+    Генерация пачки примеров в компактном виде (один раз для обоих вариантов)
+    
+    Если в запросе задано зерно (`seed`), примеры полностью детерминированы:
+    одинаковый запрос всегда дает одинаковый набор примеров. Пачка
+    собирается из тех же порций, что и у iter_math_examples, поэтому
+    потоковый лист совпадает с листом из памяти.
+    """
+    entropy = example_entropy(request)
+    chunks = -(-request.example_count // EXAMPLE_CHUNK_SIZE)
+    
+    with tracer.span("math.sample", count=request.example_count, operands=request.num_operands):
+        return ExampleBatch.concatenate([
+            sample_example_chunk(request, entropy, index) for index in range(chunks)
+        ])
+
 def generate_math_examples(request: MathGeneratorRequest) -> Tuple[List[str], List[str]]:
-    """Генерация математических примеров (один раз для обоих вариантов)"""
+    """Генерация математических примеров в виде строк (примеры и ответы)"""
     try:
-        print(f"Генерация примеров: {request.example_count} примеров")
-        
-        # Преобразуем операции в строки
-        operator_strings = [op.value for op in request.operations]
-        print(f"Операции: {operator_strings}")
-        
-        # Создаем примеры ОДИН РАЗ
-        examples = []
-        answers = []
-        
-        for i in range(request.example_count):
-            ex = Example(
-                numcount=request.num_operands,
-                operator=operator_strings,
-                interval=[request.interval_start, request.interval_end]
-            )
-            examples.append(str(ex))
-            answers.append(str(ex._result_))
-            print(f"Пример {i+1}: {str(ex)} = {ex._result_}")
-        
-        print(f"Сгенерировано {len(examples)} примеров")
-        return examples, answers
+        batch = generate_example_batch(request)
+        return list(batch.problems()), list(batch.answers())
         
     except Exception as e:
-        print(f"Ошибка генерации примеров: {e}")
+        logger.error("examples_failed", error=str(e), count=request.example_count)
         raise e
 
+def iter_math_examples(request: MathGeneratorRequest, entropy: int, start: int = 0,
+                       stop: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Ленивая генерация примеров start..stop (пример, ответ) порциями
+    
+    В памяти одновременно находится только одна порция, поэтому объем
+    не зависит от количества примеров. Примеры те же, что в
+    generate_example_batch с тем же зерном (entropy из example_entropy).
+    """
+    stop = request.example_count if stop is None else min(stop, request.example_count)
+    for index in range(start // EXAMPLE_CHUNK_SIZE, -(-stop // EXAMPLE_CHUNK_SIZE)):
+        offset = index * EXAMPLE_CHUNK_SIZE
+        batch = sample_example_chunk(request, entropy, index)[max(start - offset, 0):stop - offset]
+        yield from zip(batch.problems(), batch.answers())
+
 # Основная функция сервиса
 def generate_math_pdf(request: MathGeneratorRequest, for_teacher: bool = False) -> str:
     """Генерация PDF с математическими примерами"""
     
     try:
-        print(f"Генерация PDF: {request.example_count} примеров, для учителя: {for_teacher}")
-        
-        # Генерируем примеры ОДИН РАЗ
-        examples, answers = generate_math_examples(request)
-        
-        if for_teacher:
-            # Создаем PDF с ответами для учителя
-            pdf_path = create_pdf_for_teacher(examples, answers, subject="Математика")
-        else:
+        with tracer.span("math.pdf", count=request.example_count, for_teacher=for_teacher):
+            # Генерируем примеры ОДИН РАЗ
+            examples, answers = generate_math_examples(request)
+            
+            if for_teacher:
+                # Создаем PDF с ответами для учителя
+                return create_pdf_for_teacher(examples, answers, subject="Математика")
             # Создаем PDF с сеткой для учеников (без ответов)
-            pdf_path = create_pdf_with_grid(examples, subject="Математика")
-        
-        print(f"PDF создан: {pdf_path}")
-        return pdf_path
+            return create_pdf_with_grid(examples, subject="Математика")
         
     except Exception as e:
         # Логируем ошибку и создаем простой файл
-        print(f"Ошибка генерации математических примеров: {e}")
+        logger.error("math_pdf_failed", error=str(e))
         
         # Создаем простой текстовый файл как fallback
         temp_dir = settings.temp_dir
@@ -430,23 +369,63 @@ def generate_math_pdf(request: MathGeneratorRequest, for_teacher: bool = False)
         temp.close()
         return temp.name 
 
+def render_batch_pdf(batch: ExampleBatch, for_teacher: bool = False, subject: str = "Математика") -> bytes:
+    """Рендеринг PDF из компактной пачки (строки примеров форматируются по ходу верстки)"""
+    answers = list(batch.answers())
+    if for_teacher:
+        return render_pdf_for_teacher(batch.problems(), answers, subject=subject)
+    # Ответы нужны для той же раскладки, что у листа учителя
+    return render_pdf_with_grid(batch.problems(), subject=subject, answers=answers)
+
+def render_both_batch_pdfs(batch: ExampleBatch, subject: str = "Математика") -> Tuple[bytes, bytes]:
+    """Рендеринг обоих вариантов из компактной пачки за одну верстку"""
+    return render_both_pdfs(batch.problems(), list(batch.answers()), subject=subject)
+
+def render_math_pdf(request: MathGeneratorRequest, for_teacher: bool = False) -> bytes:
+    """Генерация PDF с математическими примерами в память"""
+    with tracer.span("math.pdf", count=request.example_count, for_teacher=for_teacher):
+        return render_batch_pdf(generate_example_batch(request), for_teacher, subject="Математика")
+
 def generate_both_math_pdfs(request: MathGeneratorRequest) -> Tuple[str, str]:
     """Генерация обоих вариантов PDF с одинаковыми примерами"""
     try:
-        print(f"Генерация ОБОИХ вариантов PDF: {request.example_count} примеров")
-        
-        # Генерируем примеры ОДИН РАЗ
-        examples, answers = generate_math_examples(request)
-        
-        # Создаем PDF для ученика (сетка без ответов)
-        student_pdf = create_pdf_with_grid(examples, subject="Математика")
-        
-        # Создаем PDF для учителя (с ответами)
-        teacher_pdf = create_pdf_for_teacher(examples, answers, subject="Математика")
+        with tracer.span("math.pdf_both", count=request.example_count):
+            # Генерируем примеры ОДИН РАЗ
+            examples, answers = generate_math_examples(request)
+            
+            # Общая основа верстается один раз, лист учителя — наложение ответов
+            try:
+                student_data, teacher_data = render_both_pdfs(examples, answers, subject="Математика")
+            except Exception as e:
+                logger.error("pdf_both_failed", error=str(e))
+                # Раздельное создание с текстовыми файлами на случай ошибки
+                return (
+                    create_pdf_with_grid(examples, subject="Математика"),
+                    create_pdf_for_teacher(examples, answers, subject="Математика"),
+                )
+            
+            student_pdf = save_to_temp_file(student_data, '.pdf')
+            teacher_pdf = save_to_temp_file(teacher_data, '.pdf')
         
-        print(f"Оба PDF созданы: ученик - {student_pdf}, учитель - {teacher_pdf}")
         return student_pdf, teacher_pdf
         
     except Exception as e:
-        print(f"Ошибка генерации обоих PDF: {e}")
-        raise e 
\ No newline at end of file
+        logger.error("math_pdf_both_failed", error=str(e))
+        raise e
+
+async def render_both_math_pdfs(request: MathGeneratorRequest) -> Tuple[bytes, bytes]:
+    """
+    Генерация обоих вариантов PDF одной версткой
+    
+    Примеры генерируются один раз, затем в пуле генерации одной задачей
+    последовательно верстается общая основа: из нее записывается PDF
+    ученика, а PDF учителя получается из копии основы наложением ответов
+    (см. render_both_pdfs), без второй верстки.
+    
+    Returns:
+        (PDF ученика, PDF учителя)
+    """
+    # Между процессами передается компактная пачка, а не списки строк
+    batch = await generation_executor.run(generate_example_batch, request)
+    
+    return await generation_executor.run(render_both_batch_pdfs, batch, "Математика")
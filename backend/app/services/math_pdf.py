@@ -0,0 +1,176 @@
+import pickle
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
+
+from fpdf import FPDF
+from fpdf.util import escape_parens
+
+from app.core.config import settings
+from app.services.math_generator import (
+    ANSWER_CELLS,
+    BOTTOM_GAP,
+    CELL_SIZE,
+    MARGIN,
+    MARGIN_TOP,
+    NUMBER_TO_EXAMPLE_GAP,
+    NUMBER_WIDTH,
+    grid_content_stream,
+)
+from app.services.worksheet_layout import LayoutPlan, get_layout_engine
+
+# Верстка PDF на fpdf2 вынесена из math_generator: модуль импортируется
+# функциями рендеринга при первом PDF, а не при запуске приложения
+
+# Стандартные шрифты PDF в порядке предпочтения
+FONT_FALLBACKS = ("Helvetica", "Arial", "Times")
+
+@lru_cache(maxsize=None)
+def resolve_font_family() -> str:
+    """Первый доступный шрифт из FONT_FALLBACKS (проверяется один раз на процесс)"""
+    probe = FPDF()
+    for family in FONT_FALLBACKS:
+        try:
+            probe.set_font(family, "B", 16)
+            return family
+        except Exception:
+            continue
+    return FONT_FALLBACKS[-1]
+
+@lru_cache(maxsize=8)
+def prototype_snapshot(subject: str, date_str: str) -> bytes:
+    """
+    Снимок документа с заголовком и сеткой на первой странице
+    
+    Строится один раз на предмет и дату (дата печатается в заголовке),
+    вместе со шрифтами и их метриками, уже загруженными в документ.
+    """
+    pdf = MathGridPDF(subject=subject)
+    pdf.draw_header()
+    pdf.draw_grid()
+    return pickle.dumps(pdf)
+
+class MathGridPDF(FPDF):
+    """Класс PDF с сеткой для математических примеров"""
+    
+    def __init__(self, subject="Математика", layout: Optional[str] = None):
+        super().__init__(orientation="P", unit="mm", format="A4")
+        self.subject = subject
+        self.set_layout(layout)
+        # Страницы добавляет только раскладка — автоматический перенос fpdf2
+        # срабатывал на последней строке и создавал страницу без сетки
+        self.set_auto_page_break(False)
+        self.add_page()
+        self.set_font(resolve_font_family(), "B", 16)
+    
+    @classmethod
+    def from_prototype(cls, subject="Математика", layout: Optional[str] = None) -> "MathGridPDF":
+        """Новый документ из готового прототипа (заголовок и сетка уже нарисованы)"""
+        pdf = pickle.loads(prototype_snapshot(subject, datetime.now().strftime("%d.%m.%Y")))
+        pdf.set_creation_date(datetime.now(timezone.utc))
+        pdf.set_layout(layout)
+        return pdf
+    
+    def set_layout(self, layout: Optional[str] = None):
+        """Выбор движка раскладки примеров (по умолчанию из settings.worksheet_layout)"""
+        engine = get_layout_engine(layout or settings.worksheet_layout)
+        self.layout = engine(
+            self.w, self.h, MARGIN, MARGIN_TOP, CELL_SIZE, BOTTOM_GAP,
+            NUMBER_WIDTH + NUMBER_TO_EXAMPLE_GAP
+        )
+        
+    def draw_header(self):
+        """Рисуем заголовок страницы"""
+        font_family = resolve_font_family()
+        
+        # Устанавливаем позицию для заголовка
+        self.set_y(10)
+        self.set_font(font_family, "B", 14)
+        
+        # Заголовок на английском для совместимости
+        self.cell(0, 8, "Math Worksheet", 0, 1, "C")
+        
+        # Добавляем строку для ФИО
+        self.set_font(font_family, "", 12)
+        self.cell(0, 10, "Name: _________________________", 0, 1, "L")
+        
+        # Добавляем дату
+        self.set_font(font_family, "", 10)
+        date_str = datetime.now().strftime("%d.%m.%Y")
+        self.cell(0, 8, f"Date: {date_str}", 0, 1, "L")
+        
+        # Добавляем дополнительное пространство после заголовка
+        self.ln(5)
+    
+    def draw_grid(self):
+        """Рисуем сетку на странице (готовым шаблоном из кэша)"""
+        self._out(grid_content_stream(self.w, self.h, self.k))
+    
+    def layout_examples(self, examples: Iterable[str], answers: Optional[Sequence[str]] = None) -> LayoutPlan:
+        """
+        Раскладываем примеры по сетке без ответов (общая основа обоих вариантов)
+        
+        Раскладка по страницам и колонкам рассчитывается движком заранее,
+        за один проход: позиция строки зависит только от ее индекса на странице.
+        Если ответы известны, место под ответ выбирается по самому широкому из
+        них, поэтому лист ученика и лист учителя раскладываются одинаково.
+        """
+        self.set_font(resolve_font_family(), "", 9)
+        
+        rows = [f"{example} =" for example in examples]
+        answer_space = ANSWER_CELLS * CELL_SIZE
+        if answers:
+            answer_space = max(answer_space, max(map(self.get_string_width, answers)) + CELL_SIZE)
+        
+        plan = self.layout.plan(rows, self.get_string_width, answer_space)
+        text_width = plan.column_width - plan.label_width
+        
+        for page_index, placements in enumerate(plan.pages()):
+            if page_index:
+                self.add_page()
+                self.draw_grid()
+            
+            for number, x, y, text in placements:
+                # Строка по центру клетки сетки: номер, затем пример
+                self.set_xy(x, y - 3)  # -3 для центрирования по вертикали
+                self.cell(plan.label_width, 6, f"{number}.")
+                self.cell(text_width, 6, text)
+        return plan
+    
+    def add_answer_overlay(self, plan: LayoutPlan, answers: Iterable[str]):
+        """
+        Накладываем ответы поверх готовой раскладки (вариант для учителя)
+        
+        На каждую страницу дописывается один текстовый блок BT/ET (в q/Q) с ответами
+        сразу после знака равенства — сетка, заголовок и примеры не
+        перерисовываются. Шрифт тот же, что у примеров, и уже подключен к
+        страницам при раскладке.
+        """
+        self.set_font(resolve_font_family(), "", 9)
+        font = f"/F{self.current_font.i} {self.font_size_pt:.2f} Tf"
+        space = self.get_string_width(" ")
+        # Базовая линия строки в ячейке высотой 6 мм, как у fpdf2 в cell()
+        baseline = 0.3 * self.font_size
+        
+        answers = iter(answers)
+        for page_index, placements in enumerate(plan.pages()):
+            ops = ["q 0 g BT", font]
+            for (number, x, y, text), answer in zip(placements, answers):
+                answer_x = x + plan.label_width + self.c_margin + self.get_string_width(text) + space
+                ops.append(
+                    f"1 0 0 1 {answer_x * self.k:.2f} {(self.h - y - baseline) * self.k:.2f} Tm "
+                    f"({escape_parens(answer)}) Tj"
+                )
+            ops.append("ET Q")
+            self.page = page_index + 1
+            self._out("\n".join(ops))
+        self.page = self.pages_count
+    
+    def add_examples_to_grid(self, examples: Iterable[str], answers: Optional[Iterable[str]] = None):
+        """Добавляем примеры в сетку (с ответами — вариант для учителя)"""
+        if answers is None:
+            self.layout_examples(examples)
+            return
+        answers = list(answers)
+        plan = self.layout_examples(examples, answers)
+        self.add_answer_overlay(plan, answers)
@@ -0,0 +1,562 @@
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Коды операций в матрице операторов (uint8)
+OPERATOR_SYMBOLS = ("+", "-", "*", "/")
+OPERATOR_CODES = {symbol: code for code, symbol in enumerate(OPERATOR_SYMBOLS)}
+ADD, SUB, MUL, DIV = range(len(OPERATOR_SYMBOLS))
+
+MAX_DIVISOR = 20  # Делители от 2 до 20 (как в исходном генераторе)
+VALUE_LIMIT = 10 ** 15  # Ограничение промежуточных значений, чтобы int64 не переполнялся
+MAX_REJECTION_ROUNDS = 1000  # Сколько раз можно перегенерировать отклоненные строки
+REJECTION_ROUNDS_BEFORE_CONSTRUCTION = 32  # Раундов отбраковки в sample_examples до перехода к построению
+MAX_CONSTRUCTION_ROUNDS = 32  # Предел повторов конструктивного генератора
+
+_DIVISOR_CANDIDATES = np.arange(2, MAX_DIVISOR + 1, dtype=np.int64)
+
+# Таблица делимости: _DIVISOR_TABLE[v, c] == True, если v делится на _DIVISOR_CANDIDATES[c]
+DIVISOR_TABLE_SIZE = 1 << 14
+_DIVISOR_TABLE = np.arange(DIVISOR_TABLE_SIZE, dtype=np.int64)[:, None] % _DIVISOR_CANDIDATES[None, :] == 0
+
+
+def encode_operators(operators: Sequence[str]) -> np.ndarray:
+    """Преобразует символы операций в коды"""
+    try:
+        return np.array([OPERATOR_CODES[op] for op in operators], dtype=np.uint8)
+    except KeyError as e:
+        raise ValueError(f"Неизвестная операция: {e.args[0]}")
+
+
+def decode_operators(codes: Sequence[int]) -> List[str]:
+    """Преобразует коды операций обратно в символы"""
+    return [OPERATOR_SYMBOLS[code] for code in codes]
+
+
+def format_problem(numbers: Sequence[int], codes: Sequence[int]) -> str:
+    """Форматирует строку примера без знака равенства: '12 + 5 - 3'"""
+    parts = [str(numbers[0])]
+    for number, code in zip(numbers[1:], codes):
+        parts.append(OPERATOR_SYMBOLS[code])
+        parts.append(str(number))
+    return " ".join(parts)
+
+
+def _pick_divisors(prefix: np.ndarray, max_divisor: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Подбирает делители для текущих промежуточных результатов
+
+    Для каждой строки выбирается случайный делитель из 2..20, на который
+    результат делится нацело. Если такого нет (или результат не положительный),
+    берется случайный делитель из 2..max_divisor, как и в исходном генераторе.
+    """
+    positive = prefix > 0
+    divisible = (prefix[:, None] % _DIVISOR_CANDIDATES[None, :] == 0)
+    divisible &= _DIVISOR_CANDIDATES[None, :] <= prefix[:, None]
+    divisible &= positive[:, None]
+
+    # Случайный выбор среди подходящих делителей: argmax по случайным весам
+    weights = rng.random(divisible.shape) * divisible
+    chosen = _DIVISOR_CANDIDATES[weights.argmax(axis=1)]
+
+    fallback = ~divisible.any(axis=1)
+    if fallback.any():
+        chosen[fallback] = rng.integers(2, max_divisor + 1, size=int(fallback.sum()))
+    return chosen
+
+
+def _draw_rows(
+    count: int,
+    numcount: int,
+    allowed_codes: np.ndarray,
+    low: int,
+    high: int,
+    rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Генерирует count строк и вычисляет их слева направо
+
+    Returns:
+        (numbers, operators, results, valid) — valid отмечает строки
+        с положительным результатом и без переполнения
+    """
+    max_divisor = max(2, min(MAX_DIVISOR, high))
+
+    operators = rng.choice(allowed_codes, size=(count, numcount - 1)).astype(np.uint8)
+    numbers = rng.integers(low, high + 1, size=(count, numcount), dtype=np.int64)
+
+    prefix = numbers[:, 0].copy()
+    valid = np.ones(count, dtype=bool)
+
+    for j in range(numcount - 1):
+        codes = operators[:, j]
+
+        division_rows = np.flatnonzero(codes == DIV)
+        if division_rows.size:
+            if j == 0:
+                # Первое число подгоняем под делитель: quotient * divisor
+                divisors = rng.integers(2, max_divisor + 1, size=division_rows.size)
+                quotients = rng.integers(1, np.maximum(high // divisors, 1) + 1)
+                numbers[division_rows, 0] = quotients * divisors
+                prefix[division_rows] = numbers[division_rows, 0]
+            else:
+                divisors = _pick_divisors(prefix[division_rows], max_divisor, rng)
+            numbers[division_rows, j + 1] = divisors
+
+        operand = numbers[:, j + 1]
+
+        # Защита от переполнения при умножении
+        multiply = codes == MUL
+        if multiply.any():
+            overflow = multiply & (np.abs(prefix) > VALUE_LIMIT // np.maximum(np.abs(operand), 1))
+            valid &= ~overflow
+
+        prefix = np.select(
+            [codes == ADD, codes == SUB, multiply, codes == DIV],
+            [
+                prefix + operand,
+                prefix - operand,
+                np.where(valid, prefix, 0) * operand,
+                prefix // np.where(operand == 0, 1, operand),
+            ],
+            prefix,
+        )
+
+    valid &= prefix > 0
+    return numbers, operators, prefix, valid
+
+
+def generate_batch(
+    count: int,
+    numcount: int,
+    operators: Sequence[str],
+    interval: Sequence[int],
+    rng: Optional[np.random.Generator] = None,
+    stats: Optional[Dict[str, int]] = None,
+    max_rounds: int = MAX_REJECTION_ROUNDS
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Векторная генерация пачки примеров
+
+    Операнды и операции для всех примеров генерируются сразу массивами NumPy,
+    вычисляются слева направо, а перегенерируются только отклоненные строки
+    (с неположительным результатом).
+
+    Args:
+        count: Количество примеров
+        numcount: Количество чисел в примере
+        operators: Допустимые операции ('+', '-', '*', '/')
+        interval: Диапазон чисел [начало, конец]
+        rng: Генератор случайных чисел (по умолчанию новый)
+        stats: Словарь для статистики ('rounds' и 'retries' — число перегенерированных строк)
+        max_rounds: Предел раундов перегенерации (ValueError, если не хватило)
+
+    Returns:
+        (numbers, operators, results): матрица чисел (count x numcount),
+        матрица кодов операций (count x numcount-1) и вектор ответов
+    """
+    if numcount < 2:
+        raise ValueError("Требуется два или более числа")
+    if not operators:
+        raise ValueError("Необходимо указать хотя бы одну операцию")
+
+    rng = rng if rng is not None else np.random.default_rng()
+    allowed_codes = encode_operators(operators)
+    low, high = int(interval[0]), int(interval[1])
+
+    numbers = np.empty((count, numcount), dtype=np.int64)
+    codes = np.empty((count, numcount - 1), dtype=np.uint8)
+    results = np.empty(count, dtype=np.int64)
+
+    rounds = 0
+    retries = 0
+    pending = np.arange(count)
+    while pending.size:
+        if rounds == max_rounds:
+            raise ValueError(
+                "Не удалось сгенерировать примеры с положительным ответом для заданных параметров"
+            )
+        if rounds:
+            retries += pending.size
+        rounds += 1
+
+        drawn_numbers, drawn_codes, drawn_results, valid = _draw_rows(
+            pending.size, numcount, allowed_codes, low, high, rng
+        )
+        accepted = pending[valid]
+        numbers[accepted] = drawn_numbers[valid]
+        codes[accepted] = drawn_codes[valid]
+        results[accepted] = drawn_results[valid]
+        pending = pending[~valid]
+
+    if stats is not None:
+        stats["rounds"] = rounds
+        stats["retries"] = retries
+    return numbers, codes, results
+
+
+# ============= КОНСТРУКТИВНЫЙ ГЕНЕРАТОР =============
+
+def _divisibility(values: np.ndarray) -> np.ndarray:
+    """Матрица делимости значений на 2..20 (из таблицы для небольших значений)"""
+    in_table = (values >= 0) & (values < DIVISOR_TABLE_SIZE)
+    if in_table.all():
+        return _DIVISOR_TABLE[values]
+    return values[:, None] % _DIVISOR_CANDIDATES[None, :] == 0
+
+
+def _pick_in_progression(
+    low: np.ndarray,
+    high: np.ndarray,
+    residue: np.ndarray,
+    step: np.ndarray,
+    rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Равномерный выбор числа x из [low, high] с x ≡ residue (mod step)
+
+    Returns:
+        (values, ok) — ok == False, если подходящих чисел нет
+    """
+    first = low + (residue - low) % step
+    count = np.where(first <= high, (high - first) // step + 1, 0)
+    ok = count > 0
+    offsets = rng.integers(0, np.maximum(count, 1))
+    return first + offsets * step, ok
+
+
+def _construct_rows(
+    codes: np.ndarray,
+    low: int,
+    high: int,
+    rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Конструктивная генерация чисел для заданной матрицы операций
+
+    Сначала от целевого ответа (>= 1) в обратном порядке вычисляются
+    требования к каждому промежуточному результату: минимальное значение
+    и кратность (для последующих делений). Затем выражение строится слева
+    направо: промежуточный результат хранится инкрементально, каждое число
+    выбирается из арифметической прогрессии, удовлетворяющей требованиям,
+    а делитель — по таблице делимости. Все промежуточные результаты
+    положительны, деление всегда нацело.
+
+    Returns:
+        (numbers, results, ok) — ok == False для строк, которые не удалось
+        построить (например, слишком узкий диапазон чисел)
+    """
+    rows, steps = codes.shape
+    max_divisor = max(2, min(MAX_DIVISOR, high))
+    ok = np.ones(rows, dtype=bool)
+
+    # Верхняя оценка достижимого промежуточного результата и "емкость" числа,
+    # которое задает остаток промежуточного результата по модулю делителей
+    # (для серии делений подряд — число перед серией)
+    reachable = np.empty((rows, steps + 1), dtype=np.int64)
+    absorber = np.empty((rows, steps + 1), dtype=np.int64)
+    division_run = np.zeros((rows, steps + 1), dtype=np.int64)
+    reachable[:, 0] = high
+    absorber[:, 0] = max(high, 1)
+    for j in range(steps):
+        current = reachable[:, j]
+        column = codes[:, j]
+        reachable[:, j + 1] = np.select(
+            [column == ADD, column == SUB, column == MUL],
+            [
+                current + high,
+                current - low,
+                np.where(current > VALUE_LIMIT // max(high, 1), VALUE_LIMIT, current * max(high, 1)),
+            ],
+            current // 2,
+        )
+        absorber[:, j + 1] = np.select(
+            [(column == ADD) | (column == SUB), column == MUL],
+            [high - low + 1, max(high, 1)],
+            absorber[:, j],
+        )
+        division_run[:, j + 1] = np.where(column == DIV, division_run[:, j] + 1, 0)
+
+    # Обратный проход: требования (кратность, минимум) к промежуточным результатам
+    modulus = np.ones((rows, steps + 1), dtype=np.int64)
+    floor = np.ones((rows, steps + 1), dtype=np.int64)
+    planned_divisors = np.zeros((rows, steps), dtype=np.int64)
+    for j in range(steps, 0, -1):
+        column = codes[:, j - 1]
+        m, f = modulus[:, j], floor[:, j]
+
+        division = column == DIV
+        if division.any():
+            # Наибольший делитель, при котором требование еще достижимо
+            # (с запасом не меньше 2 на каждое предшествующее деление серии)
+            smallest_multiple = -(-f // m) * m
+            limit = np.minimum(max_divisor, reachable[:, j - 1] // smallest_multiple)
+            limit = np.minimum(limit, (absorber[:, j - 1] // m) >> division_run[:, j - 1])
+            ok &= ~division | (limit >= 2)
+            divisors = rng.integers(2, np.maximum(limit, 2) + 1)
+            planned_divisors[:, j - 1] = np.where(division, divisors, 0)
+
+        modulus[:, j - 1] = np.where(division, m * planned_divisors[:, j - 1], 1)
+        floor[:, j - 1] = np.select(
+            [column == ADD, column == SUB, column == MUL, division],
+            [
+                f - high + m - 1,
+                f + low + m - 1,
+                -(-f // max(high, 1)),
+                f * planned_divisors[:, j - 1],
+            ],
+        ).clip(min=1)
+
+    numbers = np.zeros((rows, steps + 1), dtype=np.int64)
+
+    # Первое число: кратно требуемому модулю и не меньше требуемого минимума
+    first, first_ok = _pick_in_progression(
+        np.maximum(low, floor[:, 0]), np.full(rows, high), np.zeros(rows, dtype=np.int64), modulus[:, 0], rng
+    )
+    ok &= first_ok
+    numbers[:, 0] = first
+    prefix = np.where(ok, first, 1)
+
+    for j in range(steps):
+        column = codes[:, j]
+        m, f = modulus[:, j + 1], floor[:, j + 1]
+        operand = np.ones(rows, dtype=np.int64)
+
+        for code in (ADD, SUB, MUL):
+            idx = np.flatnonzero((column == code) & ok)
+            if not idx.size:
+                continue
+            p, mi, fi = prefix[idx], m[idx], f[idx]
+            if code == ADD:
+                values, step_ok = _pick_in_progression(
+                    np.maximum(low, fi - p), np.full(idx.size, high), -p % mi, mi, rng
+                )
+            elif code == SUB:
+                values, step_ok = _pick_in_progression(
+                    np.full(idx.size, low), np.minimum(high, p - fi), p % mi, mi, rng
+                )
+            else:
+                step = mi // np.gcd(p, mi)
+                values, step_ok = _pick_in_progression(
+                    np.maximum(max(low, 1), -(-fi // p)),
+                    np.minimum(high, VALUE_LIMIT // p),
+                    np.zeros(idx.size, dtype=np.int64),
+                    step,
+                    rng
+                )
+            operand[idx] = np.where(step_ok, values, 1)
+            ok[idx] &= step_ok
+
+        idx = np.flatnonzero((column == DIV) & ok)
+        if idx.size:
+            # Любой делитель из таблицы, сохраняющий требования к следующему результату
+            p, mi, fi = prefix[idx], m[idx], f[idx]
+            quotients = p[:, None] // _DIVISOR_CANDIDATES[None, :]
+            suitable = _divisibility(p)
+            suitable &= _DIVISOR_CANDIDATES[None, :] <= max_divisor
+            suitable &= quotients % mi[:, None] == 0
+            suitable &= quotients >= fi[:, None]
+            weights = rng.random(suitable.shape) * suitable
+            chosen = _DIVISOR_CANDIDATES[weights.argmax(axis=1)]
+            # Запланированный делитель всегда подходит, но страхуемся
+            chosen = np.where(suitable.any(axis=1), chosen, planned_divisors[idx, j])
+            operand[idx] = chosen
+
+        numbers[:, j + 1] = operand
+        prefix = np.select(
+            [column == ADD, column == SUB, column == MUL, column == DIV],
+            [prefix + operand, prefix - operand, prefix * operand, prefix // np.maximum(operand, 1)],
+        )
+        prefix = np.where(ok, prefix, 1)
+
+    ok &= prefix > 0
+    return numbers, prefix, ok
+
+
+def generate_constructive_batch(
+    count: int,
+    numcount: int,
+    operators: Sequence[str],
+    interval: Sequence[int],
+    rng: Optional[np.random.Generator] = None,
+    stats: Optional[Dict[str, int]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Генерация пачки примеров без отбраковки (по построению)
+
+    В отличие от generate_batch, числа подбираются так, чтобы ответ был
+    положительным, а деление — нацело, поэтому перегенерация нужна только
+    для строк, где требования невыполнимы при выбранных операциях
+    (например, узкий диапазон чисел), и ограничена MAX_CONSTRUCTION_ROUNDS.
+
+    Аргументы и результат — как у generate_batch.
+    """
+    if numcount < 2:
+        raise ValueError("Требуется два или более числа")
+    if not operators:
+        raise ValueError("Необходимо указать хотя бы одну операцию")
+
+    rng = rng if rng is not None else np.random.default_rng()
+    allowed_codes = encode_operators(operators)
+    low, high = int(interval[0]), int(interval[1])
+
+    numbers = np.empty((count, numcount), dtype=np.int64)
+    codes = np.empty((count, numcount - 1), dtype=np.uint8)
+    results = np.empty(count, dtype=np.int64)
+
+    rounds = 0
+    retries = 0
+    pending = np.arange(count)
+    while pending.size:
+        if rounds == MAX_CONSTRUCTION_ROUNDS:
+            raise ValueError(
+                "Не удалось построить примеры с положительным ответом для заданных параметров"
+            )
+        if rounds:
+            retries += pending.size
+        rounds += 1
+
+        drawn_codes = rng.choice(allowed_codes, size=(pending.size, numcount - 1)).astype(np.uint8)
+        drawn_numbers, drawn_results, valid = _construct_rows(drawn_codes, low, high, rng)
+        accepted = pending[valid]
+        numbers[accepted] = drawn_numbers[valid]
+        codes[accepted] = drawn_codes[valid]
+        results[accepted] = drawn_results[valid]
+        pending = pending[~valid]
+
+    if stats is not None:
+        stats["rounds"] = rounds
+        stats["retries"] = retries
+    return numbers, codes, results
+
+
+def construct_numbers(
+    operators: Sequence[str],
+    interval: Sequence[int],
+    rng: Optional[np.random.Generator] = None
+) -> Tuple[List[int], int]:
+    """
+    Подбор чисел для заданной последовательности операций
+
+    Returns:
+        (numbers, result)
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    codes = encode_operators(operators)[None, :]
+    low, high = int(interval[0]), int(interval[1])
+
+    for _ in range(MAX_CONSTRUCTION_ROUNDS):
+        numbers, results, valid = _construct_rows(codes, low, high, rng)
+        if valid[0]:
+            return numbers[0].tolist(), int(results[0])
+    raise ValueError(
+        "Не удалось построить пример с положительным ответом для заданных операций"
+    )
+
+
+def sample_examples(
+    count: int,
+    numcount: int,
+    operators: Sequence[str],
+    interval: Sequence[int],
+    rng: Optional[np.random.Generator] = None,
+    stats: Optional[Dict[str, int]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Генерация пачки примеров подходящим способом
+
+    Наборы с делением строятся конструктивно (без отбраковки), остальные —
+    векторной генерацией с перегенерацией отклоненных строк. Если за
+    REJECTION_ROUNDS_BEFORE_CONSTRUCTION раундов принять все строки
+    не удалось (например, много вычитаний в узком диапазоне, где
+    положительный ответ — доли процента), пачка строится конструктивно.
+    """
+    if "/" in operators:
+        return generate_constructive_batch(count, numcount, operators, interval, rng, stats)
+    try:
+        return generate_batch(
+            count, numcount, operators, interval, rng, stats, max_rounds=REJECTION_ROUNDS_BEFORE_CONSTRUCTION
+        )
+    except ValueError:
+        return generate_constructive_batch(count, numcount, operators, interval, rng, stats)
+
+
+FORMAT_CHUNK_SIZE = 256  # Сколько строк переводится в Python-объекты за раз при форматировании
+
+
+class ExampleBatch:
+    """
+    Компактная пачка примеров
+
+    Операнды хранятся матрицей int32 (или int64, если диапазон не помещается),
+    операции — матрицей кодов uint8, ответы — вектором int64. Строки примеров
+    и ответов не хранятся: они форматируются лениво, порциями, только когда
+    их запрашивает рендерер.
+    """
+
+    __slots__ = ("numbers", "codes", "results")
+
+    def __init__(self, numbers: np.ndarray, codes: np.ndarray, results: np.ndarray):
+        self.numbers = numbers
+        self.codes = codes
+        self.results = results
+
+    @classmethod
+    def sample(
+        cls,
+        count: int,
+        numcount: int,
+        operators: Sequence[str],
+        interval: Sequence[int],
+        rng: Optional[np.random.Generator] = None,
+        stats: Optional[Dict[str, int]] = None
+    ) -> "ExampleBatch":
+        """Генерация пачки через sample_examples с упаковкой операндов"""
+        numbers, codes, results = sample_examples(count, numcount, operators, interval, rng, stats)
+        bound = max(abs(int(interval[0])), abs(int(interval[1])))
+        if bound <= np.iinfo(np.int32).max:
+            numbers = numbers.astype(np.int32)
+        return cls(numbers, codes, results)
+
+    @classmethod
+    def concatenate(cls, batches: Sequence["ExampleBatch"]) -> "ExampleBatch":
+        """Одна пачка из нескольких (порций одного запроса) подряд"""
+        if len(batches) == 1:
+            return batches[0]
+        return cls(
+            np.concatenate([batch.numbers for batch in batches]),
+            np.concatenate([batch.codes for batch in batches]),
+            np.concatenate([batch.results for batch in batches]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __getitem__(self, rows: slice) -> "ExampleBatch":
+        """Строки пачки срезом (без копирования массивов)"""
+        return ExampleBatch(self.numbers[rows], self.codes[rows], self.results[rows])
+
+    @property
+    def nbytes(self) -> int:
+        """Объем данных пачки в байтах"""
+        return self.numbers.nbytes + self.codes.nbytes + self.results.nbytes
+
+    def problem(self, index: int) -> str:
+        """Текст одного примера без знака равенства"""
+        return format_problem(self.numbers[index].tolist(), self.codes[index].tolist())
+
+    def answer(self, index: int) -> str:
+        """Ответ одного примера"""
+        return str(int(self.results[index]))
+
+    def problems(self) -> Iterator[str]:
+        """Ленивое форматирование всех примеров"""
+        for start in range(0, len(self), FORMAT_CHUNK_SIZE):
+            stop = start + FORMAT_CHUNK_SIZE
+            for row_numbers, row_codes in zip(self.numbers[start:stop].tolist(), self.codes[start:stop].tolist()):
+                yield format_problem(row_numbers, row_codes)
+
+    def answers(self) -> Iterator[str]:
+        """Ленивое форматирование всех ответов"""
+        for start in range(0, len(self), FORMAT_CHUNK_SIZE):
+            for result in self.results[start:start + FORMAT_CHUNK_SIZE].tolist():
+                yield str(result)
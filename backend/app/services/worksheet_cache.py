@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Версия формата кэша: увеличивается при изменении верстки PDF,
+# чтобы старые файлы на диске не отдавались после обновления
+CACHE_FORMAT_VERSION = 3
+
+
+class WorksheetCache:
+    """
+    Кэш готовых рабочих листов с адресацией по содержимому
+
+    Ключ — SHA-256 нормализованного запроса и варианта (ученик/учитель).
+    Два уровня: LRU в памяти процесса и файлы на диске. Оба уровня
+    ограничены по суммарному размеру, при переполнении вытесняются самые
+    давно использованные записи. Кэшируются только запросы с зерном —
+    без него результат случаен и повторно не запрашивается.
+    """
+
+    def __init__(self, memory_limit: int, disk_dir: Optional[str], disk_limit: int):
+        self.memory_limit = memory_limit
+        self.disk_dir = disk_dir
+        self.disk_limit = disk_limit
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk_size: Optional[int] = None  # Считается при первом обращении к диску
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    @staticmethod
+    def make_key(request: Any, variant: str) -> str:
+        """
+        Ключ кэша для запроса генерации
+
+        Дата входит в ключ, потому что печатается в заголовке листа.
+        """
+        payload = {
+            "format": CACHE_FORMAT_VERSION,
+            "app_version": settings.app_version,
+            "layout": settings.worksheet_layout,
+            "variant": variant,
+            "date": date.today().isoformat(),
+            "request": request.model_dump(mode="json"),
+        }
+        normalized = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Поиск в памяти, затем на диске (найденное на диске поднимается в память)"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._put_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Сохранение результата на оба уровня"""
+        data = bytes(data)
+        with self._lock:
+            self._put_memory(key, data)
+        self._write_disk(key, data)
+
+    def clear(self) -> None:
+        """Очистка уровня в памяти (файлы на диске остаются)"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "memory_limit": self.memory_limit,
+                "disk_bytes": self._disk_size,
+                "disk_limit": self.disk_limit if self.disk_dir else 0,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+            }
+
+    # ---- уровень в памяти (вызывается под блокировкой) ----
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_limit:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+
+        self._memory[key] = data
+        self._memory_size += len(data)
+
+        while self._memory_size > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.memory_evictions += 1
+
+    # ---- уровень на диске ----
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.bin")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Время доступа для LRU-вытеснения храним в mtime
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Не удалось прочитать кэш {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if not self.disk_dir or len(data) > self.disk_limit:
+            return
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            existed = os.path.exists(path)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Не удалось записать кэш {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = self._scan_disk_size()
+            elif not existed:
+                self._disk_size += len(data)
+            over_limit = self._disk_size > self.disk_limit
+
+        if over_limit:
+            self._evict_disk()
+
+    def _scan_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _scan_disk_size(self) -> int:
+        return sum(size for _, size, _ in self._scan_files())
+
+    def _evict_disk(self) -> None:
+        """Удаление самых давно использованных файлов до 90% лимита"""
+        entries = sorted(self._scan_files(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.disk_limit * 0.9)
+
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._disk_size = total
+            self.disk_evictions += evicted
+
+
+# Глобальный экземпляр кэша
+worksheet_cache = WorksheetCache(
+    memory_limit=settings.worksheet_cache_memory_mb * 1024 * 1024,
+    disk_dir=(
+        os.path.join(settings.generated_files_dir, "cache")
+        if settings.worksheet_cache_disk_mb > 0 else None
+    ),
+    disk_limit=settings.worksheet_cache_disk_mb * 1024 * 1024,
+)
@@ -0,0 +1,329 @@
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from app.core.config import settings
+from app.services.math_generator import (
+    ANSWER_CELLS,
+    BOTTOM_GAP,
+    CELL_SIZE,
+    GRID_COLOR_DARK,
+    GRID_COLOR_LIGHT,
+    GRID_WIDTH_DARK,
+    GRID_WIDTH_LIGHT,
+    MARGIN,
+    MARGIN_TOP,
+    NUMBER_TO_EXAMPLE_GAP,
+    NUMBER_WIDTH,
+)
+from app.services.math_sampler import ExampleBatch
+from app.services.worksheet_layout import LayoutPlan, get_layout_engine
+
+# Форматы вывода рабочего листа и их MIME-типы (порядок — предпочтение сервера)
+FORMAT_MEDIA_TYPES: Dict[str, str] = {
+    "pdf": "application/pdf",
+    "json": "application/json",
+    "svg": "image/svg+xml",
+    "html": "text/html",
+}
+
+# Геометрия листа в миллиметрах (как у MathGridPDF; общая с потоковым PDF)
+PAGE_WIDTH = 210.0
+PAGE_HEIGHT = 297.0
+SCALE = 72 / 25.4  # Пунктов в миллиметре
+CELL_MARGIN = 1.0  # Внутренний отступ ячейки fpdf2 (мм)
+FONT_SIZE = 9  # Кегль строк примеров, пт
+FONT_FAMILY = "Helvetica, Arial, sans-serif"
+
+GRID_AREA_WIDTH = PAGE_WIDTH - 2 * MARGIN
+GRID_AREA_HEIGHT = PAGE_HEIGHT - MARGIN_TOP - MARGIN
+
+
+class NotAcceptable(ValueError):
+    """Ни один из поддерживаемых форматов не подходит под заголовок Accept"""
+
+
+def negotiate_format(explicit: Optional[str], accept: Optional[str]) -> str:
+    """
+    Выбор формата: явный параметр format, иначе заголовок Accept
+
+    Без заголовка, с */* и для навигации браузера (Accept с
+    application/xhtml+xml, как при отправке обычной формы) остается PDF —
+    прежнее поведение эндпоинта.
+
+    Raises:
+        ValueError: Неизвестный формат в параметре
+        NotAcceptable: Accept не допускает ни одного формата
+    """
+    if explicit:
+        name = explicit.strip().lower()
+        if name not in FORMAT_MEDIA_TYPES:
+            raise ValueError(f"Неизвестный формат: {explicit}. Доступны: {', '.join(FORMAT_MEDIA_TYPES)}")
+        return name
+
+    if not accept or "application/xhtml+xml" in accept:
+        return "pdf"
+
+    weights: Dict[str, float] = {}
+    for item in accept.split(","):
+        media_type, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[media_type.strip().lower()] = quality
+
+    def quality_of(media_type: str) -> float:
+        if media_type in weights:
+            return weights[media_type]
+        major = media_type.split("/")[0]
+        return weights.get(f"{major}/*", weights.get("*/*", 0.0))
+
+    best_name, best_quality = None, 0.0
+    for name, media_type in FORMAT_MEDIA_TYPES.items():
+        quality = quality_of(media_type)
+        if quality > best_quality:
+            best_name, best_quality = name, quality
+    if best_name is None:
+        raise NotAcceptable(f"Поддерживаемые форматы: {', '.join(FORMAT_MEDIA_TYPES.values())}")
+    return best_name
+
+
+@lru_cache(maxsize=None)
+def core_font_widths(font: str) -> Dict[str, int]:
+    """
+    Метрики стандартного шрифта PDF из fpdf2 (ширина символа в 1/1000 кегля)
+
+    Таблица импортируется при первом измерении строки: модуль fpdf.fonts
+    загружает весь пакет fpdf2, а этот модуль импортируется при запуске.
+    """
+    from fpdf.fonts import CORE_FONTS_CHARWIDTHS
+
+    return CORE_FONTS_CHARWIDTHS[font]
+
+
+def text_width(text: str, size: float = FONT_SIZE, font: str = "helvetica") -> float:
+    """Ширина строки стандартного шрифта в мм (по метрикам fpdf2, без документа)"""
+    widths = core_font_widths(font)
+    return sum(widths.get(ch, 0) for ch in text) * size / 1000 / SCALE
+
+
+def plan_worksheet(problems: Sequence[str], answers: Sequence[str], layout: Optional[str] = None,
+                   font: str = "helvetica") -> LayoutPlan:
+    """Та же раскладка, что у PDF (MathGridPDF.layout_examples), без рендеринга"""
+    return plan_rows([f"{problem} =" for problem in problems], answers, layout, font)
+
+
+def plan_rows(rows: Sequence[str], answers: Iterable[str], layout: Optional[str] = None,
+              font: str = "helvetica") -> LayoutPlan:
+    """
+    Раскладка готовых строк ("пример =") с местом под самый широкий ответ
+
+    Строки и ответы только перебираются, поэтому могут быть ленивыми
+    (как у потокового PDF, где примеры генерируются порциями).
+    """
+    engine = get_layout_engine(layout or settings.worksheet_layout)(
+        PAGE_WIDTH, PAGE_HEIGHT, MARGIN, MARGIN_TOP, CELL_SIZE, BOTTOM_GAP,
+        NUMBER_WIDTH + NUMBER_TO_EXAMPLE_GAP
+    )
+
+    def measure(text: str) -> float:
+        return text_width(text, FONT_SIZE, font)
+
+    answer_space = ANSWER_CELLS * CELL_SIZE
+    widest_answer = max(map(measure, answers), default=None)
+    if widest_answer is not None:
+        answer_space = max(answer_space, widest_answer + CELL_SIZE)
+    return engine.plan(rows, measure, answer_space)
+
+
+def _header_lines() -> List[tuple]:
+    """Строки заголовка первой страницы: (текст, кегль, жирный, верх ячейки, высота, по центру)"""
+    return [
+        ("Math Worksheet", 14, True, 10, 8, True),
+        ("Name: _________________________", 12, False, 18, 10, False),
+        (f"Date: {datetime.now().strftime('%d.%m.%Y')}", 10, False, 28, 8, False),
+    ]
+
+
+# ---- JSON ----
+
+def render_json_preview(batch: ExampleBatch, for_teacher: bool = False, layout: Optional[str] = None) -> bytes:
+    """Примеры списком для предпросмотра на экране (ответы — только для учителя)"""
+    problems = list(batch.problems())
+    answers = list(batch.answers())
+    plan = plan_worksheet(problems, answers, layout)
+
+    examples = []
+    for number, (problem, answer) in enumerate(zip(problems, answers), start=1):
+        example = {"number": number, "problem": problem}
+        if for_teacher:
+            example["answer"] = answer
+        examples.append(example)
+
+    return json.dumps({
+        "variant": "teacher" if for_teacher else "student",
+        "count": len(examples),
+        "pages": plan.page_count,
+        "columns": plan.columns,
+        "examples": examples,
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# ---- SVG ----
+
+def _svg_text(x: float, top: float, height: float, size: float, text: str, bold: bool = False) -> str:
+    """Текст в ячейке с верхним краем top — базовая линия как у cell() в fpdf2"""
+    baseline = top + height / 2 + 0.3 * size / SCALE
+    weight = ' font-weight="bold"' if bold else ""
+    return (
+        f'<text x="{x + CELL_MARGIN:.2f}" y="{baseline:.2f}" font-size="{size / SCALE:.3f}"{weight}>'
+        f"{escape(text)}</text>"
+    )
+
+
+def _svg_color(value: int) -> str:
+    return f"#{value:02x}{value:02x}{value:02x}"
+
+
+def svg_grid() -> str:
+    """Сетка страницы двумя путями, как grid_content_stream у PDF (тонкие и темные линии)"""
+    light, dark = [], []
+    for y in range(0, int(GRID_AREA_HEIGHT) + 1, CELL_SIZE):
+        lines = dark if y % (5 * CELL_SIZE) == 0 else light
+        lines.append(f"M{MARGIN} {MARGIN_TOP + y}h{GRID_AREA_WIDTH:g}")
+    for x in range(0, int(GRID_AREA_WIDTH) + 1, CELL_SIZE):
+        lines = dark if x % (5 * CELL_SIZE) == 0 else light
+        lines.append(f"M{MARGIN + x} {MARGIN_TOP}v{GRID_AREA_HEIGHT:g}")
+
+    return "".join(
+        f'<path d="{"".join(lines)}" fill="none" stroke="{_svg_color(color)}" stroke-width="{width}"/>'
+        for color, width, lines in (
+            (GRID_COLOR_LIGHT, GRID_WIDTH_LIGHT, light),
+            (GRID_COLOR_DARK, GRID_WIDTH_DARK, dark),
+        )
+    )
+
+
+def render_svg(batch: ExampleBatch, for_teacher: bool = False, layout: Optional[str] = None) -> bytes:
+    """
+    Лист в SVG: страницы одна под другой
+
+    Сетка описывается один раз в <defs> и подключается к каждой странице
+    через <use>, поэтому размер файла растет только за счет текста примеров.
+    """
+    problems = list(batch.problems())
+    answers = list(batch.answers())
+    plan = plan_worksheet(problems, answers, layout)
+    height = PAGE_HEIGHT * plan.page_count
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{PAGE_WIDTH:g}mm" height="{height:g}mm" viewBox="0 0 {PAGE_WIDTH:g} {height:g}" '
+        f'font-family="{FONT_FAMILY}">',
+        f'<defs><g id="page"><rect width="{PAGE_WIDTH:g}" height="{PAGE_HEIGHT:g}" fill="#fff"/>'
+        f"{svg_grid()}</g></defs>",
+    ]
+
+    answer_iter = iter(answers)
+    for page_index, placements in enumerate(plan.pages()):
+        parts.append(f'<g transform="translate(0 {page_index * PAGE_HEIGHT:g})"><use xlink:href="#page"/>')
+        if page_index == 0:
+            for text, size, bold, top, cell_height, centered in _header_lines():
+                x = MARGIN
+                if centered:
+                    x += (GRID_AREA_WIDTH - text_width(text, size, "helveticaB" if bold else "helvetica")) / 2
+                    x -= CELL_MARGIN
+                parts.append(_svg_text(x, top, cell_height, size, text, bold))
+
+        for (number, x, y, text), answer in zip(placements, answer_iter):
+            parts.append(_svg_text(x, y - 3, 6, FONT_SIZE, f"{number}."))
+            parts.append(_svg_text(x + plan.label_width, y - 3, 6, FONT_SIZE, text))
+            if for_teacher:
+                answer_x = x + plan.label_width + text_width(text + " ")
+                parts.append(_svg_text(answer_x, y - 3, 6, FONT_SIZE, answer))
+        parts.append("</g>")
+
+    parts.append("</svg>")
+    return "".join(parts).encode("utf-8")
+
+
+# ---- HTML ----
+
+HTML_STYLE = f"""
+@page {{ size: A4; margin: 0; }}
+* {{ box-sizing: border-box; }}
+body {{ margin: 0; font-family: {FONT_FAMILY}; -webkit-print-color-adjust: exact; print-color-adjust: exact; }}
+.page {{ position: relative; width: {PAGE_WIDTH:g}mm; height: {PAGE_HEIGHT:g}mm; overflow: hidden;
+  page-break-after: always; break-after: page; background: #fff; }}
+.grid {{ position: absolute; left: {MARGIN}mm; top: {MARGIN_TOP}mm; width: {GRID_AREA_WIDTH:g}mm; height: {GRID_AREA_HEIGHT:g}mm;
+  border-right: 0.1mm solid #c8c8c8;
+  background-image:
+    linear-gradient(to right, #969696 0.25mm, transparent 0.25mm),
+    linear-gradient(to bottom, #969696 0.25mm, transparent 0.25mm),
+    linear-gradient(to right, #c8c8c8 0.1mm, transparent 0.1mm),
+    linear-gradient(to bottom, #c8c8c8 0.1mm, transparent 0.1mm);
+  background-size: {5 * CELL_SIZE}mm {5 * CELL_SIZE}mm, {5 * CELL_SIZE}mm {5 * CELL_SIZE}mm,
+    {CELL_SIZE}mm {CELL_SIZE}mm, {CELL_SIZE}mm {CELL_SIZE}mm; }}
+.line {{ position: absolute; left: {MARGIN}mm; width: {PAGE_WIDTH - 2 * MARGIN:g}mm; padding: 0 {CELL_MARGIN:g}mm;
+  white-space: nowrap; }}
+.title {{ top: 10mm; line-height: 8mm; font-size: 14pt; font-weight: bold; text-align: center; }}
+.name {{ top: 18mm; line-height: 10mm; font-size: 12pt; }}
+.date {{ top: 28mm; line-height: 8mm; font-size: 10pt; }}
+.row {{ position: absolute; height: 6mm; line-height: 6mm; font-size: {FONT_SIZE}pt; white-space: nowrap; }}
+.row .n {{ display: inline-block; padding-left: {CELL_MARGIN:g}mm; }}
+.row .e {{ padding-left: {CELL_MARGIN:g}mm; }}
+@media screen {{ body {{ background: #eee; }} .page {{ margin: 10mm auto; box-shadow: 0 0 2mm #999; }} }}
+"""
+
+
+def render_html(batch: ExampleBatch, for_teacher: bool = False, layout: Optional[str] = None) -> bytes:
+    """Страница для печати: листы A4 с сеткой на CSS и примерами по той же раскладке"""
+    problems = list(batch.problems())
+    answers = list(batch.answers())
+    plan = plan_worksheet(problems, answers, layout)
+    title, name, date_line = (line[0] for line in _header_lines())
+
+    parts = [
+        '<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">',
+        f"<title>{escape(title)}</title><style>{HTML_STYLE}</style></head><body>",
+    ]
+
+    answer_iter = iter(answers)
+    for page_index, placements in enumerate(plan.pages()):
+        parts.append('<section class="page"><div class="grid"></div>')
+        if page_index == 0:
+            parts.append(
+                f'<div class="line title">{escape(title)}</div>'
+                f'<div class="line name">{escape(name)}</div>'
+                f'<div class="line date">{escape(date_line)}</div>'
+            )
+        for (number, x, y, text), answer in zip(placements, answer_iter):
+            shown = f"{text} {answer}" if for_teacher else text
+            parts.append(
+                f'<div class="row" style="left:{x:.2f}mm;top:{y - 3:.2f}mm">'
+                f'<span class="n" style="width:{plan.label_width:.2f}mm">{number}.</span>'
+                f'<span class="e">{escape(shown)}</span></div>'
+            )
+        parts.append("</section>")
+
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+RENDERERS = {
+    "json": render_json_preview,
+    "svg": render_svg,
+    "html": render_html,
+}
+
+
+def render_batch_format(batch: ExampleBatch, output_format: str, for_teacher: bool = False) -> bytes:
+    """Лист в легком формате (json, svg, html) из готовой пачки примеров"""
+    return RENDERERS[output_format](batch, for_teacher)
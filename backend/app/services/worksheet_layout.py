@@ -0,0 +1,158 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+# Позиция строки на странице: (номер примера, x колонки, y центра строки, текст)
+Placement = Tuple[int, float, float, str]
+
+
+class LayoutPlan:
+    """
+    Заранее рассчитанная раскладка листа
+
+    Позиция каждой строки вычисляется арифметически по ее индексу на
+    странице (колонка и строка внутри страницы), без проверок выхода за
+    нижний край по ходу верстки.
+    """
+
+    __slots__ = ("rows", "columns", "rows_per_page", "column_width", "label_width", "left", "top", "row_height")
+
+    def __init__(self, rows: Sequence[str], columns: int, rows_per_page: int, column_width: float,
+                 label_width: float, left: float, top: float, row_height: float):
+        self.rows = rows
+        self.columns = columns
+        self.rows_per_page = rows_per_page
+        self.column_width = column_width
+        self.label_width = label_width
+        self.left = left
+        self.top = top
+        self.row_height = row_height
+
+    @property
+    def per_page(self) -> int:
+        return self.columns * self.rows_per_page
+
+    @property
+    def page_count(self) -> int:
+        return max(1, math.ceil(len(self.rows) / self.per_page))
+
+    def pages(self, start: int = 0, stop: Optional[int] = None) -> Iterator[List[Placement]]:
+        """
+        Строки по страницам start..stop (с 0, по умолчанию все)
+
+        Колонки заполняются сверху вниз, слева направо; строки каждой
+        страницы берутся из rows срезом.
+        """
+        per_page = self.per_page
+        stop = self.page_count if stop is None else min(stop, self.page_count)
+        for page_start in range(start * per_page, stop * per_page, per_page):
+            placements = []
+            for offset, text in enumerate(self.rows[page_start:page_start + per_page]):
+                column, row = divmod(offset, self.rows_per_page)
+                placements.append((
+                    page_start + offset + 1,
+                    self.left + column * self.column_width,
+                    self.top + row * self.row_height,
+                    text,
+                ))
+            yield placements
+
+
+class WorksheetLayout(ABC):
+    """
+    Базовый движок раскладки примеров по сетке
+
+    Геометрия задается в миллиметрах: первая строка — в центре первой
+    клетки под заголовком, последняя — не ниже bottom. Подклассы решают,
+    сколько колонок поместить на страницу и какой они ширины.
+    """
+
+    name = "base"
+
+    def __init__(self, page_width: float, page_height: float, margin: float, margin_top: float,
+                 cell_size: float, bottom_gap: float, label_width: float):
+        self.page_width = page_width
+        self.page_height = page_height
+        self.margin = margin
+        self.cell_size = cell_size
+        self.label_width = label_width
+        self.top = margin_top + cell_size // 2
+        self.bottom = page_height - margin - bottom_gap
+
+    @property
+    def rows_per_page(self) -> int:
+        return int((self.bottom - self.top) // self.cell_size) + 1
+
+    @property
+    def usable_width(self) -> float:
+        return self.page_width - 2 * self.margin
+
+    def single_column(self, rows: Sequence[str]) -> LayoutPlan:
+        """Раскладка в одну колонку на всю ширину"""
+        return LayoutPlan(
+            rows, 1, self.rows_per_page, self.usable_width,
+            self.label_width, self.margin, self.top, self.cell_size
+        )
+
+    @abstractmethod
+    def plan(self, rows: Sequence[str], measure: Callable[[str], float], answer_space: float = 0) -> LayoutPlan:
+        """
+        Раскладка строк
+
+        Args:
+            rows: Тексты строк (пример со знаком равенства или с ответом)
+            measure: Ширина текста в мм текущим шрифтом
+            answer_space: Место под ответ справа от примера в мм
+        """
+
+
+class SingleColumnLayout(WorksheetLayout):
+    """Одна колонка на всю ширину (исходная раскладка)"""
+
+    name = "single"
+
+    def plan(self, rows: Sequence[str], measure: Callable[[str], float], answer_space: float = 0) -> LayoutPlan:
+        return self.single_column(rows)
+
+
+class MultiColumnLayout(WorksheetLayout):
+    """
+    Несколько колонок на странице
+
+    Ширина колонки определяется самым широким примером (плюс номер и место
+    под ответ) и округляется до целых клеток, чтобы колонки начинались на
+    линиях сетки. Колонок столько, сколько помещается по ширине.
+    """
+
+    name = "columns"
+
+    def plan(self, rows: Sequence[str], measure: Callable[[str], float], answer_space: float = 0) -> LayoutPlan:
+        if not rows:
+            return self.single_column(rows)
+
+        cell = self.cell_size
+        label_width = math.ceil((measure(f"{len(rows)}.") + cell) / cell) * cell
+        text_width = max(measure(text) for text in rows)
+        column_width = math.ceil((label_width + text_width + answer_space + cell) / cell) * cell
+
+        columns = max(1, int(self.usable_width // column_width))
+        if columns == 1:
+            return self.single_column(rows)
+        return LayoutPlan(
+            rows, columns, self.rows_per_page, column_width,
+            label_width, self.margin, self.top, cell
+        )
+
+
+LAYOUT_ENGINES: Dict[str, Type[WorksheetLayout]] = {
+    SingleColumnLayout.name: SingleColumnLayout,
+    MultiColumnLayout.name: MultiColumnLayout,
+}
+
+
+def get_layout_engine(name: str) -> Type[WorksheetLayout]:
+    """Класс движка раскладки по имени (из настроек worksheet_layout)"""
+    try:
+        return LAYOUT_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный движок раскладки: {name}. Доступны: {', '.join(LAYOUT_ENGINES)}")
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter, deque
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.schemas import MathGeneratorRequest
+from app.services.generation_executor import generation_executor, GenerationError
+from app.services.math_generator import render_math_pdf
+
+logger = logging.getLogger(__name__)
+
+# Сколько разных наборов параметров помнит счетчик популярности в процессе
+MAX_TRACKED_PRESETS = 1000
+
+
+def preset_key(request: MathGeneratorRequest, variant: str) -> str:
+    """Ключ набора параметров (без зерна — в пул попадают только случайные листы)"""
+    params = request.model_dump(mode="json", exclude={"seed"})
+    return json.dumps({"variant": variant, **params}, sort_keys=True, separators=(",", ":"))
+
+
+class _PresetPool:
+    """Готовые листы одного набора параметров"""
+
+    __slots__ = ("request", "variant", "items", "date", "refilling")
+
+    def __init__(self, request: MathGeneratorRequest, variant: str):
+        self.request = request
+        self.variant = variant
+        self.items: deque = deque()
+        self.date = date.today()
+        self.refilling = False
+
+
+class WorksheetPool:
+    """
+    Пул заранее сгенерированных листов для популярных наборов параметров
+
+    Популярные наборы берутся из истории генераций (таблица generations),
+    а если база недоступна — из счетчика запросов этого процесса. Для
+    каждого из top_n наборов в памяти держится до size готовых PDF без
+    зерна. Запрос с совпадающими параметрами забирает готовый лист за O(1),
+    после чего пул пополняется в фоне через исполнитель генераций (не
+    больше одной фоновой задачи одновременно, чтобы не занимать воркеры
+    пользовательских запросов). Дата печатается в заголовке листа, поэтому
+    листы прошлых дней отбрасываются.
+    """
+
+    def __init__(self, top_n: int, size: int, min_requests: int, history_days: int, refresh_interval: float):
+        self.top_n = top_n
+        self.size = size
+        self.min_requests = min_requests
+        self.history_days = history_days
+        self.refresh_interval = refresh_interval
+
+        self._pools: Dict[str, _PresetPool] = {}
+        self._requests: Counter = Counter()
+        self._known: Dict[str, Tuple[MathGeneratorRequest, str]] = {}
+        self._lock = threading.Lock()
+        self._refill_slot: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+        self._warmer: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.rendered = 0
+        self.source = "memory"
+
+    @property
+    def enabled(self) -> bool:
+        return self.top_n > 0 and self.size > 0
+
+    def take(self, request: MathGeneratorRequest, variant: str) -> Optional[bytes]:
+        """
+        Готовый лист для запроса без зерна или None
+
+        Вызывается из event loop: запрос учитывается в счетчике популярности,
+        забранный лист возмещается фоновой генерацией.
+        """
+        if not self.enabled or request.seed is not None:
+            return None
+
+        key = preset_key(request, variant)
+        with self._lock:
+            self._requests[key] += 1
+            self._known.setdefault(key, (request, variant))
+
+            pool = self._pools.get(key)
+            if pool is None:
+                self.misses += 1
+                return None
+            if pool.date != date.today():
+                pool.items.clear()
+                pool.date = date.today()
+            data = pool.items.popleft() if pool.items else None
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        self._schedule_refill(key)
+        return data
+
+    # ---- популярные наборы ----
+
+    def _history_presets(self) -> Optional[List[Tuple[MathGeneratorRequest, str, int]]]:
+        """Наборы из таблицы generations (None, если база не подключена)"""
+        try:
+            from app.models.database import Generation, SessionLocal
+        except Exception as e:
+            logger.debug(f"История генераций недоступна: {e}")
+            return None
+
+        since = datetime.utcnow() - timedelta(days=self.history_days)
+        db = SessionLocal()
+        try:
+            rows = db.query(Generation.parameters).filter(
+                Generation.generator_type == "math",
+                Generation.created_at >= since
+            ).all()
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать историю генераций: {e}")
+            return None
+        finally:
+            db.close()
+
+        counts: Counter = Counter()
+        requests: Dict[str, Tuple[MathGeneratorRequest, str]] = {}
+        for (parameters,) in rows:
+            if not isinstance(parameters, dict):
+                continue
+            try:
+                request = MathGeneratorRequest(**{**parameters, "seed": None})
+            except Exception:
+                continue
+            variant = "teacher" if parameters.get("for_teacher") else "student"
+            key = preset_key(request, variant)
+            counts[key] += 1
+            requests.setdefault(key, (request, variant))
+
+        return [(*requests[key], count) for key, count in counts.most_common()]
+
+    def _memory_presets(self) -> List[Tuple[MathGeneratorRequest, str, int]]:
+        """Наборы из счетчика запросов процесса (старые редкие наборы забываются)"""
+        with self._lock:
+            popular = self._requests.most_common(MAX_TRACKED_PRESETS)
+            self._requests = Counter(dict(popular))
+            self._known = {key: self._known[key] for key, _ in popular}
+            return [(*self._known[key], count) for key, count in popular]
+
+    def popular_presets(self) -> List[Tuple[MathGeneratorRequest, str]]:
+        """top_n наборов, которые стоит держать готовыми"""
+        presets = self._history_presets()
+        self.source = "history" if presets is not None else "memory"
+        if presets is None:
+            presets = self._memory_presets()
+
+        selected = []
+        for request, variant, count in presets:
+            if count < self.min_requests:
+                break
+            # Большие тиражи отдаются потоково и в пул не попадают
+            if request.example_count > settings.math_stream_threshold:
+                continue
+            selected.append((request, variant))
+            if len(selected) == self.top_n:
+                break
+        return selected
+
+    async def refresh(self) -> None:
+        """Пересчет популярных наборов и пополнение их пулов"""
+        presets = await asyncio.to_thread(self.popular_presets)
+        wanted = {preset_key(request, variant): (request, variant) for request, variant in presets}
+
+        with self._lock:
+            for key in list(self._pools):
+                if key not in wanted:
+                    del self._pools[key]
+            for key, (request, variant) in wanted.items():
+                if key not in self._pools:
+                    self._pools[key] = _PresetPool(request, variant)
+
+        for key in wanted:
+            self._schedule_refill(key)
+
+    # ---- фоновое пополнение ----
+
+    def _schedule_refill(self, key: str) -> None:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None or pool.refilling or len(pool.items) >= self.size:
+                return
+            pool.refilling = True
+
+        task = asyncio.get_running_loop().create_task(self._refill(key, pool))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, key: str, pool: _PresetPool) -> None:
+        if self._refill_slot is None:
+            self._refill_slot = asyncio.Semaphore(1)
+        try:
+            while len(pool.items) < self.size and self._pools.get(key) is pool:
+                async with self._refill_slot:
+                    data = await generation_executor.run(render_math_pdf, pool.request, pool.variant == "teacher")
+                with self._lock:
+                    if pool.date != date.today():
+                        pool.items.clear()
+                        pool.date = date.today()
+                    pool.items.append(data)
+                    self.rendered += 1
+        except GenerationError as e:
+            # Воркеры заняты пользовательскими запросами — пополним позже
+            logger.info(f"Пополнение пула листов отложено: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка пополнения пула листов: {e}")
+        finally:
+            pool.refilling = False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка обновления пула листов: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        """Запуск фонового прогрева (из события запуска приложения)"""
+        if self.enabled and self._warmer is None:
+            self._warmer = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка прогрева и незавершенных пополнений"""
+        tasks = [task for task in (self._warmer, *self._tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._warmer = None
+        self._refill_slot = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика пула"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "source": self.source,
+                "presets": len(self._pools),
+                "ready": sum(len(pool.items) for pool in self._pools.values()),
+                "ready_bytes": sum(len(data) for pool in self._pools.values() for data in pool.items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "rendered": self.rendered,
+            }
+
+
+# Глобальный пул готовых листов
+worksheet_pool = WorksheetPool(
+    top_n=settings.worksheet_pool_presets,
+    size=settings.worksheet_pool_size,
+    min_requests=settings.worksheet_pool_min_requests,
+    history_days=settings.worksheet_pool_history_days,
+    refresh_interval=settings.worksheet_pool_refresh_seconds,
+)
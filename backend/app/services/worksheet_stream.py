@@ -0,0 +1,334 @@
+import asyncio
+import copy
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.models.schemas import MathGeneratorRequest
+from app.services.generation_executor import generation_executor
+from app.services.math_generator import MARGIN, example_entropy, grid_content_stream, iter_math_examples
+from app.services.worksheet_formats import (
+    CELL_MARGIN,
+    FONT_SIZE,
+    PAGE_HEIGHT,
+    PAGE_WIDTH,
+    SCALE,
+    plan_rows,
+    text_width,
+)
+from app.services.worksheet_layout import LayoutPlan, Placement
+
+# Стандартные шрифты PDF: семейство -> (метрики обычного, метрики жирного,
+# BaseFont обычного, BaseFont жирного); Arial в fpdf2 — псевдоним Helvetica
+STANDARD_FONTS: Dict[str, Tuple[str, str, str, str]] = {
+    "helvetica": ("helvetica", "helveticaB", "Helvetica", "Helvetica-Bold"),
+    "arial": ("helvetica", "helveticaB", "Helvetica", "Helvetica-Bold"),
+    "times": ("times", "timesB", "Times-Roman", "Times-Bold"),
+}
+
+# Зарезервированные номера объектов; страницы нумеруются начиная с FIRST_PAGE_OBJECT
+PAGES_OBJECT = 1
+CATALOG_OBJECT = 2
+FONT_BOLD_OBJECT = 3
+FONT_REGULAR_OBJECT = 4
+RESOURCES_OBJECT = 5
+GRID_OBJECT = 6
+INFO_OBJECT = 7
+FIRST_PAGE_OBJECT = 8
+
+# Страниц в одной задаче пула генерации и задач, рендерящихся впрок на один поток
+PAGES_PER_TASK = 8
+STREAM_PREFETCH = 2
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_op(font_ref: str, size: float, x: float, top: float, height: float, text: str) -> str:
+    """Строка в ячейке высотой height с верхним краем top — как cell() в fpdf2"""
+    baseline = top + height / 2 + 0.3 * size / SCALE
+    return (
+        f"BT /{font_ref} {size:.2f} Tf {(x + CELL_MARGIN) * SCALE:.2f} "
+        f"{(PAGE_HEIGHT - baseline) * SCALE:.2f} Td ({_escape(text)}) Tj ET"
+    )
+
+
+def _pdf_text_string(text: str) -> bytes:
+    """Строка PDF в UTF-16BE с BOM (для метаданных на кириллице)"""
+    return b"<" + ("\ufeff" + text).encode("utf-16-be").hex().encode("ascii") + b">"
+
+
+class StreamingWorksheetPDF:
+    """
+    Потоковый PDF-писатель рабочих листов
+
+    В отличие от MathGridPDF документ не накапливается в памяти: каждая
+    страница сериализуется и отдается сразу, как только на ней размещены
+    примеры. В памяти остаются только смещения объектов для таблицы xref.
+    Сетка записывается в файл один раз отдельным потоком и подключается
+    ко всем страницам, поэтому размер файла растет только за счет текста.
+    Примеры размещаются по готовой раскладке (LayoutPlan) — той же, что у
+    MathGridPDF, поэтому страницы и колонки совпадают с PDF из памяти.
+    """
+
+    def __init__(self, subject: str = "Математика", font_family: str = "Helvetica", compress: bool = True):
+        self.subject = subject
+        self.compress = compress
+        self.metrics, self.bold_metrics, self.base_font, self.bold_base_font = \
+            STANDARD_FONTS.get(font_family.lower(), STANDARD_FONTS["helvetica"])
+        self._offsets = {}
+        self._position = 0
+        self._page_objects: List[int] = []
+        self._next_object = FIRST_PAGE_OBJECT
+
+    def _emit(self, data: bytes) -> bytes:
+        self._position += len(data)
+        return data
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        self._offsets[number] = self._position
+        return self._emit(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def _encode_stream(self, content: bytes) -> bytes:
+        """Тело объекта-потока (словарь и данные, со сжатием при compress)"""
+        if self.compress:
+            content = zlib.compress(content)
+            head = b"<</Filter /FlateDecode /Length %d>>" % len(content)
+        else:
+            head = b"<</Length %d>>" % len(content)
+        return head + b"\nstream\n" + content + b"\nendstream"
+
+    def _stream_object(self, number: int, content: bytes) -> bytes:
+        return self._object(number, self._encode_stream(content))
+
+    def begin(self) -> bytes:
+        """Заголовок файла и общие объекты (шрифты, ресурсы, сетка)"""
+        chunks = [
+            self._emit(b"%PDF-1.3\n%\xe2\xe3\xcf\xd3\n"),
+            self._object(
+                FONT_BOLD_OBJECT,
+                b"<</Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding>>"
+                % self.bold_base_font.encode("ascii")
+            ),
+            self._object(
+                FONT_REGULAR_OBJECT,
+                b"<</Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding>>"
+                % self.base_font.encode("ascii")
+            ),
+            self._object(
+                RESOURCES_OBJECT,
+                b"<</Font <</F1 %d 0 R /F2 %d 0 R>> /ProcSet [/PDF /Text]>>"
+                % (FONT_BOLD_OBJECT, FONT_REGULAR_OBJECT)
+            ),
+            self._stream_object(GRID_OBJECT, grid_content_stream(PAGE_WIDTH, PAGE_HEIGHT, SCALE)),
+        ]
+        return b"".join(chunks)
+
+    def header_ops(self) -> List[str]:
+        """Заголовок первой страницы (те же позиции, что в MathGridPDF.draw_header)"""
+        title = "Math Worksheet"
+        content_width = PAGE_WIDTH - 2 * MARGIN
+        title_x = MARGIN + (content_width - text_width(title, 14, self.bold_metrics)) / 2 - CELL_MARGIN
+        date_str = datetime.now().strftime("%d.%m.%Y")
+        return [
+            _text_op("F1", 14, title_x, 10, 8, title),
+            _text_op("F2", 12, MARGIN, 18, 10, "Name: _________________________"),
+            _text_op("F2", 10, MARGIN, 28, 8, f"Date: {date_str}"),
+        ]
+
+    def page_content(self, placements: List[Placement], label_width: float,
+                     answers: Optional[Sequence[str]] = None, with_header: bool = False) -> bytes:
+        """
+        Содержимое одной страницы раскладки (готовое тело объекта-потока)
+
+        Строки размещаются как в MathGridPDF.layout_examples (номер, затем
+        пример); ответы (по одному на строку страницы), если переданы, —
+        сразу после знака равенства, как в MathGridPDF.add_answer_overlay.
+        Не зависит от состояния писателя, поэтому страницы можно
+        готовить в пуле генерации.
+        """
+        ops = self.header_ops() if with_header else []
+        space = text_width(" ", FONT_SIZE, self.metrics)
+        for index, (number, x, y, text) in enumerate(placements):
+            top = y - 3  # -3 для центрирования по вертикали
+            ops.append(_text_op("F2", FONT_SIZE, x, top, 6, f"{number}."))
+            ops.append(_text_op("F2", FONT_SIZE, x + label_width, top, 6, text))
+            if answers is not None:
+                answer_x = x + label_width + text_width(text, FONT_SIZE, self.metrics) + space
+                ops.append(_text_op("F2", FONT_SIZE, answer_x, top, 6, answers[index]))
+        return self._encode_stream("\n".join(ops).encode("latin1"))
+
+    def add_page(self, content: bytes) -> bytes:
+        """Запись страницы с готовым содержимым (из page_content)"""
+        content_object = self._next_object
+        page_object = content_object + 1
+        self._next_object += 2
+        self._page_objects.append(page_object)
+
+        return self._object(content_object, content) + self._object(
+            page_object,
+            b"<</Type /Page /Parent %d 0 R /Resources %d 0 R /Contents [%d 0 R %d 0 R]>>"
+            % (PAGES_OBJECT, RESOURCES_OBJECT, GRID_OBJECT, content_object)
+        )
+
+    def end(self) -> bytes:
+        """Дерево страниц, каталог, метаданные и таблица xref"""
+        kids = b" ".join(b"%d 0 R" % number for number in self._page_objects)
+        creation_date = datetime.now(timezone.utc).strftime("D:%Y%m%d%H%M%SZ").encode("ascii")
+        chunks = [
+            self._object(
+                PAGES_OBJECT,
+                b"<</Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 %.2f %.2f]>>"
+                % (kids, len(self._page_objects), PAGE_WIDTH * SCALE, PAGE_HEIGHT * SCALE)
+            ),
+            self._object(CATALOG_OBJECT, b"<</Type /Catalog /Pages %d 0 R>>" % PAGES_OBJECT),
+            self._object(
+                INFO_OBJECT,
+                b"<</Subject %s /CreationDate (%s)>>" % (_pdf_text_string(self.subject), creation_date)
+            ),
+        ]
+
+        size = self._next_object
+        xref_offset = self._position
+        xref = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for number in range(1, size):
+            xref.append(b"%010d 00000 n \n" % self._offsets[number])
+        xref.append(
+            b"trailer\n<</Size %d /Root %d 0 R /Info %d 0 R>>\nstartxref\n%d\n%%%%EOF\n"
+            % (size, CATALOG_OBJECT, INFO_OBJECT, xref_offset)
+        )
+        chunks.append(self._emit(b"".join(xref)))
+        return b"".join(chunks)
+
+
+class ExampleRows(Sequence[str]):
+    """
+    Строки потокового листа ("пример =") поверх порций генерации
+
+    Хранит только запрос и зерно, поэтому раскладку с такими строками
+    можно передавать в пул генерации без самих примеров: строки среза
+    генерируются из нужных порций заново. Окно (window) держит в памяти
+    примеры одной группы страниц, чтобы порции не генерировались на
+    каждую страницу.
+    """
+
+    __slots__ = ("request", "entropy", "start", "examples")
+
+    def __init__(self, request: MathGeneratorRequest, entropy: int, start: int = 0,
+                 examples: Optional[List[Tuple[str, str]]] = None):
+        self.request = request
+        self.entropy = entropy
+        self.start = start
+        self.examples = examples
+
+    def __len__(self) -> int:
+        return self.request.example_count
+
+    def __iter__(self) -> Iterator[str]:
+        for problem, _ in iter_math_examples(self.request, self.entropy):
+            yield f"{problem} ="
+
+    def __getitem__(self, rows):
+        if not isinstance(rows, slice):
+            index = range(len(self))[rows]
+            return self[index:index + 1][0]
+        indices = range(len(self))[rows]
+        if indices.step != 1:
+            return [self[index] for index in indices]
+        return [f"{problem} =" for problem, _ in self.pairs(indices.start, indices.stop)]
+
+    def window(self, start: int, stop: int) -> "ExampleRows":
+        """Те же строки с примерами start..stop в памяти"""
+        examples = list(iter_math_examples(self.request, self.entropy, start, stop))
+        return ExampleRows(self.request, self.entropy, start, examples)
+
+    def pairs(self, start: int, stop: int) -> List[Tuple[str, str]]:
+        """Примеры с ответами строк start..stop (из окна, если оно их содержит)"""
+        if self.examples is not None and self.start <= start and stop - self.start <= len(self.examples):
+            return self.examples[start - self.start:stop - self.start]
+        return list(iter_math_examples(self.request, self.entropy, start, stop))
+
+
+def prepare_math_stream(request: MathGeneratorRequest) -> Tuple[str, LayoutPlan]:
+    """
+    Раскладка потокового листа (выполняется в пуле генерации)
+
+    Примеры генерируются порциями (как в generate_example_batch, поэтому
+    с тем же зерном совпадают с PDF из памяти) и раскладываются движком
+    из settings.worksheet_layout тем же шрифтом, что у MathGridPDF. Для
+    ширины колонок порции только перебираются: в раскладке остаются
+    строки ExampleRows, а не сами примеры.
+
+    Returns:
+        (семейство шрифта, раскладка)
+    """
+    from app.services.math_pdf import resolve_font_family
+
+    font_family = resolve_font_family()
+    font = STANDARD_FONTS.get(font_family.lower(), STANDARD_FONTS["helvetica"])[0]
+
+    entropy = example_entropy(request)
+    answers = (answer for _, answer in iter_math_examples(request, entropy))
+    return font_family, plan_rows(ExampleRows(request, entropy), answers, font=font)
+
+
+def render_page_group(font_family: str, plan: LayoutPlan, first_page: int, for_teacher: bool) -> List[bytes]:
+    """
+    Содержимое страниц first_page..first_page + PAGES_PER_TASK (выполняется в пуле генерации)
+
+    Примеры группы генерируются один раз в окно строк; ответы (для
+    учителя) берутся из того же окна по номерам строк страницы.
+    """
+    stop_page = first_page + PAGES_PER_TASK
+    group = copy.copy(plan)
+    group.rows = plan.rows.window(first_page * plan.per_page, stop_page * plan.per_page)
+
+    writer = StreamingWorksheetPDF(font_family=font_family)
+    contents = []
+    for page_index, placements in enumerate(group.pages(first_page, stop_page), start=first_page):
+        answers = None
+        if for_teacher and placements:
+            answers = [answer for _, answer in group.rows.pairs(placements[0][0] - 1, placements[-1][0])]
+        contents.append(writer.page_content(placements, plan.label_width, answers, with_header=page_index == 0))
+    return contents
+
+
+async def stream_math_pdf(request: MathGeneratorRequest, for_teacher: bool = False,
+                          subject: str = "Математика") -> AsyncIterator[bytes]:
+    """
+    Потоковая генерация PDF с примерами через пул генерации
+
+    Раскладка и содержимое страниц готовятся в пуле генерации (группами
+    по PAGES_PER_TASK страниц, примеры каждой группы генерируются в самой
+    задаче) — с общей очередью, таймаутом и ошибками GenerationQueueFull/
+    GenerationTimeout, как у остальных генераций. Впрок рендерится не
+    больше STREAM_PREFETCH групп, поэтому ни примеры, ни страницы не
+    накапливаются в памяти, даже если клиент читает медленно. В event
+    loop остается только запись объектов и таблицы xref.
+    """
+    font_family, plan = await generation_executor.run(prepare_math_stream, request)
+    writer = StreamingWorksheetPDF(subject=subject, font_family=font_family)
+    yield writer.begin()
+
+    pending = deque()
+    try:
+        for first_page in range(0, plan.page_count, PAGES_PER_TASK):
+            pending.append(asyncio.ensure_future(
+                generation_executor.run(render_page_group, font_family, plan, first_page, for_teacher)
+            ))
+            if len(pending) < STREAM_PREFETCH:
+                continue
+            for content in await pending.popleft():
+                yield writer.add_page(content)
+
+        while pending:
+            for content in await pending.popleft():
+                yield writer.add_page(content)
+    finally:
+        # Клиент отключился или рендер упал — остальные группы не нужны
+        for task in pending:
+            task.cancel()
+
+    yield writer.end()
@@ -0,0 +1,122 @@
+"""
+Бенчмарк календаря КТП: обход по дням против векторного LessonCalendar
+
+Прежний генератор шел по периоду с шагом timedelta(days=1), для каждого
+дня вызывал strftime и искал строку линейно в списках праздников и
+каникул. Бенчмарк строит расписания на периоды от учебного года до
+нескольких лет с сотнями исключенных дат обоими способами, проверяет,
+что результаты совпадают, и сравнивает медианное время.
+
+Код возврата 1, если результаты разошлись.
+
+Запуск из папки backend:
+    python -m benchmarks.ktp_calendar --years 1 3 5 --holidays 50 300 --repeat 20
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from app.services.ktp_calendar import LessonCalendar
+
+START = datetime(2024, 9, 1)
+WEEKDAYS = [0, 1, 2, 3, 4]
+LESSONS_PER_DAY = [2, 1, 2, 1, 2, 0, 0]
+
+
+def legacy_schedule(start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates) -> List[str]:
+    """Прежний алгоритм: день за днем, строки дат и поиск в списках"""
+    schedule = []
+    current_date = start_date
+    while current_date <= end_date:
+        if current_date.weekday() in weekdays:
+            date_str = current_date.strftime('%d.%m.%Y')
+            if date_str not in holidays and date_str not in vacation_dates:
+                weekday_index = current_date.weekday()
+                if weekday_index < len(lessons_per_day):
+                    for _ in range(lessons_per_day[weekday_index]):
+                        schedule.append(current_date.strftime('%d.%m'))
+        current_date += timedelta(days=1)
+    return schedule
+
+
+def calendar_schedule(start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates) -> List[str]:
+    return LessonCalendar.build(start_date, end_date, weekdays, lessons_per_day, holidays, vacation_dates).labels()
+
+
+def excluded_dates(end: datetime, count: int, seed: int) -> List[str]:
+    """count случайных дат периода строками ДД.ММ.ГГГГ"""
+    rng = random.Random(seed)
+    span = (end - START).days
+    return [(START + timedelta(days=rng.randrange(span + 1))).strftime('%d.%m.%Y') for _ in range(count)]
+
+
+def measure(func: Callable, args: tuple, repeat: int) -> float:
+    """Медиана времени вызова в микросекундах"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(timings)
+
+
+def run_case(years: int, holidays_count: int, repeat: int) -> dict:
+    end = START + timedelta(days=365 * years)
+    holidays = excluded_dates(end, holidays_count, seed=years)
+    vacation = excluded_dates(end, holidays_count, seed=years + 1000)
+    args = (START, end, WEEKDAYS, LESSONS_PER_DAY, holidays, vacation)
+
+    legacy = legacy_schedule(*args)
+    vectorized = calendar_schedule(*args)
+    legacy_us = measure(legacy_schedule, args, repeat)
+    calendar_us = measure(calendar_schedule, args, repeat)
+    build_us = measure(LessonCalendar.build, args, repeat)
+
+    return {
+        "years": years,
+        "excluded": 2 * holidays_count,
+        "lessons": len(vectorized),
+        "match": legacy == vectorized,
+        "legacy_us": round(legacy_us, 1),
+        "calendar_us": round(calendar_us, 1),
+        "build_us": round(build_us, 1),
+        "speedup": round(legacy_us / calendar_us, 1) if calendar_us else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк календаря КТП")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 3, 5], help="Длина периода в годах")
+    parser.add_argument("--holidays", type=int, nargs="+", default=[50, 300],
+                        help="Праздников (и столько же дат каникул) на период")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на вариант")
+    parser.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    args = parser.parse_args()
+
+    results = [
+        run_case(years, holidays_count, args.repeat)
+        for years in args.years
+        for holidays_count in args.holidays
+    ]
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        header = (f"{'лет':>4} {'исключено':>10} {'уроков':>7} {'совпадает':>10} "
+                  f"{'по дням, мкс':>13} {'календарь, мкс':>15} {'из них build':>13} {'ускорение':>10}")
+        print(header)
+        print("-" * len(header))
+        for r in results:
+            print(f"{r['years']:>4} {r['excluded']:>10} {r['lessons']:>7} {str(r['match']):>10} "
+                  f"{r['legacy_us']:>13.1f} {r['calendar_us']:>15.1f} {r['build_us']:>13.1f} {r['speedup']:>9}x")
+
+    sys.exit(0 if all(r["match"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
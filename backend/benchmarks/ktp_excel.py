@@ -0,0 +1,147 @@
+"""
+Бенчмарк записи Excel файла КТП: pandas против прямой записи OOXML
+
+Прежний путь строил DataFrame, переводил его обратно в строки через
+dataframe_to_rows, добавлял их в обычную книгу openpyxl и дважды обходил
+все ячейки для подбора ширины столбцов (сервис КТП писал через
+pd.ExcelWriter). Новый писатель (write_schedule_xlsx) собирает пакет
+OOXML напрямую и пишет лист порциями прямо из списка подписей. Бенчмарк
+сравнивает пути на расписаниях разной длины (запись в память) и
+проверяет, что значения ячеек и ширина столбца совпадают.
+
+Код возврата 1, если содержимое разошлось.
+
+Запуск из папки backend:
+    python -m benchmarks.ktp_excel --lessons 200 1000 5000 --repeat 10
+"""
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+from app.services.ktp_calendar import LessonCalendar
+from app.services.ktp_writer import write_schedule_xlsx
+
+START = datetime(2024, 9, 1)
+
+
+def legacy_workbook(labels: List[str]) -> bytes:
+    """Прежний create_excel_schedule: DataFrame, обычная книга, подбор ширины по ячейкам"""
+    df = pd.DataFrame([{'date': label} for label in labels])
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Расписание"
+
+    cell = ws.cell(row=1, column=1, value='Дата')
+    cell.font = Font(bold=True)
+    cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    cell.alignment = Alignment(horizontal="center")
+
+    for row in dataframe_to_rows(df, index=False, header=False):
+        ws.append(row)
+
+    for column in ws.columns:
+        max_length = max(len(str(cell.value)) for cell in column)
+        ws.column_dimensions[column[0].column_letter].width = min(max_length + 2, 50)
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def legacy_excel_writer(labels: List[str]) -> bytes:
+    """Прежний generate_ktp_excel: pd.ExcelWriter и выравнивание каждой ячейки"""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame({'Дата': labels}).to_excel(writer, index=False, sheet_name='Расписание')
+        worksheet = writer.sheets['Расписание']
+        worksheet.column_dimensions['A'].width = 15
+        alignment = Alignment(horizontal='center')
+        for cell in worksheet['A']:
+            cell.alignment = alignment
+    return buffer.getvalue()
+
+
+WRITERS = {
+    "pandas_workbook": legacy_workbook,
+    "pandas_excel_writer": legacy_excel_writer,
+    "direct_ooxml": write_schedule_xlsx,
+}
+
+
+def schedule_labels(lessons: int) -> List[str]:
+    """Первые lessons подписей расписания: по 5 уроков в будни, сколько нужно лет"""
+    years = lessons // (5 * 5 * 52) + 1
+    end = START.replace(year=START.year + years)
+    return LessonCalendar.build(START, end, [0, 1, 2, 3, 4], [5] * 7).labels()[:lessons]
+
+
+def sheet_contents(data: bytes) -> tuple:
+    """Значения ячеек и ширина столбца A"""
+    sheet = load_workbook(io.BytesIO(data)).active
+    return [cell.value for cell in sheet["A"]], sheet.column_dimensions["A"].width
+
+
+def measure(writer: Callable, labels: List[str], repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = writer(labels)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 2), "size": len(data), "data": data}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк записи Excel файла КТП")
+    parser.add_argument("--lessons", type=int, nargs="+", default=[200, 1000, 5000], help="Уроков в расписании")
+    parser.add_argument("--repeat", type=int, default=10, help="Повторов на вариант")
+    parser.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    args = parser.parse_args()
+
+    results = []
+    matches = True
+    for lessons in args.lessons:
+        labels = schedule_labels(lessons)
+        runs = {name: measure(writer, labels, args.repeat) for name, writer in WRITERS.items()}
+
+        values, width = sheet_contents(runs["direct_ooxml"]["data"])
+        legacy_values, legacy_width = sheet_contents(runs["pandas_workbook"]["data"])
+        match = values == legacy_values and width == legacy_width
+        matches &= match
+
+        baseline = runs["pandas_workbook"]["median_ms"]
+        for name, run in runs.items():
+            results.append({
+                "lessons": len(labels),
+                "writer": name,
+                "median_ms": run["median_ms"],
+                "size": run["size"],
+                "speedup": round(baseline / run["median_ms"], 1) if run["median_ms"] else None,
+                "match": match,
+            })
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        header = f"{'уроков':>7} {'писатель':<22} {'медиана, мс':>12} {'размер':>9} {'ускорение':>10}"
+        print(header)
+        print("-" * len(header))
+        for r in results:
+            print(f"{r['lessons']:>7} {r['writer']:<22} {r['median_ms']:>12.2f} {r['size']:>9} {r['speedup']:>9}x")
+        print(f"\nСодержимое совпадает с прежним путем: {'да' if matches else 'нет'}")
+
+    sys.exit(0 if matches else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""
+Нагрузочный тест HTTP API
+
+Запускает app.main:app под uvicorn в отдельном процессе (через
+benchmarks.loadtest_server, с fakeredis и SQLite вместо Redis и MySQL)
+и гоняет по нему смесь сценариев с заданной конкурентностью:
+
+- math_generate — POST /api/math/generate (ученик/учитель, 10–100 примеров);
+- math_both — POST /api/math/generate-both;
+- math_legacy — POST /api/math-generator (legacy обертка над /api/math/generate);
+- ktp — POST /api/ktp/generate (учебный год);
+- math_game — игровая сессия: start, ответы на все примеры, result, delete;
+- auth_login — POST /api/auth/login заранее зарегистрированного пользователя.
+
+Сценарий, эндпоинт которого не подключен (404/405 при пробном прогоне,
+например аутентификация без sqlalchemy), исключается из смеси и
+попадает в отчет как пропущенный. Для каждого эндпоинта выводятся RPS,
+p50/p95/p99 задержки и доля ошибок (статус >= 400 или сбой соединения).
+
+Код возврата 1, если какой-либо эндпоинт ответил 500 — это ошибка кода,
+а не перегрузки (перегрузка дает 503/504).
+
+Зависимости замен (fakeredis, sqlalchemy, аутентификация) — в
+requirements-bench.txt.
+
+Запуск из папки backend:
+    pip install -r requirements-bench.txt
+    python -m benchmarks.loadtest --concurrency 16 --duration 30
+    python -m benchmarks.loadtest --mix math_generate=5 math_game=1 --json
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000  # уже запущенный сервер
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+LOGIN_EMAIL = "loadtest@example.com"
+LOGIN_PASSWORD = "loadtest-password"
+
+DEFAULT_MIX = {
+    "math_generate": 4,
+    "math_both": 2,
+    "math_legacy": 1,
+    "ktp": 2,
+    "math_game": 2,
+    "auth_login": 1,
+}
+
+
+class ScenarioUnavailable(Exception):
+    """Эндпоинт сценария не подключен к приложению"""
+
+
+class Recorder:
+    """Задержки и ошибки по эндпоинтам"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str,
+                      **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            await response.aread()
+        except httpx.HTTPError as e:
+            self.latencies[label].append((time.perf_counter() - started) * 1000)
+            self.errors[label] += 1
+            self.statuses[label][type(e).__name__] += 1
+            return None
+
+        self.latencies[label].append((time.perf_counter() - started) * 1000)
+        self.statuses[label][str(response.status_code)] += 1
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    def report(self, elapsed: float) -> List[dict]:
+        rows = []
+        for label in sorted(self.latencies):
+            latencies = self.latencies[label]
+            rows.append({
+                "endpoint": label,
+                "requests": len(latencies),
+                "errors": self.errors[label],
+                "error_rate": round(self.errors[label] / len(latencies), 4),
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+                "mean_ms": round(float(np.mean(latencies)), 2),
+                "statuses": dict(self.statuses[label]),
+            })
+        return rows
+
+
+# Неизвестный путь: 404, или 405 из-за общего обработчика OPTIONS /{full_path:path}
+NOT_MOUNTED = (404, 405)
+
+
+def check_mounted(response: Optional[httpx.Response]) -> Optional[httpx.Response]:
+    if response is not None and response.status_code in NOT_MOUNTED:
+        raise ScenarioUnavailable(f"{response.request.method} {response.request.url.path} не найден")
+    return response
+
+
+# ---- сценарии ----
+
+async def math_generate(client: httpx.AsyncClient, rec: Recorder, rng: random.Random) -> None:
+    check_mounted(await rec.request(client, "POST /api/math/generate", "POST", "/api/math/generate", data={
+        "num_operands": rng.choice([2, 3]),
+        "operations": rng.choice([["+", "-"], ["+", "-", "*", "/"]]),
+        "interval_start": 1,
+        "interval_end": 100,
+        "example_count": rng.choice([10, 30, 100]),
+        "for_teacher": rng.choice(["false", "true"]),
+    }))
+
+
+async def math_both(client: httpx.AsyncClient, rec: Recorder, rng: random.Random) -> None:
+    check_mounted(await rec.request(client, "POST /api/math/generate-both", "POST", "/api/math/generate-both", data={
+        "num_operands": 2,
+        "operations": ["+", "-", "*"],
+        "interval_start": 1,
+        "interval_end": 50,
+        "example_count": rng.choice([20, 40]),
+    }))
+
+
+async def math_legacy(client: httpx.AsyncClient, rec: Recorder, rng: random.Random) -> None:
+    check_mounted(await rec.request(client, "POST /api/math-generator", "POST", "/api/math-generator", data={
+        "num_operands": 2,
+        "operations": ["+", "-"],
+        "interval_start": 1,
+        "interval_end": 100,
+        "example_count": rng.choice([10, 30]),
+        "for_teacher": rng.choice(["false", "true"]),
+    }))
+
+
+async def ktp(client: httpx.AsyncClient, rec: Recorder, rng: random.Random) -> None:
+    check_mounted(await rec.request(client, "POST /api/ktp/generate", "POST", "/api/ktp/generate", data={
+        "start_date": "2025-09-01",
+        "end_date": "2026-05-31",
+        "weekdays": [0, 1, 2, 3, 4],
+        "lessons_per_day": [2, 2, 2, 2, 2, 0, 0],
+        "holidays": ["04.11.2025", "23.02.2026", "09.03.2026"],
+        "vacation": [],
+        "file_name": "loadtest",
+    }))
+
+
+async def math_game(client: httpx.AsyncClient, rec: Recorder, rng: random.Random) -> None:
+    response = check_mounted(await rec.request(
+        client, "POST /api/math-game/start", "POST", "/api/math-game/start", json={
+            "operations": ["addition", "subtraction", "multiplication"],
+            "min_number": 1,
+            "max_number": 20,
+            "examples_count": 10,
+        }
+    ))
+    if response is None or response.status_code != 200:
+        return
+
+    session = response.json()
+    session_id = session["session_id"]
+    for example in session["examples"]:
+        answer = example["correct_answer"] if rng.random() < 0.8 else rng.choice(example["options"])
+        await rec.request(client, "POST /api/math-game/answer/{id}", "POST",
+                          f"/api/math-game/answer/{session_id}", json={"answer": answer})
+    await rec.request(client, "GET /api/math-game/result/{id}", "GET", f"/api/math-game/result/{session_id}")
+    await rec.request(client, "DELETE /api/math-game/session/{id}", "DELETE", f"/api/math-game/session/{session_id}")
+
+
+async def auth_login(client: httpx.AsyncClient, rec: Recorder, rng: random.Random) -> None:
+    check_mounted(await rec.request(client, "POST /api/auth/login", "POST", "/api/auth/login", data={
+        "username": LOGIN_EMAIL,
+        "password": LOGIN_PASSWORD,
+    }))
+
+
+async def prepare_auth(client: httpx.AsyncClient) -> None:
+    """Пользователь для входа (повторная регистрация при повторном запуске не мешает)"""
+    response = await client.post("/api/auth/register", data={
+        "email": LOGIN_EMAIL,
+        "full_name": "Load Test",
+        "password": LOGIN_PASSWORD,
+    })
+    if response.status_code in NOT_MOUNTED:
+        raise ScenarioUnavailable("POST /api/auth/register не найден (роутер аутентификации не подключен)")
+
+
+Scenario = Callable[[httpx.AsyncClient, Recorder, random.Random], Awaitable[None]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "math_generate": math_generate,
+    "math_both": math_both,
+    "math_legacy": math_legacy,
+    "ktp": ktp,
+    "math_game": math_game,
+    "auth_login": auth_login,
+}
+
+PREPARE: Dict[str, Callable[[httpx.AsyncClient], Awaitable[None]]] = {
+    "auth_login": prepare_auth,
+}
+
+
+# ---- прогон ----
+
+async def probe(client: httpx.AsyncClient, mix: Dict[str, int]) -> Dict[str, str]:
+    """Пробный прогон каждого сценария: неподключенные исключаются из смеси"""
+    skipped = {}
+    for name in list(mix):
+        try:
+            if name in PREPARE:
+                await PREPARE[name](client)
+            await SCENARIOS[name](client, Recorder(), random.Random(0))
+        except ScenarioUnavailable as e:
+            skipped[name] = str(e)
+            del mix[name]
+    return skipped
+
+
+async def run_load(base_url: str, mix: Dict[str, int], concurrency: int, duration: float,
+                   max_requests: Optional[int], seed: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        skipped = await probe(client, mix)
+        if not mix:
+            raise SystemExit("Ни один сценарий недоступен: " + "; ".join(skipped.values()))
+
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        rec = Recorder()
+        iterations: Dict[str, int] = defaultdict(int)
+        remaining = [max_requests] if max_requests else None
+
+        async def worker(index: int):
+            rng = random.Random(seed + index)
+            while time.perf_counter() < deadline:
+                if remaining is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                name = rng.choices(names, weights)[0]
+                iterations[name] += 1
+                try:
+                    await SCENARIOS[name](client, rec, rng)
+                except ScenarioUnavailable:
+                    pass  # Ответ уже учтен как ошибка
+
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = rec.report(elapsed)
+    total_requests = sum(row["requests"] for row in endpoints)
+    total_errors = sum(row["errors"] for row in endpoints)
+    return {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "mix": mix,
+        "iterations": dict(iterations),
+        "skipped": skipped,
+        "total": {
+            "requests": total_requests,
+            "errors": total_errors,
+            "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+            "rps": round(total_requests / elapsed, 2),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def start_server(port: int, workdir: str, extra_env: Dict[str, str]) -> subprocess.Popen:
+    """Сервер с заменами в отдельном процессе (временные файлы — в workdir)"""
+    env = {
+        **os.environ,
+        "TEMP_DIR": os.path.join(workdir, "temp"),
+        "GENERATED_FILES_DIR": os.path.join(workdir, "generated_files"),
+        **extra_env,
+    }
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.loadtest_server", "--port", str(port),
+         "--database", os.path.join(workdir, "loadtest.db")],
+        cwd=backend_dir,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+
+def wait_ready(base_url: str, server: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Сервер завершился при запуске:\n{server.stdout.read()}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Сервер не ответил за {timeout} с")
+
+
+def stop_server(server: subprocess.Popen) -> str:
+    server.terminate()
+    try:
+        output, _ = server.communicate(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        output, _ = server.communicate()
+    return output or ""
+
+
+def parse_pairs(values: List[str], cast=str) -> Dict[str, object]:
+    pairs = {}
+    for value in values:
+        key, _, raw = value.partition("=")
+        pairs[key] = cast(raw)
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP API")
+    parser.add_argument("--url", help="Адрес уже запущенного сервера (без запуска своего)")
+    parser.add_argument("--port", type=int, default=8765, help="Порт запускаемого сервера")
+    parser.add_argument("--mix", nargs="+", default=[f"{k}={v}" for k, v in DEFAULT_MIX.items()],
+                        help=f"Сценарии с весами: имя=вес ({', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=int, default=8, help="Одновременных клиентов")
+    parser.add_argument("--duration", type=float, default=20.0, help="Длительность прогона, с")
+    parser.add_argument("--requests", type=int, help="Остановиться после стольких сценариев")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно выбора сценариев")
+    parser.add_argument("--server-env", nargs="*", default=[], help="Переменные окружения сервера: KEY=VALUE")
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    parser.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    args = parser.parse_args()
+
+    mix = parse_pairs(args.mix, int)
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    server = None
+    server_log = ""
+    with tempfile.TemporaryDirectory(prefix="loadtest_") as workdir:
+        base_url = args.url
+        if base_url is None:
+            base_url = f"http://127.0.0.1:{args.port}"
+            server = start_server(args.port, workdir, parse_pairs(args.server_env))
+        try:
+            if server is not None:
+                wait_ready(base_url, server, timeout=60)
+            report = asyncio.run(run_load(
+                base_url.rstrip("/"), mix, args.concurrency, args.duration, args.requests, args.seed
+            ))
+        finally:
+            if server is not None:
+                server_log = stop_server(server)
+
+    standins = [line.split("Замены: ", 1)[1] for line in server_log.splitlines() if "Замены: " in line]
+    report["standins"] = standins[0] if standins else None
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    # Ответ 500 — ошибка в коде эндпоинта (например, сломанная legacy обертка)
+    failed = [row["endpoint"] for row in report["endpoints"] if row["statuses"].get("500")]
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        sys.exit(1 if failed else 0)
+
+    print(f"Сервер: {base_url}, замены: {report['standins'] or 'не использовались'}")
+    print(f"Конкурентность {report['concurrency']}, {report['elapsed_s']} с, сценарии: {report['iterations']}")
+    for name, reason in report["skipped"].items():
+        print(f"Пропущен {name}: {reason}")
+    print()
+    header = f"{'endpoint':<36} {'req':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for row in report["endpoints"]:
+        print(
+            f"{row['endpoint']:<36} {row['requests']:>6} {row['rps']:>8} {row['p50_ms']:>8} "
+            f"{row['p95_ms']:>8} {row['p99_ms']:>8} {row['error_rate']:>7.1%}"
+        )
+    total = report["total"]
+    print("-" * len(header))
+    print(f"{'total':<36} {total['requests']:>6} {total['rps']:>8} {'':>8} {'':>8} {'':>8} {total['error_rate']:>7.1%}")
+    for endpoint in failed:
+        print(f"Ответы 500: {endpoint}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Сервер для нагрузочного теста: app.main:app под uvicorn с заменами
+
+Перед импортом приложения подставляются замены внешних сервисов:
+
+- Redis — fakeredis в памяти процесса (redis.Redis подменяется на
+  fakeredis.FakeRedis, поэтому глобальный RedisService подключается к нему);
+- база данных — SQLite файл вместо MySQL, таблицы создаются при запуске,
+  роутер аутентификации подключается к приложению;
+- настройки базы и JWT, которые читают app.models.database и
+  app.services.auth_service (в Settings их нет), добавляются к настройкам
+  процесса сервера; ключ подписи — SECRET_KEY из окружения или случайный
+  на время прогона.
+
+Замена включается, только если нужные пакеты установлены (fakeredis,
+sqlalchemy и зависимости аутентификации — requirements-bench.txt); иначе
+сервер работает без нее, а в лог пишется причина. Запускается из
+benchmarks.loadtest, но может быть запущен и отдельно.
+
+Запуск из папки backend:
+    pip install -r requirements-bench.txt
+    python -m benchmarks.loadtest_server --port 8765 --database /tmp/loadtest.db
+"""
+import argparse
+import logging
+import os
+import secrets
+
+logger = logging.getLogger("benchmarks.loadtest_server")
+
+
+def install_redis_standin() -> str:
+    """Подмена клиента Redis на fakeredis (до импорта RedisService)"""
+    try:
+        import fakeredis
+        import redis
+    except ImportError as e:
+        return f"нет: {e}"
+
+    redis.Redis = fakeredis.FakeRedis
+    return "fakeredis"
+
+
+def install_auth_settings(database_url: str) -> None:
+    """Настройки базы и JWT для модулей аутентификации (только в процессе сервера)"""
+    from app.core.config import settings
+
+    values = {
+        "database_url": database_url,
+        "secret_key": os.environ.get("SECRET_KEY") or secrets.token_urlsafe(32),
+        "algorithm": "HS256",
+        "access_token_expire_minutes": 30,
+    }
+    for name, value in values.items():
+        # Полей нет в Settings, а pydantic не дает присвоить неизвестное поле
+        object.__setattr__(settings, name, value)
+
+
+def install_database_standin(app, path: str) -> str:
+    """SQLite вместо MySQL и роутер аутентификации поверх app.main:app"""
+    install_auth_settings(f"sqlite:///{path}")
+    try:
+        from sqlalchemy import create_engine
+
+        from app.models import database
+        from app.routers import auth
+    except Exception as e:
+        return f"нет: {e}"
+
+    # Сессии выдаются зависимостью в пуле потоков — соединения SQLite
+    # должны переходить между потоками
+    database.engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    database.SessionLocal.configure(bind=database.engine)
+    database.create_tables()
+
+    if not any(getattr(route, "path", "").startswith(auth.router.prefix) for route in app.routes):
+        app.include_router(auth.router)
+    return f"sqlite:///{path}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сервер для нагрузочного теста")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database", default="./loadtest.db", help="Файл SQLite для замены MySQL")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    redis_status = install_redis_standin()
+
+    import uvicorn
+
+    from app.main import app
+
+    database_status = install_database_standin(app, args.database)
+    logger.info(f"Замены: redis — {redis_status}; база — {database_status}")
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Регрессионный бенчмарк пагинации рабочих листов
+
+Раньше после заполнения первой страницы позиция строки пересчитывалась
+по глобальному индексу примера, и каждый следующий пример попадал ниже
+края страницы — получалась одна страница на пример. Бенчмарк рендерит
+листы ученика и учителя на 100/500/1000 примеров и проверяет:
+
+- количество страниц: ровно ceil(n / строк на странице) для одной колонки
+  и не больше этого для раскладки в колонки;
+- время рендеринга (медиана после прогревочного рендеринга) не выше
+  бюджета на пример.
+
+Код возврата 1, если хотя бы одна проверка не прошла.
+
+Запуск из папки backend:
+    python -m benchmarks.pagination --sizes 100 500 1000 --budget-ms 0.5
+"""
+import argparse
+import json
+import math
+import re
+import statistics
+import sys
+import time
+
+from app.core.config import settings
+from app.models.schemas import MathGeneratorRequest, MathOperation
+from app.services.math_generator import (
+    BOTTOM_GAP,
+    CELL_SIZE,
+    MARGIN,
+    MARGIN_TOP,
+    render_math_pdf,
+)
+
+A4_HEIGHT = 297
+PAGE_PATTERN = re.compile(rb"/Type /Page\b(?!s)")
+
+# Строк на странице по геометрии листа (независимо от движка раскладки)
+ROWS_PER_PAGE = int((A4_HEIGHT - MARGIN - BOTTOM_GAP - (MARGIN_TOP + CELL_SIZE // 2)) // CELL_SIZE) + 1
+
+
+def count_pages(pdf_data: bytes) -> int:
+    return len(PAGE_PATTERN.findall(pdf_data))
+
+
+def run_case(layout: str, examples: int, for_teacher: bool, repeat: int) -> dict:
+    """
+    Рендеринг одного листа repeat раз: страницы и медиана времени
+
+    Первый рендеринг не замеряется — он загружает fpdf и метрики шрифтов,
+    и его время не относится к пагинации.
+    """
+    settings.worksheet_layout = layout
+    request = MathGeneratorRequest(
+        num_operands=3,
+        operations=[MathOperation.ADDITION, MathOperation.SUBTRACTION, MathOperation.MULTIPLICATION],
+        interval_start=1,
+        interval_end=100,
+        example_count=examples,
+        seed=examples,
+    )
+
+    pdf_data = render_math_pdf(request, for_teacher)  # Прогрев
+    pages = count_pages(pdf_data)
+    size = len(pdf_data)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render_math_pdf(request, for_teacher)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "layout": layout,
+        "variant": "teacher" if for_teacher else "student",
+        "examples": examples,
+        "pages": pages,
+        "expected_pages": math.ceil(examples / ROWS_PER_PAGE),
+        "size": size,
+        "median_ms": round(statistics.median(timings), 2),
+    }
+
+
+def check(result: dict, budget_ms: float) -> list:
+    """Список нарушений для одного результата"""
+    problems = []
+    if result["layout"] == "single" and result["pages"] != result["expected_pages"]:
+        problems.append(f"страниц {result['pages']}, ожидалось {result['expected_pages']}")
+    if result["pages"] > result["expected_pages"]:
+        problems.append(f"страниц {result['pages']} больше {result['expected_pages']}")
+    limit = budget_ms * result["examples"]
+    if result["median_ms"] > limit:
+        problems.append(f"рендеринг {result['median_ms']} мс дольше бюджета {limit:.0f} мс")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Регрессионный бенчмарк пагинации PDF")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000], help="Количество примеров")
+    parser.add_argument("--layouts", nargs="+", default=["single", "columns"], help="Движки раскладки")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов на случай (берется медиана)")
+    parser.add_argument("--budget-ms", type=float, default=0.5, help="Бюджет времени рендеринга на пример, мс")
+    parser.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    args = parser.parse_args()
+
+    original_layout = settings.worksheet_layout
+    results = []
+    try:
+        for layout in args.layouts:
+            for examples in args.sizes:
+                for for_teacher in (False, True):
+                    result = run_case(layout, examples, for_teacher, args.repeat)
+                    result["problems"] = check(result, args.budget_ms)
+                    results.append(result)
+    finally:
+        settings.worksheet_layout = original_layout
+
+    failed = [r for r in results if r["problems"]]
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        header = f"{'layout':<8} {'variant':<8} {'n':>5} {'pages':>6} {'expect':>7} {'size':>8} {'median ms':>10}  status"
+        print(header)
+        print("-" * len(header))
+        for r in results:
+            status = "OK" if not r["problems"] else "FAIL: " + "; ".join(r["problems"])
+            print(
+                f"{r['layout']:<8} {r['variant']:<8} {r['examples']:>5} {r['pages']:>6} "
+                f"{r['expected_pages']:>7} {r['size']:>8} {r['median_ms']:>10}  {status}"
+            )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
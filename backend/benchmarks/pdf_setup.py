@@ -0,0 +1,83 @@
+"""
+Микробенчмарк подготовки документов MathGridPDF (документов в секунду)
+
+Сравнивает сборку документа с нуля (MathGridPDF + заголовок + сетка)
+и получение его из прототипа, а также полный рендеринг листа ученика,
+листа учителя и обоих листов из общей основы.
+
+Запуск из папки backend:
+    python -m benchmarks.pdf_setup --seconds 2 --examples 40
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+from app.services.math_generator import (
+    render_both_pdfs,
+    render_pdf_for_teacher,
+    render_pdf_with_grid,
+)
+from app.services.math_pdf import MathGridPDF
+
+
+def build_from_scratch():
+    pdf = MathGridPDF()
+    pdf.draw_header()
+    pdf.draw_grid()
+    return pdf
+
+
+def docs_per_second(func: Callable, seconds: float) -> dict:
+    """Сколько раз func успевает выполниться за seconds секунд"""
+    func()  # Прогрев (кэши шрифтов и прототипа)
+    count = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        func()
+        count += 1
+        elapsed = time.perf_counter() - started
+    return {
+        "docs_per_sec": round(count / elapsed, 1),
+        "mean_us": round(elapsed / count * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк подготовки PDF")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Длительность каждого замера")
+    parser.add_argument("--examples", type=int, default=40, help="Примеров на лист")
+    parser.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    args = parser.parse_args()
+
+    examples: List[str] = [f"{i} + {i * 7 % 100} - 5" for i in range(args.examples)]
+    answers: List[str] = [str(i + i * 7 % 100 - 5) for i in range(args.examples)]
+
+    cases = [
+        ("setup_scratch", build_from_scratch),
+        ("setup_prototype", MathGridPDF.from_prototype),
+        ("render_student", lambda: render_pdf_with_grid(examples)),
+        ("render_teacher", lambda: render_pdf_for_teacher(examples, answers)),
+        ("render_both", lambda: render_both_pdfs(examples, answers)),
+    ]
+
+    results = []
+    for name, func in cases:
+        result = docs_per_second(func, args.seconds)
+        result["case"] = name
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    header = f"{'case':<18} {'docs/sec':>10} {'mean us':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['case']:<18} {r['docs_per_sec']:>10} {r['mean_us']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Бенчмарк генераторов примеров: отбраковка против конструктивного построения
+
+Сравнивает количество перегенераций и задержку (p50/p99) векторного
+генератора с отбраковкой (generate_batch) и конструктивного генератора
+(generate_constructive_batch) для наборов только с делением и смешанных.
+
+Запуск из папки backend:
+    python -m benchmarks.sampler --requests 200 --examples 100
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.services.math_sampler import generate_batch, generate_constructive_batch
+
+SAMPLERS: Dict[str, Callable] = {
+    "rejection": generate_batch,
+    "constructive": generate_constructive_batch,
+}
+
+SCENARIOS = [
+    {"name": "division_only", "operators": ["/"], "num_operands": 3},
+    {"name": "division_only", "operators": ["/"], "num_operands": 5},
+    {"name": "mixed", "operators": ["+", "-", "*", "/"], "num_operands": 5},
+    {"name": "mixed", "operators": ["+", "-", "*", "/"], "num_operands": 10},
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_scenario(sampler: Callable, scenario: dict, requests: int, examples: int, interval: List[int]) -> dict:
+    """Прогон одного сценария: requests запросов по examples примеров"""
+    latencies = []
+    retries = []
+    failures = 0
+
+    for _ in range(requests):
+        stats: Dict[str, int] = {}
+        started = time.perf_counter()
+        try:
+            sampler(examples, scenario["num_operands"], scenario["operators"], interval, stats=stats)
+        except ValueError:
+            failures += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+        retries.append(stats.get("retries", 0))
+
+    return {
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(max(latencies), 3),
+        "mean_retries": round(float(np.mean(retries)), 2),
+        "max_retries": int(max(retries)),
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк генераторов примеров")
+    parser.add_argument("--requests", type=int, default=100, help="Количество запросов на сценарий")
+    parser.add_argument("--examples", type=int, default=100, help="Примеров в запросе")
+    parser.add_argument("--interval", type=int, nargs=2, default=[0, 100], help="Диапазон чисел")
+    parser.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    args = parser.parse_args()
+
+    results = []
+    for scenario in SCENARIOS:
+        for sampler_name, sampler in SAMPLERS.items():
+            result = run_scenario(sampler, scenario, args.requests, args.examples, args.interval)
+            result.update({
+                "scenario": scenario["name"],
+                "operators": "".join(scenario["operators"]),
+                "num_operands": scenario["num_operands"],
+                "sampler": sampler_name,
+            })
+            results.append(result)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    header = f"{'scenario':<14} {'ops':<5} {'n':>3} {'sampler':<13} {'p50 ms':>9} {'p99 ms':>9} {'retries':>9} {'max':>7} {'fail':>5}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['scenario']:<14} {r['operators']:<5} {r['num_operands']:>3} {r['sampler']:<13} "
+            f"{r['p50_ms']:>9} {r['p99_ms']:>9} {r['mean_retries']:>9} {r['max_retries']:>7} {r['failures']:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
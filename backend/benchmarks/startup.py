@@ -0,0 +1,155 @@
+"""
+Профиль запуска: что и сколько импортируется при старте приложения
+
+Запускает отдельный интерпретатор с `python -X importtime -c "import <модуль>"`
+(по умолчанию app.main — то же, что загружает uvicorn и каждый воркер
+пула генерации) и разбирает отчет интерпретатора:
+
+- общее время импорта и время самого модуля (с зависимостями);
+- самые дорогие модули по времени с зависимостями и по собственному времени;
+- сводка по пакетам верхнего уровня (fastapi, numpy, app, ...);
+- какие тяжелые библиотеки рендеринга (pandas, openpyxl, fpdf, matplotlib)
+  загрузились при запуске — они должны подключаться при первом
+  использовании, а не при старте.
+
+Кэш .pyc не сбрасывается, поэтому первый запуск после изменения кода
+медленнее; при --repeat берется прогон с медианным общим временем.
+С --fail-on-heavy код возврата 1, если при запуске загрузилась тяжелая
+библиотека.
+
+Запуск из папки backend:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --module app.services.math_generator --top 15
+    python -m benchmarks.startup --repeat 5 --fail-on-heavy --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Библиотеки, которые не должны загружаться при запуске
+HEAVY_MODULES = ("pandas", "openpyxl", "fpdf", "matplotlib")
+
+
+def import_profile(module: str) -> List[dict]:
+    """
+    Отчет -X importtime для импорта модуля в новом интерпретаторе
+
+    Returns:
+        Строки отчета в порядке вывода: модуль, собственное и полное время (мкс),
+        глубина вложенности
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{result.stderr.strip()}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Заголовок отчета
+        name = fields[2].rstrip()
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return entries
+
+
+def summarize(entries: List[dict], module: str, top: int) -> dict:
+    """Итоги отчета: общее время, самые дорогие модули, пакеты, тяжелые библиотеки"""
+    total_us = sum(entry["self_us"] for entry in entries)
+    target = next((e for e in reversed(entries) if e["module"] == module), None)
+
+    packages: Dict[str, dict] = defaultdict(lambda: {"self_us": 0, "modules": 0})
+    for entry in entries:
+        package = packages[entry["module"].split(".")[0]]
+        package["self_us"] += entry["self_us"]
+        package["modules"] += 1
+
+    heavy = {}
+    for name in HEAVY_MODULES:
+        loaded = [e for e in entries if e["module"] == name or e["module"].startswith(name + ".")]
+        if loaded:
+            root = next((e for e in loaded if e["module"] == name), loaded[0])
+            heavy[name] = round(root["cumulative_us"] / 1000, 1)
+
+    def ms(entry: dict, key: str) -> dict:
+        return {"module": entry["module"], "ms": round(entry[key] / 1000, 1)}
+
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "module_ms": round(target["cumulative_us"] / 1000, 1) if target else None,
+        "modules": len(entries),
+        "top_cumulative": [ms(e, "cumulative_us") for e in sorted(entries, key=lambda e: -e["cumulative_us"])[:top]],
+        "top_self": [ms(e, "self_us") for e in sorted(entries, key=lambda e: -e["self_us"])[:top]],
+        "packages": [
+            {"package": name, "ms": round(data["self_us"] / 1000, 1), "modules": data["modules"]}
+            for name, data in sorted(packages.items(), key=lambda item: -item[1]["self_us"])[:top]
+        ],
+        "heavy": heavy,
+    }
+
+
+def print_report(report: dict, runs: List[float]):
+    print(f"Импорт {report['module']}: {report['module_ms']} мс "
+          f"(всего {report['total_ms']} мс, модулей {report['modules']})")
+    if len(runs) > 1:
+        print(f"Прогоны, мс: {', '.join(f'{run:.1f}' for run in runs)}")
+
+    for title, key in (("С зависимостями", "top_cumulative"), ("Собственное время", "top_self")):
+        print(f"\n{title}:")
+        for row in report[key]:
+            print(f"  {row['ms']:>8.1f} мс  {row['module']}")
+
+    print("\nПо пакетам (собственное время):")
+    for row in report["packages"]:
+        print(f"  {row['ms']:>8.1f} мс  {row['package']:<24} модулей: {row['modules']}")
+
+    print("\nТяжелые библиотеки при запуске:")
+    for name in HEAVY_MODULES:
+        loaded = report["heavy"].get(name)
+        print(f"  {name:<12} {f'загружена ({loaded} мс)' if loaded is not None else 'не загружена'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Профиль импортов при запуске приложения")
+    parser.add_argument("--module", default="app.main", help="Импортируемый модуль")
+    parser.add_argument("--top", type=int, default=10, help="Строк в каждой таблице")
+    parser.add_argument("--repeat", type=int, default=1, help="Прогонов (берется медианный)")
+    parser.add_argument("--fail-on-heavy", action="store_true",
+                        help="Код возврата 1, если загрузилась тяжелая библиотека")
+    parser.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    args = parser.parse_args()
+
+    reports = [summarize(import_profile(args.module), args.module, args.top) for _ in range(max(args.repeat, 1))]
+    runs = [report["total_ms"] for report in reports]
+    median = statistics.median_low(runs)
+    report = next(report for report in reports if report["total_ms"] == median)
+
+    if args.json:
+        print(json.dumps({**report, "runs_ms": runs}, ensure_ascii=False, indent=2))
+    else:
+        print_report(report, runs)
+
+    sys.exit(1 if args.fail_on_heavy and report["heavy"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Набор бенчмарков генерации: примеры, PDF и XLSX
+
+Прогоняет сетку случаев и пишет результаты в JSON, который можно
+сравнить с результатами другого коммита:
+
+- sampling — генерация и форматирование примеров по количеству примеров,
+  операндов и набору операций;
+- pdf — рендеринг листа ученика, учителя и обоих листов сразу;
+- xlsx — расписание КТП отдельно и вместе с Excel файлом по длине
+  периода и нагрузке.
+
+Для каждого случая берется медиана из нескольких повторов (после
+прогрева). При сравнении с базовым файлом случай считается регрессией,
+если медиана выросла больше чем на порог; код возврата тогда 1.
+
+Запуск из папки backend:
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json --threshold 0.15
+    python -m benchmarks.suite --groups pdf --quick
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from app.core.config import settings
+from app.models.schemas import MathGeneratorRequest, MathOperation
+from app.routers.ktp import build_ktp_excel, generate_schedule
+from app.services.math_generator import (
+    generate_example_batch,
+    generate_math_examples,
+    render_batch_pdf,
+    render_both_batch_pdfs,
+)
+
+OPERATION_MIXES = {
+    "add_sub": "+-",
+    "mul_div": "*/",
+    "all": "+-*/",
+}
+
+# Периоды КТП: (название, дней)
+DATE_RANGES = [
+    ("month", 30),
+    ("quarter", 91),
+    ("school_year", 273),
+    ("two_years", 730),
+]
+
+# Уроков по дням недели: обычная и плотная нагрузка
+LOADS = {
+    "light": [1, 1, 1, 1, 1, 0, 0],
+    "heavy": [3, 3, 3, 3, 3, 2, 0],
+}
+
+Case = Tuple[str, dict, Callable[[], object]]
+
+
+def math_request(examples: int, operands: int, mix: str) -> MathGeneratorRequest:
+    return MathGeneratorRequest(
+        num_operands=operands,
+        operations=[MathOperation(value=op) for op in OPERATION_MIXES[mix]],
+        interval_start=1,
+        interval_end=100,
+        example_count=examples,
+        seed=examples * 31 + operands,
+    )
+
+
+def sampling_cases(quick: bool) -> Iterator[Case]:
+    counts = [100, 1000] if quick else [10, 100, 1000, 10000]
+    for examples in counts:
+        for operands in (2, 5):
+            for mix in OPERATION_MIXES:
+                request = math_request(examples, operands, mix)
+                params = {"examples": examples, "operands": operands, "mix": mix}
+                yield "sampling", params, lambda request=request: generate_math_examples(request)
+
+
+def pdf_cases(quick: bool) -> Iterator[Case]:
+    counts = [100, 1000] if quick else [10, 100, 1000]
+    for examples in counts:
+        for operands in (2, 5):
+            batch = generate_example_batch(math_request(examples, operands, "all"))
+            params = {"examples": examples, "operands": operands, "mix": "all"}
+            yield "pdf", {**params, "variant": "student"}, lambda batch=batch: render_batch_pdf(batch, False)
+            yield "pdf", {**params, "variant": "teacher"}, lambda batch=batch: render_batch_pdf(batch, True)
+            yield "pdf", {**params, "variant": "both"}, lambda batch=batch: render_both_batch_pdfs(batch)
+
+
+def build_xlsx(start: datetime, end: datetime, lessons_per_day: List[int]) -> int:
+    """Расписание и Excel файл в памяти"""
+    _, lessons = build_ktp_excel(start, end, [0, 1, 2, 3, 4, 5], lessons_per_day, [], [])
+    return lessons
+
+
+def xlsx_cases(quick: bool) -> Iterator[Case]:
+    start = datetime(2025, 9, 1)
+    ranges = DATE_RANGES[::2] if quick else DATE_RANGES
+    for range_name, days in ranges:
+        end = start + timedelta(days=days)
+        for load_name, lessons_per_day in LOADS.items():
+            params = {"range": range_name, "days": days, "load": load_name}
+            yield "xlsx.schedule", params, lambda end=end, lessons=lessons_per_day: generate_schedule(
+                start, end, [0, 1, 2, 3, 4, 5], lessons, [], []
+            )
+            yield "xlsx.build", params, lambda end=end, lessons=lessons_per_day: build_xlsx(start, end, lessons)
+
+
+GROUPS: Dict[str, Callable[[bool], Iterator[Case]]] = {
+    "sampling": sampling_cases,
+    "pdf": pdf_cases,
+    "xlsx": xlsx_cases,
+}
+
+
+def case_id(name: str, params: dict) -> str:
+    return name + "[" + ",".join(f"{key}={value}" for key, value in params.items()) + "]"
+
+
+def measure(func: Callable, repeat: int, min_time: float) -> dict:
+    """Медиана и разброс: не меньше repeat повторов и не меньше min_time секунд"""
+    func()  # Прогрев (кэши шрифтов, прототипа, импортов)
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - started < min_time:
+        call_started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - call_started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(timings[0], 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "rounds": len(timings),
+    }
+
+
+def environment() -> dict:
+    """Описание окружения, чтобы сравнивать только сопоставимые прогоны"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "worksheet_layout": settings.worksheet_layout,
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[dict]:
+    """Сравнение медиан с базовым прогоном (только общие случаи)"""
+    rows = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None or not base.get("median_ms"):
+            continue
+        ratio = result["median_ms"] / base["median_ms"]
+        rows.append({
+            "case": key,
+            "baseline_ms": base["median_ms"],
+            "median_ms": result["median_ms"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Набор бенчмарков генерации")
+    parser.add_argument("--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS), help="Группы случаев")
+    parser.add_argument("--quick", action="store_true", help="Сокращенная сетка случаев")
+    parser.add_argument("--repeat", type=int, default=5, help="Минимум повторов на случай")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Минимум секунд замера на случай")
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    parser.add_argument("--compare", help="JSON базового прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Допустимый рост медианы (0.15 = 15%%)")
+    parser.add_argument("--json", action="store_true", help="Вывод в формате JSON")
+    args = parser.parse_args()
+
+    os.makedirs(settings.temp_dir, exist_ok=True)
+
+    results: Dict[str, dict] = {}
+    for group in args.groups:
+        for name, params, func in GROUPS[group](args.quick):
+            key = case_id(name, params)
+            results[key] = {"group": group, "name": name, "params": params,
+                            **measure(func, args.repeat, args.min_time)}
+            if not args.json:
+                # Ход прогона — в stderr, чтобы не смешивать с итоговой таблицей
+                print(f"  {key:<60} {results[key]['median_ms']:>10} ms", file=sys.stderr)
+
+    report = {"environment": environment(), "results": results}
+
+    comparison = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline["results"], args.threshold)
+        report["comparison"] = {
+            "baseline": baseline.get("environment"),
+            "threshold": args.threshold,
+            "cases": comparison,
+        }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    regressions = [row for row in comparison if row["regression"]]
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif comparison:
+        header = f"{'case':<60} {'base ms':>10} {'now ms':>10} {'ratio':>7}  status"
+        print(header)
+        print("-" * len(header))
+        for row in comparison:
+            status = "REGRESSION" if row["regression"] else "OK"
+            print(f"{row['case']:<60} {row['baseline_ms']:>10} {row['median_ms']:>10} {row['ratio']:>7}  {status}")
+        print(f"\nРегрессий: {len(regressions)} из {len(comparison)} (порог {args.threshold:.0%})")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
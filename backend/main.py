@@ -3,9 +3,6 @@ from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 import tempfile
 import os
-import pandas as pd
-import openpyxl
-from fpdf import FPDF
 from typing import List
 import random
 import datetime
@@ -111,6 +108,8 @@ class Example:
         return f"{self} {self._result_}"
 
 def create_pdf(examples, answers=None, with_answers=False):
+    # fpdf2 загружается при первом PDF, а не при запуске сервера
+    from fpdf import FPDF
     pdf = FPDF('P', 'mm', 'A4')
     pdf.add_page()
     pdf.set_font('Arial', '', 12)
@@ -177,6 +176,9 @@ async def ktp_generator(
         lessons_per_day_int = [int(x) for x in lessons_per_day]
         weekdays_int = [int(x) for x in weekdays]
         schedule = generate_schedule(start_date_dt, end_date_dt, weekdays_int, holidays_dt, vacation_dt, lessons_per_day_int)
+        # pandas и openpyxl загружаются при первом расписании, а не при запуске сервера
+        import pandas as pd
+        import openpyxl
         df = pd.DataFrame({'Дата': schedule})
         temp = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
         writer = pd.ExcelWriter(temp.name, engine='openpyxl')